@@ -4,7 +4,7 @@ database config
 
 import os
 
-from sqlalchemy import create_engine
+from sqlalchemy import Engine, create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -18,20 +18,30 @@ POSTGRES = {
     "port": os.getenv("DB_PORT", ""),
 }
 
-print(POSTGRES)
-
-engine = create_engine(DB_URI.format(**POSTGRES), echo=False)
+engine: Engine | None = None
 
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
-    bind=engine,
 )
 
+
+def get_engine() -> Engine:
+    """
+    Return the sync engine, creating it on the first call.
+    """
+    global engine
+    if engine is None:
+        engine = create_engine(DB_URI.format(**POSTGRES), echo=False)
+        SessionLocal.configure(bind=engine)
+    return engine
+
+
 Base = declarative_base()  # inherit from this class to create ORM models
 
 
 def get_db_session():
+    get_engine()
     session = SessionLocal()
     try:
         yield session
@@ -2,15 +2,23 @@
 database async
 """
 
+import asyncio
 import os
+from contextlib import AsyncExitStack
+from typing import Any, Dict
+from uuid import uuid4
 
+from sqlalchemy import MetaData, select
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     async_sessionmaker,
     create_async_engine,
 )
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.pool import NullPool
+
+from app.db.pool_metrics import InstrumentedAsyncPool, instrument_engine
+from app.db.routing import ReplicaRouter
 
 ASYNC_DB_URI = "postgresql+asyncpg://{user}:{pw}@{host}:{port}/{db}"
 
@@ -22,29 +30,154 @@ ASYNC_POSTGRES = {
     "port": os.getenv("DB_PORT", ""),
 }
 
-print(ASYNC_POSTGRES)
+# read replicas, e.g. DB_REPLICA_HOSTS="replica1:5432,replica2:5432"
+REPLICA_HOSTS = [
+    host.strip()
+    for host in os.getenv("DB_REPLICA_HOSTS", "").split(",")
+    if host.strip()
+]
+# round_robin or least_busy
+REPLICA_STRATEGY = os.getenv("DB_REPLICA_STRATEGY", "round_robin")
+
+
+# PgBouncer in transaction pooling mode: a transaction may run on any server
+# connection, so named prepared statements can't be reused across them
+PGBOUNCER = os.getenv("DB_PGBOUNCER", "false").lower() in ("1", "true", "yes")
+# local pool size in PgBouncer mode, 0 uses NullPool
+PGBOUNCER_POOL_SIZE = int(os.getenv("DB_PGBOUNCER_POOL_SIZE", "0"))
+
+
+def _prepared_statement_name() -> str:
+    return f"__asyncpg_{uuid4()}__"
+
+
+def engine_options(pgbouncer: bool = PGBOUNCER) -> Dict[str, Any]:
+    """
+    Pool and driver options of create_async_engine.
+    In PgBouncer mode asyncpg keeps no prepared statement cache and names
+    each statement uniquely; SQLAlchemy's compiled cache and the
+    repositories' statement cache still save the client-side work.
+    """
+    if not pgbouncer:
+        return {
+            "poolclass": InstrumentedAsyncPool,
+            "pool_size": 30,
+            "max_overflow": 10,
+            "pool_pre_ping": True,
+        }
+
+    options: Dict[str, Any] = {
+        "connect_args": {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": _prepared_statement_name,
+        }
+    }
+    if PGBOUNCER_POOL_SIZE > 0:
+        # PgBouncer does the real pooling, a few idle client connections are enough
+        options.update(
+            poolclass=InstrumentedAsyncPool,
+            pool_size=PGBOUNCER_POOL_SIZE,
+            max_overflow=0,
+            pool_pre_ping=True,
+        )
+    else:
+        options["poolclass"] = NullPool
+    return options
+
+
+def create_engine_for(host: str, port: str) -> AsyncEngine:
+    return create_async_engine(
+        ASYNC_DB_URI.format(**{**ASYNC_POSTGRES, "host": host, "port": port}),
+        echo=False,
+        future=True,
+        **engine_options(),
+    )
+
+
+def _split_host(host_port: str) -> tuple[str, str]:
+    host, _, port = host_port.partition(":")
+    return host, port or ASYNC_POSTGRES["port"]
 
-async_engine: AsyncEngine = create_async_engine(
-    ASYNC_DB_URI.format(**ASYNC_POSTGRES),
-    poolclass=AsyncAdaptedQueuePool,
-    pool_size=30,
-    max_overflow=10,
-    pool_pre_ping=True,
-    echo=False,
-    future=True,
-)
+
+# engines are created on first use (normally by the app lifespan),
+# the session factories are bound to them then
+async_engine: AsyncEngine | None = None
+replica_router: ReplicaRouter | None = None
 
 AsyncSessionLocal = async_sessionmaker(
     autocommit=False,
     autoflush=False,
-    bind=async_engine,
 )
 
+# sessions whose transactions are opened as BEGIN READ ONLY,
+# AsyncUnitOfWork binds them to the engine picked by replica_router
+AsyncReadOnlySessionLocal = async_sessionmaker(
+    autocommit=False,
+    autoflush=False,
+)
+
+
+def get_replica_router() -> ReplicaRouter:
+    """
+    Return the router of the primary and replica engines,
+    creating the engines on the first call.
+    """
+    global async_engine, replica_router
+    if replica_router is None:
+        async_engine = create_engine_for(ASYNC_POSTGRES["host"], ASYNC_POSTGRES["port"])
+        replica_engines = [
+            create_engine_for(*_split_host(host)) for host in REPLICA_HOSTS
+        ]
+        replica_router = ReplicaRouter(async_engine, replica_engines, REPLICA_STRATEGY)
+        instrument_engine(async_engine, "primary")
+        for host, engine in zip(REPLICA_HOSTS, replica_engines):
+            instrument_engine(engine, f"replica {host}")
+        AsyncSessionLocal.configure(bind=async_engine)
+        AsyncReadOnlySessionLocal.configure(bind=replica_router.primary_read_engine)
+    return replica_router
+
+
+async def warm_up_engines(metadata: MetaData, connections: int):
+    """
+    Open `connections` pooled connections per engine and run a
+    'SELECT ... LIMIT 0' per table on each, so connection setup and
+    asyncpg type introspection are done before the first request.
+    """
+    if connections <= 0:
+        return
+    router = get_replica_router()
+    for engine in [router.primary, *router.replicas]:
+        if isinstance(engine.pool, NullPool):
+            continue
+        # overflow connections are closed on checkin, only pool_size stay open
+        count = min(connections, engine.pool.size())
+        async with AsyncExitStack() as stack:
+            opened = await asyncio.gather(
+                *(stack.enter_async_context(engine.connect()) for _ in range(count))
+            )
+            for connection in opened:
+                for table in metadata.sorted_tables:
+                    await connection.execute(select(table).limit(0))
+
+
+async def dispose_engines():
+    """
+    Close all pooled connections, e.g. on shutdown.
+    """
+    global async_engine, replica_router
+    if replica_router is not None:
+        for engine in [replica_router.primary, *replica_router.replicas]:
+            await engine.dispose()
+    async_engine = replica_router = None
+
+
 Base = declarative_base()  # inherit from this class to create ORM models
 
 
 async def get_async_db_session():
     # session: AsyncSession = AsyncSessionLocal()
+    get_replica_router()
     async with AsyncSessionLocal() as session:
         try:
             yield session
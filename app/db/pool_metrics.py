@@ -0,0 +1,218 @@
+"""
+connection pool metrics
+"""
+
+import functools
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# upper bounds of the histogram buckets, in milliseconds
+BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# (route, service method) a connection is checked out for
+Labels = Tuple[str, str]
+
+_request_scope: ContextVar[Dict[str, Any] | None] = ContextVar(
+    "request_scope", default=None
+)
+_service_method: ContextVar[str] = ContextVar("service_method", default="-")
+
+
+def set_request_scope(scope: Dict[str, Any]):
+    """
+    Attribute the connections of the current request to its route.
+    """
+    _request_scope.set(scope)
+
+
+def track_service_method(func):
+    """
+    Decorator attributing the connections used by a service method to it.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        token = _service_method.set(f"{type(self).__name__}.{func.__name__}")
+        try:
+            return await func(self, *args, **kwargs)
+        finally:
+            _service_method.reset(token)
+
+    return wrapper
+
+
+def current_labels() -> Labels:
+    scope = _request_scope.get()
+    if scope is None:
+        route = "-"
+    else:
+        # the route template is known once the request has been routed
+        route = getattr(scope.get("route"), "path", scope.get("path", "-"))
+        route = f"{scope.get('method', '')} {route}".strip()
+    return route, _service_method.get()
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float):
+        index = 0
+        while index < len(BUCKETS_MS) and ms > BUCKETS_MS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def to_dict(self) -> Dict[str, Any]:
+        buckets = {f"le_{bound}ms": n for bound, n in zip(BUCKETS_MS, self.counts)}
+        buckets["inf"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0,
+            "max_ms": round(self.max_ms, 3),
+            "buckets": buckets,
+        }
+
+
+class PoolMetrics:
+    """
+    Checkout wait and connection held time per (route, service method),
+    plus overflow use and invalidations of one pool.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.reset()
+
+    def reset(self):
+        self.checkout_wait: Dict[Labels, Histogram] = defaultdict(Histogram)
+        self.held: Dict[Labels, Histogram] = defaultdict(Histogram)
+        self.checkouts = 0
+        self.overflow_checkouts = 0
+        self.max_overflow_seen = 0
+        self.checkout_timeouts = 0
+        self.invalidations = 0
+        self.soft_invalidations = 0
+        self.pre_ping_failures = 0
+
+    def snapshot(self, pool: AsyncAdaptedQueuePool) -> Dict[str, Any]:
+        def by_labels(histograms: Dict[Labels, Histogram]) -> List[Dict[str, Any]]:
+            return [
+                {"route": route, "service_method": method, **histogram.to_dict()}
+                for (route, method), histogram in sorted(histograms.items())
+            ]
+
+        return {
+            "pool": self.name,
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "checkouts": self.checkouts,
+            "overflow_checkouts": self.overflow_checkouts,
+            "max_overflow_seen": self.max_overflow_seen,
+            "checkout_timeouts": self.checkout_timeouts,
+            "invalidations": self.invalidations,
+            "soft_invalidations": self.soft_invalidations,
+            "pre_ping_failures": self.pre_ping_failures,
+            "checkout_wait": by_labels(self.checkout_wait),
+            "held": by_labels(self.held),
+        }
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool timing how long checkouts wait for a connection;
+    pool events have no hook before the wait starts.
+    """
+
+    metrics: PoolMetrics | None = None
+
+    def _do_get(self):
+        if self.metrics is None:
+            return super()._do_get()
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.checkout_timeouts += 1
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.metrics.checkout_wait[current_labels()].observe(elapsed_ms)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+# pool name -> engine, for the metrics endpoint
+instrumented_engines: Dict[str, AsyncEngine] = {}
+
+
+def instrument_engine(engine: AsyncEngine, name: str) -> PoolMetrics:
+    """
+    Collect metrics of the engine's pool through pool events.
+    """
+    metrics = PoolMetrics(name)
+    engine.pool.metrics = metrics
+    instrumented_engines[name] = engine
+
+    @event.listens_for(engine.sync_engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        labels = current_labels()
+        connection_record.info["checked_out_at"] = time.perf_counter()
+        connection_record.info["checked_out_for"] = labels
+        metrics.checkouts += 1
+        if not isinstance(engine.pool, AsyncAdaptedQueuePool):
+            return
+        overflow = engine.pool.overflow()
+        if overflow > 0:
+            metrics.overflow_checkouts += 1
+            metrics.max_overflow_seen = max(metrics.max_overflow_seen, overflow)
+
+    @event.listens_for(engine.sync_engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        checked_out_at = connection_record.info.pop("checked_out_at", None)
+        labels = connection_record.info.pop("checked_out_for", ("-", "-"))
+        if checked_out_at is not None:
+            elapsed_ms = (time.perf_counter() - checked_out_at) * 1000
+            metrics.held[labels].observe(elapsed_ms)
+
+    @event.listens_for(engine.sync_engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.invalidations += 1
+        # a failed pre_ping surfaces as a DisconnectionError on checkout
+        if isinstance(exception, exc.DisconnectionError):
+            metrics.pre_ping_failures += 1
+
+    @event.listens_for(engine.sync_engine, "soft_invalidate")
+    def on_soft_invalidate(dbapi_connection, connection_record, exception):
+        metrics.soft_invalidations += 1
+
+    return metrics
+
+
+def pool_metrics_snapshot() -> List[Dict[str, Any]]:
+    return [
+        engine.pool.metrics.snapshot(engine.pool)
+        for engine in instrumented_engines.values()
+        if isinstance(engine.pool, InstrumentedAsyncPool) and engine.pool.metrics
+    ]
+
+
+def reset_pool_metrics():
+    for engine in instrumented_engines.values():
+        if isinstance(engine.pool, InstrumentedAsyncPool) and engine.pool.metrics:
+            engine.pool.metrics.reset()
@@ -0,0 +1,160 @@
+"""
+reference data cache
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Hashable, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+import app.utils.config as config
+from app.utils.lru import LRUCache
+from app.utils.response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+# tables whose changes invalidate the cache; migrations/004_reference_notify.sql
+# notifies REFERENCE_CHANNEL on their writes
+REFERENCE_TABLES = {"site", "building"}
+
+
+class ReferenceCache:
+    """
+    In-process cache of rarely changing reference data, bounded by size
+    and TTL. invalidate() bumps the version, so a value loaded while an
+    invalidation happened is returned but not cached.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.ttl = ttl
+        self.version = 0
+        # key -> (expires at, value)
+        self._entries: LRUCache[Tuple[float, Any]] = LRUCache(max_size)
+
+    def get(self, key: Hashable) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(key)
+            return None
+        return value
+
+    def set(self, key: Hashable, value: Any, version: int):
+        if version == self.version:
+            self._entries.set(key, (time.monotonic() + self.ttl, value))
+
+    async def get_or_load(self, key: Hashable, load: Callable[[], Awaitable[Any]]):
+        value = self.get(key)
+        if value is None:
+            version = self.version
+            value = await load()
+            self.set(key, value, version)
+        return value
+
+    def invalidate(self):
+        self.version += 1
+        self._entries.clear()
+
+
+reference_cache = ReferenceCache(
+    config.REFERENCE_CACHE_SIZE, config.REFERENCE_CACHE_TTL_SECONDS
+)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_reference_writes(session: Session, flush_context):
+    if any(
+        getattr(obj, "__tablename__", None) in REFERENCE_TABLES
+        for obj in (*session.new, *session.dirty, *session.deleted)
+    ):
+        session.info["reference_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session):
+    # this worker's own ORM writes; the others learn of them by NOTIFY
+    if session.info.pop("reference_changed", False):
+        reference_cache.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_writes(session: Session):
+    session.info.pop("reference_changed", None)
+
+
+async def listen_for_invalidations(
+    engine: AsyncEngine, channel: str = config.REFERENCE_CHANNEL
+):
+    """
+    Invalidate the cache on each notification of channel, until cancelled.
+    The channel also carries the invalidations of the response cache: they
+    are applied to it, and reference data changes clear it too, as list
+    responses embed sites and buildings.
+    Holds one connection to the database of the engine, opened outside
+    of its pool so as not to take a pooled connection for good; it must be
+    a session (not a PgBouncer transaction pooled) connection for LISTEN
+    to work.
+    Reconnects after failures, invalidating since notifications may have
+    been missed meanwhile.
+    """
+    # notification handlers run as tasks, referenced until done
+    tasks: Set[asyncio.Task] = set()
+
+    def spawn(coroutine: Awaitable[Any]):
+        task = asyncio.ensure_future(coroutine)
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    async def apply(payload: str):
+        if not await response_cache.apply_broadcast(payload):
+            reference_cache.invalidate()
+            await response_cache.clear()
+
+    def on_notify(connection, pid, channel, payload):
+        spawn(apply(payload))
+
+    listener_engine = create_async_engine(engine.url, poolclass=NullPool)
+    try:
+        await _listen(listener_engine, channel, on_notify)
+    finally:
+        await listener_engine.dispose()
+
+
+async def _listen(engine: AsyncEngine, channel: str, on_notify: Callable[..., None]):
+    """
+    LISTEN on a connection of engine until cancelled, reconnecting after
+    failures.
+    """
+    reconnecting = False
+    while True:
+        try:
+            async with engine.connect() as connection:
+                raw_connection = await connection.get_raw_connection()
+                driver_connection = raw_connection.driver_connection
+                if not hasattr(driver_connection, "add_listener"):
+                    logger.info("No LISTEN support, reference data expires by TTL")
+                    return
+                closed = asyncio.Event()
+                driver_connection.add_termination_listener(lambda _: closed.set())
+                await driver_connection.add_listener(channel, on_notify)
+                try:
+                    if reconnecting:
+                        reference_cache.invalidate()
+                        await response_cache.clear()
+                    await closed.wait()
+                finally:
+                    if not driver_connection.is_closed():
+                        await driver_connection.remove_listener(channel, on_notify)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Listening for reference data changes failed")
+        reconnecting = True
+        await asyncio.sleep(5)
@@ -0,0 +1,107 @@
+"""
+read replica routing
+"""
+
+import itertools
+import time
+from contextvars import ContextVar
+from typing import List
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+class RoutingContext:
+    """
+    Per-request routing state, shared with the tasks the request spawns.
+    """
+
+    def __init__(self, pin_primary: bool = False):
+        self.pin_primary = pin_primary
+        self.wrote = False
+
+
+_routing_context: ContextVar[RoutingContext | None] = ContextVar(
+    "routing_context", default=None
+)
+
+
+def start_routing_context(pin_primary: bool = False) -> RoutingContext:
+    """
+    Start the routing state of a request.
+    pin_primary sends its reads to the primary (read-your-writes).
+    """
+    context = RoutingContext(pin_primary)
+    _routing_context.set(context)
+    return context
+
+
+def record_write():
+    """
+    Record that the current request committed a write: its later reads
+    go to the primary, and the client is pinned to it for a short window.
+    """
+    context = _routing_context.get()
+    if context is not None:
+        context.wrote = True
+        context.pin_primary = True
+
+
+def is_primary_pinned() -> bool:
+    context = _routing_context.get()
+    return context is not None and context.pin_primary
+
+
+class ReplicaRouter:
+    """
+    Pick the engine of read-only transactions: a replica chosen
+    round-robin or by fewest checked-out connections, or the primary
+    when there is no replica or the request is pinned to it.
+    Pools that don't count checkouts (NullPool, as in PgBouncer mode)
+    fall back to round-robin.
+    """
+
+    def __init__(
+        self,
+        primary: AsyncEngine,
+        replicas: List[AsyncEngine],
+        strategy: str = "round_robin",
+    ):
+        if strategy not in ("round_robin", "least_busy"):
+            raise ValueError(f"Unsupported replica strategy: {strategy}")
+        self.primary = primary
+        self.replicas = replicas
+        self.strategy = strategy
+        self._read_only = {
+            engine: engine.execution_options(postgresql_readonly=True)
+            for engine in [primary, *replicas]
+        }
+        self._round_robin = itertools.cycle(replicas)
+        self._least_busy = strategy == "least_busy" and all(
+            hasattr(replica.pool, "checkedout") for replica in replicas
+        )
+
+    @property
+    def primary_read_engine(self) -> AsyncEngine:
+        return self._read_only[self.primary]
+
+    def read_engine(self) -> AsyncEngine:
+        """
+        Return the read-only engine for the next read transaction.
+        """
+        if not self.replicas or is_primary_pinned():
+            return self.primary_read_engine
+        if self._least_busy:
+            engine = min(self.replicas, key=lambda replica: replica.pool.checkedout())
+        else:
+            engine = next(self._round_robin)
+        return self._read_only[engine]
+
+
+def is_pin_active(pinned_until: str | None) -> bool:
+    """
+    Whether a read-your-writes pin, an expiry unix timestamp, is still active.
+    """
+    try:
+        return float(pinned_until or 0) > time.time()
+    except ValueError:
+        return False
@@ -2,42 +2,181 @@
 unit of work
 """
 
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, Hashable, List
+
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from app.db.routing import ReplicaRouter, record_write
+
+logger = logging.getLogger(__name__)
+
 
 class AsyncUnitOfWork:
-    def __init__(self, session_factory: async_sessionmaker):
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        read_only_session_factory: async_sessionmaker | None = None,
+        router: ReplicaRouter | None = None,
+    ):
         """
         Initializes the Unit of Work with a session factory.
+        read_only_session_factory creates the sessions of read-only blocks,
+        it defaults to session_factory. With a router, read-only blocks are
+        bound to the engine it picks, e.g. a read replica.
         """
         self.session_factory = session_factory
+        self.read_only_session_factory = read_only_session_factory or session_factory
+        self.router = router
         self.session: AsyncSession | None = None
+        self.read_only = False
+        self._session_read_only = False
+        # read-only flag of each open 'async with' block, innermost last
+        self._blocks: List[bool] = []
+        self._scoped = False
+        self._failed = False
+        # callbacks run in the transaction just before it commits, by key
+        self._before_commit: Dict[
+            Hashable, Callable[[AsyncSession], Awaitable[None]]
+        ] = {}
+        # callbacks run once the transaction committed, by key
+        self._after_commit: Dict[Hashable, Callable[[], Awaitable[None]]] = {}
 
-    async def __aenter__(self) -> "AsyncUnitOfWork":
-        # Create a new session when entering the context
-        self.session = self.session_factory()
+    def readonly(self) -> "AsyncUnitOfWork":
+        """
+        Mark the next 'async with' block as read-only: it runs in a
+        READ ONLY transaction that is released instead of committed.
+        """
+        self.read_only = True
         return self
 
-    # async def __aexit__(self, exc_type, exc_value, traceback):
-    #     # Clean up the session
-    #     if self.session:
-    #         if exc_type is not None:
-    #             await self.session.rollback()
-    #         await self.session.close()
-    #         self.session = None
+    def _open_session(self, read_only: bool) -> AsyncSession:
+        # the connection is only checked out on the first query
+        if read_only and self.router:
+            return self.read_only_session_factory(bind=self.router.read_engine())
+        if read_only:
+            return self.read_only_session_factory()
+        return self.session_factory()
+
+    async def __aenter__(self) -> "AsyncUnitOfWork":
+        read_only, self.read_only = self.read_only, False
+        if self.session is not None and self._session_read_only and not read_only:
+            if self._blocks:
+                raise RuntimeError("Cannot write inside a read-only block")
+            # the request scope only read so far: switch to a write session
+            await self.session.close()
+            self.session = None
+        if self.session is None:
+            self.session = self._open_session(read_only)
+            self._session_read_only = read_only
+        self._blocks.append(read_only)
+        return self
 
     async def __aexit__(self, exc_type, exc_value, traceback):
-        if exc_type is None:
+        self._blocks.pop()
+        if self._blocks:
+            # nested block: the outermost block decides
+            return
+        if not self._scoped:
+            await self._finish(success=exc_type is None)
+        elif exc_type is not None and not self._session_read_only:
+            # a failed write block fails the whole request transaction
+            await self.rollback()
+            self._failed = True
+
+    async def _finish(self, success: bool):
+        """
+        Commit or roll back the session and close it.
+        """
+        try:
+            if self.session is None or self._session_read_only:
+                # nothing to commit, closing the session rolls back and
+                # returns the connection to the pool
+                pass
+            elif success:
+                try:
+                    for callback in self._before_commit.values():
+                        await callback(self.session)
+                    await self.commit()
+                except Exception:
+                    await self.rollback()
+                    raise
+                record_write()
+                await self._run_after_commit()
+            else:
+                await self.rollback()
+        finally:
+            self._before_commit.clear()
+            self._after_commit.clear()
+            if self.session:
+                await self.session.close()
+            self.session = None
+            self._session_read_only = False
+
+    @property
+    def in_write_transaction(self) -> bool:
+        """
+        Whether a write session is open, whose reads may see its own
+        uncommitted changes.
+        """
+        return self.session is not None and not self._session_read_only
+
+    def before_commit(
+        self, key: Hashable, callback: Callable[[AsyncSession], Awaitable[None]]
+    ):
+        """
+        Run callback with the session as the last statements of the current
+        transaction, e.g. to NOTIFY of its writes; if it fails, the
+        transaction rolls back. Callbacks registered under the same key
+        run once.
+        """
+        self._before_commit.setdefault(key, callback)
+
+    def after_commit(self, key: Hashable, callback: Callable[[], Awaitable[None]]):
+        """
+        Run callback after the current transaction commits, e.g. to
+        invalidate caches; it is dropped if the transaction rolls back.
+        Callbacks registered under the same key run once.
+        """
+        self._after_commit.setdefault(key, callback)
+
+    async def _run_after_commit(self):
+        for callback in self._after_commit.values():
             try:
-                await self.commit()
+                await callback()
             except Exception:
-                await self.rollback()
-                raise
-        else:
-            await self.rollback()
+                # the transaction is committed already
+                logger.exception("After commit callback failed")
 
-        if self.session:
-            await self.session.close()
+    @asynccontextmanager
+    async def request_scope(self) -> AsyncIterator["AsyncUnitOfWork"]:
+        """
+        Share one lazily opened session between all blocks of a request.
+        Blocks inside the scope neither commit nor close; the scope commits
+        once at its end, or rolls back if it or any write block failed.
+        After the scope the unit of work is standalone again.
+        """
+        self._scoped = True
+        self._failed = False
+        success = False
+        try:
+            yield self
+            success = not self._failed
+        finally:
+            self._scoped = False
+            await self._finish(success)
+
+    @asynccontextmanager
+    async def savepoint(self) -> AsyncIterator["AsyncUnitOfWork"]:
+        """
+        Run part of an open block in a SAVEPOINT: if it raises, only its
+        changes are rolled back and the transaction stays usable.
+        """
+        if self.session is None or not self._blocks:
+            raise RuntimeError("savepoint() must be used inside an 'async with' block")
+        async with self.session.begin_nested():
+            yield self
 
     async def commit(self):
         if self.session:
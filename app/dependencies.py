@@ -6,19 +6,36 @@ from typing import AsyncGenerator, Callable, Type, TypeVar
 
 from fastapi import Depends
 
-from app.db.database_async import AsyncSessionLocal
+from app.db.database_async import (
+    AsyncReadOnlySessionLocal,
+    AsyncSessionLocal,
+    get_replica_router,
+)
 from app.db.unit_of_work import AsyncUnitOfWork
 
 
+def create_unit_of_work() -> AsyncUnitOfWork:
+    """
+    Standalone unit of work on the application's engines,
+    e.g. for jobs running outside of a request.
+    """
+    router = get_replica_router()
+    return AsyncUnitOfWork(
+        session_factory=AsyncSessionLocal,
+        read_only_session_factory=AsyncReadOnlySessionLocal,
+        router=router,
+    )
+
+
 async def get_async_unit_of_work() -> AsyncGenerator[AsyncUnitOfWork, None]:
     """
-    Dependency to get Async Unit of Work
+    Dependency to get Async Unit of Work.
+    All services of a request share it and its session,
+    the transaction is committed once when the request ends.
     """
-    uow = AsyncUnitOfWork(session_factory=AsyncSessionLocal)
-    try:
+    uow = create_unit_of_work()
+    async with uow.request_scope():
         yield uow
-    finally:
-        pass
 
 
 # Generic Type for Services
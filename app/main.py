@@ -2,23 +2,97 @@
 app main
 """
 
+import asyncio
+import logging
 import os
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 import app.utils.config as config
+from app.db.database import Base
+from app.db.database_async import (
+    PGBOUNCER,
+    dispose_engines,
+    get_replica_router,
+    warm_up_engines,
+)
+from app.db.reference_cache import listen_for_invalidations
+from app.dependencies import create_unit_of_work
+from app.middleware import (
+    InFlightMiddleware,
+    in_flight_requests,
+    read_your_writes_middleware,
+)
 from app.routes.announce_route import router as announce_router
 from app.routes.auth_route import router as auth_router
+from app.routes.batch_route import router as batch_router
 from app.routes.buidling_route import router as building_router
+from app.routes.metrics_route import router as metrics_router
 from app.routes.payment_order_route import router as payment_order_router
 from app.routes.repair_order_route import router as repair_order_router
 
 # from app.routes.item_route import router as item_router
 from app.routes.site_route import router as site_router
 from app.routes.value_route import router as value_router
+from app.service.building_service import BuildingService
+from app.service.site_service import SiteService
+from app.service.site_summary_service import reconcile_periodically
+from app.utils.total_count import TOTAL_COUNT_HEADER, TOTAL_COUNT_TYPE_HEADER
+
+logger = logging.getLogger(__name__)
+
 
-app = FastAPI(title="guard api", description="guard api doc", version="0.0.2")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Warm up the connection pools, preload the reference data cache and
+    start the background tasks on startup;
+    on shutdown drain in-flight requests, which still need the cache
+    invalidations of the tasks, then stop the tasks and close the pools.
+    """
+    try:
+        await warm_up_engines(Base.metadata, config.DB_POOL_WARMUP)
+    except Exception:
+        # requests open their connections on demand as before
+        logger.exception("Connection pool warm-up failed")
+    try:
+        uow = create_unit_of_work()
+        await SiteService(uow).get_sites()
+        await BuildingService(uow).get_buildings(None)
+    except Exception:
+        # loaded by the first request instead
+        logger.exception("Reference data preload failed")
+    tasks = []
+    if not PGBOUNCER:
+        # LISTEN needs a session connection, in PgBouncer mode the cache
+        # relies on its TTL and this worker's own writes
+        tasks.append(
+            asyncio.create_task(listen_for_invalidations(get_replica_router().primary))
+        )
+    if config.SUMMARY_RECONCILE_SECONDS > 0:
+        tasks.append(
+            asyncio.create_task(
+                reconcile_periodically(
+                    create_unit_of_work, config.SUMMARY_RECONCILE_SECONDS
+                )
+            )
+        )
+    yield
+    if not await in_flight_requests.drain(config.SHUTDOWN_DRAIN_SECONDS):
+        logger.warning(
+            "Shutting down with %s requests still in flight", in_flight_requests.count
+        )
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await dispose_engines()
+
+
+app = FastAPI(
+    title="guard api", description="guard api doc", version="0.0.2", lifespan=lifespan
+)
 
 # Ensure upload dir exists
 os.makedirs(config.UPLOAD_DIR, exist_ok=True)
@@ -31,7 +105,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "X-Next-Cursor",
+        config.READ_YOUR_WRITES_HEADER,
+        TOTAL_COUNT_HEADER,
+        TOTAL_COUNT_TYPE_HEADER,
+        "X-Cache",
+        "ETag",
+        "Last-Modified",
+    ],
 )
+app.middleware("http")(read_your_writes_middleware)
+app.add_middleware(InFlightMiddleware)
 
 
 app.include_router(auth_router)
@@ -41,4 +126,6 @@ app.include_router(announce_router)
 app.include_router(repair_order_router)
 app.include_router(value_router)
 app.include_router(payment_order_router)
+app.include_router(batch_router)
+app.include_router(metrics_router)
 # app.include_router(item_router)
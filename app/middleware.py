@@ -0,0 +1,107 @@
+"""
+middleware for app
+"""
+
+import asyncio
+import time
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+import app.utils.config as config
+from app.db.pool_metrics import set_request_scope
+from app.db.routing import is_pin_active, start_routing_context
+
+
+async def read_your_writes_middleware(request: Request, call_next):
+    """
+    Route the reads of a client that just wrote to the primary database.
+    After a write the client gets a cookie (and header) with the expiry of
+    the pin; sending either back keeps its reads on the primary until then.
+    """
+    pinned_until = request.cookies.get(
+        config.READ_YOUR_WRITES_COOKIE
+    ) or request.headers.get(config.READ_YOUR_WRITES_HEADER)
+    context = start_routing_context(pin_primary=is_pin_active(pinned_until))
+
+    response = await call_next(request)
+
+    if context.wrote:
+        expires = str(int(time.time()) + config.READ_YOUR_WRITES_SECONDS)
+        response.set_cookie(
+            config.READ_YOUR_WRITES_COOKIE,
+            expires,
+            max_age=config.READ_YOUR_WRITES_SECONDS,
+            httponly=True,
+        )
+        response.headers[config.READ_YOUR_WRITES_HEADER] = expires
+    return response
+
+
+class InFlightRequests:
+    """
+    Count the requests being served, so shutdown can wait for them.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.draining = False
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def start(self):
+        self.count += 1
+        self._idle.clear()
+
+    def finish(self):
+        self.count -= 1
+        if self.count == 0:
+            self._idle.set()
+
+    async def drain(self, timeout: float) -> bool:
+        """
+        Refuse new requests and wait up to timeout seconds for the
+        in-flight ones. Returns False if some are still running.
+        """
+        self.draining = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+
+in_flight_requests = InFlightRequests()
+
+
+class InFlightMiddleware:
+    """
+    ASGI middleware tracking in-flight requests until their response,
+    streamed bodies included, is fully sent. It also labels the pool
+    metrics of the request with its route.
+    """
+
+    def __init__(self, app: ASGIApp, tracker: InFlightRequests = in_flight_requests):
+        self.app = app
+        self.tracker = tracker
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if self.tracker.draining:
+            response = JSONResponse(
+                {"detail": "Server is shutting down"},
+                status_code=503,
+                headers={"Connection": "close"},
+            )
+            await response(scope, receive, send)
+            return
+
+        set_request_scope(scope)
+        self.tracker.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.tracker.finish()
@@ -2,7 +2,7 @@
 announce model
 """
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, func
 from sqlalchemy.orm import relationship
 
 from app.db.database import Base
@@ -17,6 +17,18 @@ class Announce(Base):
     severity = Column(Integer, nullable=False)
     content_path = Column(String(600))
     publish_date = Column(DateTime)
+    # optimistic concurrency: bumped by every update, see BaseService.update
+    version = Column(Integer, nullable=False, server_default="1")
+    # set on insert and by every update, see BaseService.list_version;
+    # timestamptz, as now() is in the session's time zone
+    updated_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
 
     # Relationship with Site
     site = relationship("Site", back_populates="announcements")
+
+    __mapper_args__ = {"version_id_col": version}
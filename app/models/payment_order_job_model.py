@@ -0,0 +1,30 @@
+"""
+payment_order_job model
+"""
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+
+from app.db.database import Base
+
+
+class PaymentOrderJob(Base):
+    """
+    Payment order generation job: one billing period and payment item of a site
+    """
+
+    __tablename__ = "payment_order_job"
+
+    id = Column(String(64), primary_key=True, nullable=False)
+    site_id = Column(String(64), ForeignKey("site.site_id"), nullable=False)
+    period = Column(String(20), nullable=False)
+    payment_item = Column(String(60), nullable=False)
+    amount_rule = Column(String(20), nullable=False)
+    amount = Column(Integer, nullable=True)
+    # pending, running, done, skipped or failed
+    status = Column(String(20), nullable=False)
+    created_count = Column(Integer, nullable=True)
+    message = Column(String(200), nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    # set when a run claims the job, see PaymentOrderJobRepository.expire_stale
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
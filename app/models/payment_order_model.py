@@ -2,7 +2,7 @@
 payment_order model
 """
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, func
 from sqlalchemy.orm import relationship
 
 from app.db.database import Base
@@ -22,9 +22,21 @@ class PaymentOrder(Base):
     status = Column(String(20), nullable=False)
     created_at = Column(DateTime)
     created_by = Column(String(64))
+    # optimistic concurrency: bumped by every update, see BaseService.update
+    version = Column(Integer, nullable=False, server_default="1")
+    # set on insert and by every update, see BaseService.list_version;
+    # timestamptz, as now() is in the session's time zone
+    updated_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
 
     # relationship to site
     site = relationship("Site")
 
     # relationship to building
     building = relationship("Building", back_populates="payment_orders")
+
+    __mapper_args__ = {"version_id_col": version}
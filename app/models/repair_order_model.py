@@ -2,7 +2,7 @@
 repair_order model
 """
 
-from sqlalchemy import Column, DateTime, ForeignKey, String
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, func
 from sqlalchemy.orm import relationship
 
 from app.db.database import Base
@@ -23,6 +23,18 @@ class RepairOrder(Base):
     status = Column(String(20), nullable=False)
     created_at = Column(DateTime, nullable=True)
     created_by = Column(String(64), nullable=True)
+    # optimistic concurrency: bumped by every update, see BaseService.update
+    version = Column(Integer, nullable=False, server_default="1")
+    # set on insert and by every update, see BaseService.list_version;
+    # timestamptz, as now() is in the session's time zone
+    updated_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
 
     # Relationship with Site
     site = relationship("Site", back_populates="repair_orders")
+
+    __mapper_args__ = {"version_id_col": version}
@@ -0,0 +1,24 @@
+"""
+site_summary model
+"""
+
+from sqlalchemy import BigInteger, Column, String
+
+from app.db.database import Base
+
+
+class SiteSummary(Base):
+    """
+    Counters of a site kept current by database triggers on the order and
+    announce tables (migrations/003_site_summary.sql), e.g. metric
+    "payment_order_unpaid" with dimension building_id.
+    """
+
+    __tablename__ = "site_summary"
+
+    site_id = Column(String(64), primary_key=True)
+    metric = Column(String(40), primary_key=True)
+    dimension = Column(String(64), primary_key=True)
+    sub_dimension = Column(String(64), primary_key=True, server_default="")
+    count = Column(BigInteger, nullable=False, server_default="0")
+    amount = Column(BigInteger, nullable=False, server_default="0")
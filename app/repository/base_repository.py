@@ -2,15 +2,140 @@
 base repository
 """
 
-from typing import Any, Dict, Generic, List, Optional, Tuple, Type, TypeVar
-
+import json
+import operator
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    FrozenSet,
+    Generic,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+)
+
+from pydantic import BaseModel
+from sqlalchemy import (
+    Integer,
+    and_,
+    bindparam,
+    delete,
+    false,
+    func,
+    inspect,
+    literal_column,
+    or_,
+    text,
+    update,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import DeclarativeBase, joinedload
+from sqlalchemy.orm import DeclarativeBase, Load
 from sqlalchemy.sql import Select, asc, desc
 
+import app.utils.config as config
+from app.db.explain import Explain
+from app.repository.row_plan import get_row_plan
+from app.utils.cursor import decode_cursor, encode_cursor
+from app.utils.lru import LRUCache
+
 ModelType = TypeVar("ModelType", bound=DeclarativeBase)
 
+# filter operator -> clause builder, see BaseRepository._apply_filters
+FILTER_OPERATORS: Dict[str, Callable[[Any, Any], Any]] = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    "<": operator.lt,
+    ">=": operator.ge,
+    "<=": operator.le,
+    "IN": lambda column, param: column.in_(param),
+    "in": lambda column, param: column.in_(param),
+    "NOT IN": lambda column, param: ~column.in_(param),
+    "not in": lambda column, param: ~column.in_(param),
+}
+EXPANDING = {"in", "not in"}
+# operators compiled to IS NULL / IS NOT NULL for a None value
+NULL_OPERATORS: Dict[str, Callable[[Any], Any]] = {
+    "=": lambda column: column.is_(None),
+    "!=": lambda column: column.is_not(None),
+}
+
+
+def _is_null_filter(op: str, value: Any) -> bool:
+    return value is None and op in NULL_OPERATORS
+
+
+def _filters_key(filters: Optional[Dict[Tuple[str, str], Any]]) -> Tuple:
+    """
+    Cache key part for filters: their (field, operator) keys and whether
+    each compiles to an IS (NOT) NULL test.
+    """
+    return tuple(
+        (field, op, _is_null_filter(op, value))
+        for (field, op), value in (filters or {}).items()
+    )
+
+
+# aggregate function name -> sql function, see BaseRepository.aggregate
+AGGREGATE_FUNCTIONS: Dict[str, Callable[..., Any]] = {
+    "count": func.count,
+    "sum": func.sum,
+    "min": func.min,
+    "max": func.max,
+    "avg": func.avg,
+}
+DATE_TRUNC_UNITS = {"hour", "day", "week", "month", "quarter", "year"}
+
+# loader strategy name -> sqlalchemy loader option
+LOADER_OPTIONS = {
+    "joined": "joinedload",
+    "selectin": "selectinload",
+    "subquery": "subqueryload",
+    "lazy": "lazyload",
+    "raise": "raiseload",
+    "noload": "noload",
+}
+
+
+# statements keyed by model and query shape, see BaseRepository._statement
+_statement_cache: LRUCache[Select] = LRUCache(max_size=config.STATEMENT_CACHE_SIZE)
+
+
+def _relations_key(load_relations: Optional[List[str] | Dict[str, str]]) -> Tuple:
+    if isinstance(load_relations, dict):
+        return tuple(load_relations.items())
+    return tuple(load_relations or ())
+
+
+def _shape_key(
+    filters: Optional[Dict[Tuple[str, str], Any]],
+    order_by: Optional[Dict[str, str]],
+    limit: Optional[int],
+    offset_or_cursor: Any,
+) -> Tuple:
+    """
+    Cache key part for the shape of a query, without the parameter values.
+    """
+    return (
+        _filters_key(filters),
+        tuple((order_by or {}).items()),
+        limit is not None,
+        offset_or_cursor is not None,
+    )
+
+
+def _null_positions(values: Optional[List[Any]]) -> FrozenSet[int]:
+    """
+    Positions of the NULL values of a keyset cursor, part of the shape
+    of the statement.
+    """
+    return frozenset(i for i, value in enumerate(values or ()) if value is None)
+
 
 class InvalidRelationError(Exception):
     pass
@@ -25,100 +150,138 @@ class BaseRepository(Generic[ModelType]):
         self.session = session
         self.model = model
 
-    def _apply_load_relations(self, query: Select, load_relations: Optional[List[str]]):
+    def _resolve_relation(self, model: Type[Any], name: str) -> Any:
         """
-        Apply relationship loading options to a query.
+        Return the relationship attribute 'name' of a model.
         """
-        if load_relations:
-            for relation in load_relations:
-                if hasattr(self.model, relation):
-                    query = query.options(joinedload(getattr(self.model, relation)))
-                else:
-                    raise InvalidRelationError(
-                        f"'{self.model.__name__}' has no relationship '{relation}'"
-                    )
-        return query
+        if name not in inspect(model).relationships:
+            raise InvalidRelationError(
+                f"'{model.__name__}' has no relationship '{name}'"
+            )
+        return getattr(model, name)
 
-    def _apply_load_relations2(
-        self, query: Select, load_relations: Optional[List[str]]
+    def _apply_load_relations(
+        self,
+        query: Select,
+        load_relations: Optional[List[str] | Dict[str, str]],
     ) -> Select:
         """
         Apply relationship loading options to a query, supporting nested relations.
+        load_relations maps a (dotted) relation path to a loader strategy,
+        '*' sets the strategy for every relation not listed; the unlisted
+        relations on a dotted path take the path's strategy.
+        A plain list of relations is loaded with 'joined'.
         Example:
-            load_relations=["site", "site.owner", "comments.author"]
+            load_relations={"site": "selectin", "site.buildings": "selectin", "*": "raise"}
         """
         if not load_relations:
             return query
+        if not isinstance(load_relations, dict):
+            load_relations = {relation: "joined" for relation in load_relations}
+
+        default = load_relations.get("*")
+        for relation_path, strategy in load_relations.items():
+            if relation_path == "*":
+                query = query.options(
+                    getattr(Load(self.model), self._get_loader(strategy))("*")
+                )
+                continue
 
-        for relation_path in load_relations:
             parts = relation_path.split(".")
             current_model = self.model
-            current_loader = joinedload(getattr(current_model, parts[0], None))
-
-            if not hasattr(current_model, parts[0]):
-                raise InvalidRelationError(
-                    f"'{current_model.__name__}' has no relationship '{parts[0]}'"
-                )
-
-            for part in parts[1:]:
-                current_model = getattr(current_model, part, None)
-                if current_model is None:
-                    raise InvalidRelationError(
-                        f"'{current_model.__name__}' has no relationship '{part}'"
-                    )
-                current_loader = current_loader.joinedload(part)
+            option = Load(self.model)
+            for depth, part in enumerate(parts):
+                attr = self._resolve_relation(current_model, part)
+                path = ".".join(parts[: depth + 1])
+                if path in load_relations:
+                    loader = self._get_loader(load_relations[path])
+                else:
+                    # an unlisted intermediate relation is loaded alike, the
+                    # '*' default would not load it
+                    loader = self._get_loader(strategy)
+                option = getattr(option, loader)(attr)
+                current_model = attr.property.mapper.class_
 
-            query = query.options(current_loader)
+            # relations of the loaded objects fall back to the default as well
+            if default:
+                option = getattr(option, self._get_loader(default))("*")
+            query = query.options(option)
 
         return query
 
+    def _get_loader(self, strategy: str) -> str:
+        """
+        Map a loader strategy name to the loader option name.
+        """
+        if strategy not in LOADER_OPTIONS:
+            raise ValueError(f"Unsupported loader strategy: {strategy}")
+        return LOADER_OPTIONS[strategy]
+
     def _apply_filters(
         self, query: Select, filters: Optional[Dict[Tuple[str, str], Any]]
     ):
         """
-        Apply dynamic filters to a query.
+        Apply dynamic filters to a query as bound parameters.
         Supports operators like '=', '>=', '<=', 'IN', etc.
+        Only the (field, operator) keys are used, pass the values with
+        _filter_params so that the statement can be cached and reused;
+        except that '=' and '!=' with a None value compile to IS NULL and
+        IS NOT NULL, see _filters_key.
         """
         if filters:
-            for (field, operator), value in filters.items():
+            for index, ((field, op), value) in enumerate(filters.items()):
                 if not hasattr(self.model, field):
                     raise InvalidColumnError(
                         f"'{self.model.__name__}' has no column '{field}'"
                     )
+                if op not in FILTER_OPERATORS:
+                    raise ValueError(f"Unsupported operator: {op}")
                 column = getattr(self.model, field)
-
-                if operator == "=":
-                    query = query.where(column == value)
-                elif operator == "!=":
-                    query = query.where(column != value)
-                elif operator == ">":
-                    query = query.where(column > value)
-                elif operator == "<":
-                    query = query.where(column < value)
-                elif operator == ">=":
-                    query = query.where(column >= value)
-                elif operator == "<=":
-                    query = query.where(column <= value)
-                elif operator == "IN" or operator == "in":
-                    query = query.where(column.in_(value))
-                elif operator == "NOT IN" or operator == "not in":
-                    query = query.where(~column.in_(value))
-                else:
-                    raise ValueError(f"Unsupported operator: {operator}")
+                if _is_null_filter(op, value):
+                    query = query.where(NULL_OPERATORS[op](column))
+                    continue
+                param = bindparam(
+                    f"f{index}_{field}", expanding=op.lower() in EXPANDING
+                )
+                query = query.where(FILTER_OPERATORS[op](column, param))
         return query
 
+    def _filter_params(
+        self, filters: Optional[Dict[Tuple[str, str], Any]]
+    ) -> Dict[str, Any]:
+        """
+        Bound parameter values for a query built by _apply_filters.
+        """
+        if not filters:
+            return {}
+        return {
+            f"f{index}_{field}": value
+            for index, ((field, op), value) in enumerate(filters.items())
+            if not _is_null_filter(op, value)
+        }
+
     def _apply_pagination(
         self, query: Select, limit: Optional[int], offset: Optional[int]
     ) -> Select:
         """
-        Apply pagination to a query.
+        Apply pagination to a query as bound parameters, see _pagination_params.
         """
         if limit is not None:
-            query = query.limit(limit)
+            query = query.limit(bindparam("_limit", type_=Integer))
         if offset is not None:
-            query = query.offset(offset)
+            query = query.offset(bindparam("_offset", type_=Integer))
         return query
 
+    def _pagination_params(
+        self, limit: Optional[int], offset: Optional[int]
+    ) -> Dict[str, Any]:
+        params = {}
+        if limit is not None:
+            params["_limit"] = limit
+        if offset is not None:
+            params["_offset"] = offset
+        return params
+
     def _apply_sorting(
         self, query: Select, order_by: Optional[Dict[str, str]] = None
     ) -> Select:
@@ -142,6 +305,98 @@ class BaseRepository(Generic[ModelType]):
                     raise ValueError(f"Invalid sorting direction: {direction}")
         return query
 
+    def _keyset_order(self, order_by: Optional[Dict[str, str]]) -> Dict[str, str]:
+        """
+        Return the sort order used for keyset pagination: the requested
+        columns followed by the primary key, so that the order is total.
+        """
+        sort_keys = dict(order_by or {})
+        for column in inspect(self.model).primary_key:
+            sort_keys.setdefault(column.key, "asc")
+        return sort_keys
+
+    def _keyset_nullable(self, name: str) -> bool:
+        return inspect(self.model).columns[name].nullable
+
+    def _apply_keyset_sorting(self, query: Select, sort_keys: Dict[str, str]) -> Select:
+        """
+        Sort by the keyset columns, with NULL after all values ascending
+        and before them descending, as Postgres (and its indexes) does by
+        default; _apply_keyset relies on that position.
+        """
+        for name, direction in sort_keys.items():
+            column = getattr(self.model, name)
+            if direction not in ("asc", "desc"):
+                raise ValueError(f"Invalid sorting direction: {direction}")
+            order = asc(column) if direction == "asc" else desc(column)
+            if self._keyset_nullable(name):
+                order = (
+                    order.nulls_last() if direction == "asc" else order.nulls_first()
+                )
+            query = query.order_by(order)
+        return query
+
+    def _apply_keyset(
+        self,
+        query: Select,
+        sort_keys: Dict[str, str],
+        null_keys: FrozenSet[int] = frozenset(),
+    ) -> Select:
+        """
+        Restrict a query to the rows after the cursor values, bound as
+        parameters k0, k1 ...
+        Expands to (a > :k0) OR (a = :k0 AND b > :k1) ... so that mixed
+        asc/desc directions are supported, and ANDed with the bound
+        a >= :k0 of the leading key alone, which an index scan can start
+        from (the expansion is no range). NULL sorts after every value:
+        null_keys, the positions of the cursor values that are NULL, are
+        compared with IS NULL / IS NOT NULL instead of parameters, and
+        nullable columns also match NULL after a value ascending.
+        """
+        names = list(sort_keys)
+        columns = [getattr(self.model, name) for name in names]
+        params = [bindparam(f"k{i}") for i in range(len(columns))]
+        clauses = []
+        for i, direction in enumerate(sort_keys.values()):
+            equals = [
+                columns[j].is_(None) if j in null_keys else columns[j] == params[j]
+                for j in range(i)
+            ]
+            if i in null_keys:
+                if direction == "asc":
+                    # nothing sorts after NULL
+                    continue
+                after = columns[i].is_not(None)
+            elif direction == "asc":
+                after = columns[i] > params[i]
+                if self._keyset_nullable(names[i]):
+                    after = or_(after, columns[i].is_(None))
+            else:
+                after = columns[i] < params[i]
+            clauses.append(and_(*equals, after))
+        if not clauses:
+            return query.where(false())
+        leading = next(iter(sort_keys.values()))
+        if 0 in null_keys:
+            if leading == "asc":
+                query = query.where(columns[0].is_(None))
+        elif leading == "asc":
+            bound = columns[0] >= params[0]
+            if self._keyset_nullable(names[0]):
+                bound = or_(bound, columns[0].is_(None))
+            query = query.where(bound)
+        else:
+            query = query.where(columns[0] <= params[0])
+        return query.where(or_(*clauses))
+
+    def _statement(self, key: Tuple[Any, ...], build: Callable[[], Select]) -> Select:
+        """
+        Return the cached statement for a query shape, building it on a miss.
+        Reusing the same statement object lets SQLAlchemy skip both the
+        Python-side construction and the compilation of hot queries.
+        """
+        return _statement_cache.get_or_create((self.model, *key), build)
+
     async def get_all(self) -> list[ModelType]:
         """
         Get all records for the model.
@@ -169,13 +424,129 @@ class BaseRepository(Generic[ModelType]):
         if not obj:
             return None
 
-        # Update fields dynamically
+        return await self.update_obj(obj, update_data)
+
+    async def update_obj(self, obj: ModelType, update_data: dict) -> ModelType:
+        """
+        Set the fields of a loaded record and flush the change.
+        """
         for field, value in update_data.items():
             if hasattr(obj, field):
-                print(f"update '{field}' with '{value}'")
                 setattr(obj, field, value)
+        await self.session.flush()
+        return obj
 
-        return obj  # Changes will be persisted when session.commit() is called
+    def primary_key_names(self) -> List[str]:
+        mapper = inspect(self.model)
+        return [
+            mapper.get_property_by_column(column).key for column in mapper.primary_key
+        ]
+
+    def version_key(self) -> Optional[str]:
+        """
+        Attribute of the model's version_id_col, if it is versioned.
+        """
+        mapper = inspect(self.model)
+        if mapper.version_id_col is None:
+            return None
+        return mapper.get_property_by_column(mapper.version_id_col).key
+
+    async def update_returning(
+        self,
+        update_data: dict,
+        expected_version: Optional[int] = None,
+        **primary_key_values: Any,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Update a record by primary keys in a single
+        UPDATE ... SET ... WHERE pk RETURNING statement, without loading it.
+        With expected_version the update only applies if a versioned
+        record is still at that version.
+        :return: The updated row as a dict of columns or None if not found
+                 (or not at the expected version).
+        """
+        filters = {(key, "="): value for key, value in primary_key_values.items()}
+        version_key = self.version_key()
+        if version_key and expected_version is not None:
+            filters[(version_key, "=")] = expected_version
+        rows = await self.update_where(update_data, filters)
+        return rows[0] if rows else None
+
+    async def update_where(
+        self, update_data: dict, filters: Dict[Tuple[str, str], Any]
+    ) -> List[Dict[str, Any]]:
+        """
+        Set-based UPDATE ... SET ... WHERE <filters> RETURNING of all columns.
+        Fields that are not columns of the model are ignored and a
+        versioned model gets its version bumped.
+        :return: The updated rows as dicts of columns.
+        """
+        mapper = inspect(self.model)
+        version_key = self.version_key()
+        fields = tuple(
+            field
+            for field in update_data
+            if field in mapper.columns and field != version_key
+        )
+        columns = [getattr(self.model, column.key) for column in mapper.column_attrs]
+
+        def build():
+            if not fields:
+                return self._apply_filters(select(*columns), filters)
+            values = {
+                field: bindparam(f"v_{field}", type_=mapper.columns[field].type)
+                for field in fields
+            }
+            if version_key:
+                values[version_key] = getattr(self.model, version_key) + 1
+            statement = update(self.model).values(values).returning(*columns)
+            return self._apply_filters(statement, filters)
+
+        statement = self._statement(("update", fields, _filters_key(filters)), build)
+        params = {
+            **self._filter_params(filters),
+            **{f"v_{field}": update_data[field] for field in fields},
+        }
+        result = await self.session.execute(statement, params)
+        return [dict(row) for row in result.mappings()]
+
+    async def create_all(self, objs: List[ModelType]):
+        """
+        Add several new records and insert them in one flush.
+        """
+        self.session.add_all(objs)
+        await self.session.flush()
+
+    async def delete_where(self, filters: Dict[Tuple[str, str], Any]) -> List[Any]:
+        """
+        Set-based DELETE ... WHERE <filters>, without loading the records.
+        :return: The primary keys of the deleted rows.
+        """
+        key_columns = [getattr(self.model, key) for key in self.primary_key_names()]
+
+        def build():
+            statement = delete(self.model).returning(*key_columns)
+            return self._apply_filters(statement, filters)
+
+        statement = self._statement(("delete", _filters_key(filters)), build)
+        result = await self.session.execute(statement, self._filter_params(filters))
+        if len(key_columns) == 1:
+            return list(result.scalars())
+        return [tuple(row) for row in result]
+
+    async def try_advisory_lock(self, key: str) -> bool:
+        """
+        Take a transaction-level Postgres advisory lock on key without
+        waiting; it is released when the transaction ends.
+        :return: False if another transaction holds the lock. Databases
+                 without advisory locks always get it.
+        """
+        if self.session.get_bind().dialect.name != "postgresql":
+            return True
+        result = await self.session.execute(
+            select(func.pg_try_advisory_xact_lock(func.hashtext(key)))
+        )
+        return bool(result.scalar())
 
     async def delete(self, **primary_key_values: Any) -> None:
         """
@@ -198,19 +569,17 @@ class BaseRepository(Generic[ModelType]):
         """
         Fetch a single object by primary key(s) with optional relationship loading.
         """
-        query = select(self.model)
-        query = self._apply_load_relations(query, load_relations)
+        filters = {(key, "="): value for key, value in primary_key_values.items()}
 
-        # Apply primary key filters
-        for key, value in primary_key_values.items():
-            if hasattr(self.model, key):
-                query = query.where(getattr(self.model, key) == value)
-            else:
-                raise InvalidColumnError(
-                    f"'{self.model.__name__}' has no column '{key}'"
-                )
+        def build() -> Select:
+            query = select(self.model)
+            query = self._apply_load_relations(query, load_relations)
+            return self._apply_filters(query, filters)
 
-        result = await self.session.execute(query)
+        statement = self._statement(
+            ("get", _relations_key(load_relations), _filters_key(filters)), build
+        )
+        result = await self.session.execute(statement, self._filter_params(filters))
         return result.scalar_one_or_none()
 
     async def query(
@@ -224,11 +593,415 @@ class BaseRepository(Generic[ModelType]):
         """
         Perform a dynamic query with optional relationship loading and filters.
         """
-        query = select(self.model)
-        query = self._apply_load_relations(query, load_relations)
-        query = self._apply_filters(query, filters)
-        query = self._apply_pagination(query, limit, offset)
-        query = self._apply_sorting(query, order_by)
 
-        result = await self.session.execute(query)
+        def build() -> Select:
+            query = select(self.model)
+            query = self._apply_load_relations(query, load_relations)
+            query = self._apply_filters(query, filters)
+            query = self._apply_sorting(query, order_by)
+            return self._apply_pagination(query, limit, offset)
+
+        statement = self._statement(
+            (
+                "query",
+                _relations_key(load_relations),
+                *_shape_key(filters, order_by, limit, offset),
+            ),
+            build,
+        )
+        params = {
+            **self._filter_params(filters),
+            **self._pagination_params(limit, offset),
+        }
+        result = await self.session.execute(statement, params)
         return result.scalars().all()
+
+    def _apply_keyset_page(
+        self,
+        query: Select,
+        limit: Optional[int],
+        cursor_values: Optional[List[Any]],
+        sort_keys: Dict[str, str],
+    ) -> Select:
+        """
+        Apply keyset sorting, the cursor and the page limit to a query.
+        One extra row is fetched to find out whether there is a next page.
+        """
+        query = self._apply_keyset_sorting(query, sort_keys)
+        if cursor_values is not None:
+            query = self._apply_keyset(query, sort_keys, _null_positions(cursor_values))
+        return self._apply_pagination(
+            query, limit + 1 if limit is not None else None, None
+        )
+
+    def _decode_keyset_cursor(
+        self, cursor: Optional[str], sort_keys: Dict[str, str]
+    ) -> Optional[List[Any]]:
+        if not cursor:
+            return None
+        return decode_cursor(cursor, self._cursor_keys(sort_keys))
+
+    def _keyset_page_params(
+        self,
+        limit: Optional[int],
+        cursor_values: Optional[List[Any]],
+        sort_keys: Dict[str, str],
+    ) -> Dict[str, Any]:
+        params = self._pagination_params(limit + 1 if limit is not None else None, None)
+        if cursor_values is not None:
+            # NULL values are compared with IS NULL, not bound
+            params.update(
+                {
+                    f"k{i}": value
+                    for i, value in enumerate(cursor_values)
+                    if value is not None
+                }
+            )
+        return params
+
+    def _cursor_keys(self, sort_keys: Dict[str, str]) -> List[str]:
+        return [f"{name}:{direction}" for name, direction in sort_keys.items()]
+
+    def _split_page(
+        self,
+        rows: List[Any],
+        limit: Optional[int],
+        sort_keys: Dict[str, str],
+        get_value: Callable[[Any, str], Any],
+    ) -> Tuple[List[Any], Optional[str]]:
+        """
+        Drop the extra row of a page and build the cursor of the next page.
+        """
+        if limit is None or len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        values = [get_value(rows[-1], name) for name in sort_keys]
+        return rows, encode_cursor(self._cursor_keys(sort_keys), values)
+
+    async def query_page(
+        self,
+        load_relations: Optional[List[str]] = None,
+        filters: Optional[Dict[Tuple[str, str], Any]] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        order_by: Optional[Dict[str, str]] = None,
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """
+        Perform a dynamic query using keyset (cursor) pagination.
+        Returns the page and the cursor of the next page, if there is one.
+        """
+        sort_keys = self._keyset_order(order_by)
+        cursor_values = self._decode_keyset_cursor(cursor, sort_keys)
+
+        def build() -> Select:
+            query = select(self.model)
+            query = self._apply_load_relations(query, load_relations)
+            query = self._apply_filters(query, filters)
+            return self._apply_keyset_page(query, limit, cursor_values, sort_keys)
+
+        statement = self._statement(
+            (
+                "page",
+                _relations_key(load_relations),
+                *_shape_key(filters, sort_keys, limit, cursor_values),
+                _null_positions(cursor_values),
+            ),
+            build,
+        )
+        params = {
+            **self._filter_params(filters),
+            **self._keyset_page_params(limit, cursor_values, sort_keys),
+        }
+        result = await self.session.execute(statement, params)
+        return self._split_page(list(result.scalars().all()), limit, sort_keys, getattr)
+
+    def _rows_query(
+        self, schema: Type[BaseModel], extra_columns: Optional[List[str]] = None
+    ) -> Select:
+        """
+        Select only the columns the schema needs, plus extra model columns.
+        """
+        plan = get_row_plan(self.model, schema)
+        query = plan.select()
+        labels = {column.key for column in plan.columns}
+        for name in extra_columns or []:
+            if name not in labels:
+                query = query.add_columns(getattr(self.model, name).label(name))
+        return query
+
+    async def get_row_by_keys(
+        self, schema: Type[BaseModel], **primary_key_values: Any
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Fetch a single row by primary key(s) as a dict shaped like the schema,
+        without building ORM instances.
+        """
+        filters = {(key, "="): value for key, value in primary_key_values.items()}
+
+        def build() -> Select:
+            return self._apply_filters(self._rows_query(schema), filters)
+
+        statement = self._statement(("get_row", schema, _filters_key(filters)), build)
+        result = await self.session.execute(statement, self._filter_params(filters))
+        row = result.mappings().one_or_none()
+        if row is None:
+            return None
+        return get_row_plan(self.model, schema).to_dict(row)
+
+    async def query_rows(
+        self,
+        schema: Type[BaseModel],
+        filters: Optional[Dict[Tuple[str, str], Any]] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        order_by: Optional[Dict[str, str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Read-only variant of query: selects only the columns the schema needs
+        and returns dicts shaped like the schema instead of ORM instances.
+        """
+
+        def build() -> Select:
+            query = self._apply_filters(self._rows_query(schema), filters)
+            query = self._apply_sorting(query, order_by)
+            return self._apply_pagination(query, limit, offset)
+
+        statement = self._statement(
+            ("rows", schema, *_shape_key(filters, order_by, limit, offset)), build
+        )
+        params = {
+            **self._filter_params(filters),
+            **self._pagination_params(limit, offset),
+        }
+        result = await self.session.execute(statement, params)
+        plan = get_row_plan(self.model, schema)
+        return [plan.to_dict(row) for row in result.mappings().all()]
+
+    async def query_rows_page(
+        self,
+        schema: Type[BaseModel],
+        filters: Optional[Dict[Tuple[str, str], Any]] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        order_by: Optional[Dict[str, str]] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Read-only variant of query_page, see query_rows.
+        """
+        sort_keys = self._keyset_order(order_by)
+        cursor_values = self._decode_keyset_cursor(cursor, sort_keys)
+
+        def build() -> Select:
+            query = self._rows_query(schema, list(sort_keys))
+            query = self._apply_filters(query, filters)
+            return self._apply_keyset_page(query, limit, cursor_values, sort_keys)
+
+        statement = self._statement(
+            (
+                "rows_page",
+                schema,
+                *_shape_key(filters, sort_keys, limit, cursor_values),
+                _null_positions(cursor_values),
+            ),
+            build,
+        )
+        params = {
+            **self._filter_params(filters),
+            **self._keyset_page_params(limit, cursor_values, sort_keys),
+        }
+        result = await self.session.execute(statement, params)
+        rows, next_cursor = self._split_page(
+            list(result.mappings().all()), limit, sort_keys, operator.getitem
+        )
+        plan = get_row_plan(self.model, schema)
+        return [plan.to_dict(row) for row in rows], next_cursor
+
+    async def stream(
+        self,
+        load_relations: Optional[List[str]] = None,
+        filters: Optional[Dict[Tuple[str, str], Any]] = None,
+        order_by: Optional[Dict[str, str]] = None,
+        yield_per: int = 500,
+    ) -> AsyncIterator[List[ModelType]]:
+        """
+        Stream query results in chunks of yield_per rows using a server-side
+        cursor, so only one chunk is held in memory at a time.
+        """
+
+        def build() -> Select:
+            query = select(self.model)
+            query = self._apply_load_relations(query, load_relations)
+            query = self._apply_filters(query, filters)
+            return self._apply_sorting(query, order_by)
+
+        statement = self._statement(
+            (
+                "query",
+                _relations_key(load_relations),
+                *_shape_key(filters, order_by, None, None),
+            ),
+            build,
+        )
+        result = await self.session.stream(
+            statement,
+            self._filter_params(filters),
+            execution_options={"yield_per": yield_per},
+        )
+        async for objs in result.scalars().partitions():
+            yield objs
+
+    async def stream_rows(
+        self,
+        schema: Type[BaseModel],
+        filters: Optional[Dict[Tuple[str, str], Any]] = None,
+        order_by: Optional[Dict[str, str]] = None,
+        yield_per: int = 500,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Read-only variant of stream: yields chunks of dicts shaped like the schema.
+        """
+
+        def build() -> Select:
+            query = self._apply_filters(self._rows_query(schema), filters)
+            return self._apply_sorting(query, order_by)
+
+        statement = self._statement(
+            ("rows", schema, *_shape_key(filters, order_by, None, None)), build
+        )
+        result = await self.session.stream(
+            statement,
+            self._filter_params(filters),
+            execution_options={"yield_per": yield_per},
+        )
+        plan = get_row_plan(self.model, schema)
+        async for rows in result.mappings().partitions():
+            yield [plan.to_dict(row) for row in rows]
+
+    async def count_capped(
+        self, filters: Optional[Dict[Tuple[str, str], Any]], cap: int
+    ) -> int:
+        """
+        Count the filtered records, reading at most cap + 1 of them
+        (an index-only scan when an index covers the filters).
+        :return: The exact count if it is at most cap, else cap + 1.
+        """
+
+        def build() -> Select:
+            limited = self._apply_filters(select(literal_column("1")), filters)
+            limited = limited.select_from(self.model)
+            limited = limited.limit(bindparam("_cap", type_=Integer)).subquery()
+            return select(func.count()).select_from(limited)
+
+        statement = self._statement(("count_capped", _filters_key(filters)), build)
+        params = {**self._filter_params(filters), "_cap": cap + 1}
+        return (await self.session.execute(statement, params)).scalar_one()
+
+    async def estimate_count(
+        self, filters: Optional[Dict[Tuple[str, str], Any]] = None
+    ) -> Optional[int]:
+        """
+        Planner estimate of the number of filtered records: pg_class.reltuples
+        without filters, else the row estimate of EXPLAIN for the filter
+        values. None on databases other than Postgres or for a table never
+        analyzed.
+        """
+        if self.session.get_bind().dialect.name != "postgresql":
+            return None
+        if not filters:
+            result = await self.session.execute(
+                text(
+                    "SELECT reltuples::bigint FROM pg_class"
+                    " WHERE oid = to_regclass(:table_name)"
+                ),
+                {"table_name": self.model.__tablename__},
+            )
+            estimate = result.scalar()
+            if estimate is not None and estimate >= 0:
+                return estimate
+
+        def build() -> Select:
+            query = self._apply_filters(select(literal_column("1")), filters)
+            return query.select_from(self.model)
+
+        statement = self._statement(("estimate", _filters_key(filters)), build)
+        result = await self.session.execute(
+            Explain(statement), self._filter_params(filters)
+        )
+        plan = result.scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    def _group_column(self, group: str) -> Any:
+        """
+        Column of a group_by entry: "field", or "field:unit" for the
+        date_trunc(unit) bucket of a timestamp column.
+        """
+        field, _, unit = group.partition(":")
+        if not hasattr(self.model, field):
+            raise InvalidColumnError(f"'{self.model.__name__}' has no column '{field}'")
+        column = getattr(self.model, field)
+        if unit:
+            if unit not in DATE_TRUNC_UNITS:
+                raise ValueError(f"Unsupported date_trunc unit: {unit}")
+            # inlined (it is whitelisted) so that the select and group by
+            # expressions are identical to Postgres
+            column = func.date_trunc(literal_column(f"'{unit}'"), column)
+        return column.label(field)
+
+    def _aggregate_column(self, label: str, function: str, field: Optional[str]):
+        if function not in AGGREGATE_FUNCTIONS:
+            raise ValueError(f"Unsupported aggregate function: {function}")
+        if field is None:
+            if function != "count":
+                raise ValueError(f"Aggregate function {function} needs a column")
+            return func.count().label(label)
+        if not hasattr(self.model, field):
+            raise InvalidColumnError(f"'{self.model.__name__}' has no column '{field}'")
+        return AGGREGATE_FUNCTIONS[function](getattr(self.model, field)).label(label)
+
+    async def aggregate(
+        self,
+        group_by: Optional[List[str]] = None,
+        aggregates: Optional[Dict[str, Tuple[str, Optional[str]]]] = None,
+        filters: Optional[Dict[Tuple[str, str], Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Grouped aggregation computed in the database: one row per group,
+        however many records match.
+        Example:
+            group_by=["building_id", "created_at:month"],
+            aggregates={"count": ("count", None), "amount": ("sum", "amount")},
+            filters={("status", "="): "0"}
+        :param group_by: Columns, or "column:unit" to group a timestamp column
+                         by date_trunc(unit); each is labeled by its column.
+        :param aggregates: Result label -> (function, column); a count
+                           without a column is count(*). Defaults to a count.
+        :return: The groups as dicts ordered by the group columns.
+        """
+        group_by = group_by or []
+        aggregates = aggregates or {"count": ("count", None)}
+
+        def build() -> Select:
+            groups = [self._group_column(group) for group in group_by]
+            query = select(
+                *groups,
+                *(
+                    self._aggregate_column(label, function, field)
+                    for label, (function, field) in aggregates.items()
+                ),
+            ).select_from(self.model)
+            query = self._apply_filters(query, filters)
+            return query.group_by(*groups).order_by(*groups)
+
+        statement = self._statement(
+            (
+                "aggregate",
+                tuple(group_by),
+                tuple(aggregates.items()),
+                _filters_key(filters),
+            ),
+            build,
+        )
+        result = await self.session.execute(statement, self._filter_params(filters))
+        return [dict(row) for row in result.mappings()]
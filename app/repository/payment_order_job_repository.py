@@ -0,0 +1,61 @@
+"""
+payment_order_job repository
+"""
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.models.payment_order_job_model import PaymentOrderJob
+from app.repository.base_repository import BaseRepository
+
+ACTIVE_STATUSES = ("pending", "running")
+
+
+class PaymentOrderJobRepository(BaseRepository[PaymentOrderJob]):
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, PaymentOrderJob)
+
+    async def get_active(
+        self, site_id: str, period: str, payment_item: str
+    ) -> Optional[PaymentOrderJob]:
+        """
+        Fetch the pending or running job of a site, period and payment item.
+        """
+        result = await self.session.execute(
+            select(PaymentOrderJob)
+            .where(
+                PaymentOrderJob.site_id == site_id,
+                PaymentOrderJob.period == period,
+                PaymentOrderJob.payment_item == payment_item,
+                PaymentOrderJob.status.in_(ACTIVE_STATUSES),
+            )
+            .limit(1)
+        )
+        return result.scalars().first()
+
+    async def expire_stale(
+        self, site_id: str, period: str, payment_item: str, before: datetime
+    ) -> int:
+        """
+        Fail the pending or running jobs of a site, period and payment item
+        created (pending) or claimed (running) before the given time: their
+        run died with its worker or never started.
+        :return: The number of failed jobs.
+        """
+        result = await self.session.execute(
+            update(PaymentOrderJob)
+            .where(
+                PaymentOrderJob.site_id == site_id,
+                PaymentOrderJob.period == period,
+                PaymentOrderJob.payment_item == payment_item,
+                PaymentOrderJob.status.in_(ACTIVE_STATUSES),
+                func.coalesce(PaymentOrderJob.started_at, PaymentOrderJob.created_at)
+                < before,
+            )
+            .values(status="failed", message="Timed out", finished_at=datetime.now())
+        )
+        return result.rowcount
@@ -2,12 +2,382 @@
 payment_order repository
 """
 
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    and_,
+    cast,
+    exists,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    text,
+    update,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.models.building_model import Building
 from app.models.payment_order_model import PaymentOrder
 from app.repository.base_repository import BaseRepository
 
+# staging table of a csv import, private to the importing transaction
+payment_order_import = Table(
+    "payment_order_import",
+    MetaData(),
+    Column("line_no", Integer, nullable=False),
+    Column("id", String(64), nullable=False),
+    Column("site_id", String(64), nullable=False),
+    Column("building_id", String(64), nullable=False),
+    Column("house_no", String(60), nullable=False),
+    Column("house_owner", String(60), nullable=False),
+    Column("payment_item", String(60), nullable=False),
+    Column("amount", Integer, nullable=False),
+    Column("payment_due_date", String(20), nullable=False),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP",
+)
+
+IMPORT_COLUMNS = [column.name for column in payment_order_import.columns]
+
+# staging table of a reconciliation file (bank or convenience store remittances)
+payment_order_reconcile = Table(
+    "payment_order_reconcile",
+    MetaData(),
+    Column("line_no", Integer, nullable=False),
+    Column("building_id", String(64), nullable=True),
+    Column("house_no", String(60), nullable=False),
+    Column("amount", Integer, nullable=False),
+    Column("payment_due_date", String(20), nullable=False),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP",
+)
+
+RECONCILE_COLUMNS = [column.name for column in payment_order_reconcile.columns]
+
+
+class ReconcileResult(NamedTuple):
+    # (line number, payment order id) of the staged rows paying an order
+    paid: List[Tuple[int, str]]
+    # line numbers of the staged rows matching no unpaid payment order
+    unmatched: List[int]
+    # (line number, first line number) of the staged rows whose payment
+    # orders were paid by earlier rows
+    duplicates: List[Tuple[int, int]]
+    # line numbers of the staged rows matching more unpaid payment orders
+    # than there are such rows
+    ambiguous: List[int]
+
 
 class PaymentOrderRepository(BaseRepository[PaymentOrder]):
     def __init__(self, session: AsyncSession):
         super().__init__(session, PaymentOrder)
+
+    async def create_import_staging(self, table: Table = payment_order_import):
+        """
+        Create the temporary staging table of a csv import.
+        """
+        connection = await self.session.connection()
+        await connection.run_sync(table.create)
+
+    async def drop_import_staging(self, table: Table = payment_order_import):
+        connection = await self.session.connection()
+        await connection.run_sync(table.drop)
+
+    async def copy_import_rows(
+        self,
+        records: Sequence[Tuple[Any, ...]],
+        table: Table = payment_order_import,
+    ):
+        """
+        Load rows (in the order of the table's columns) into a staging
+        table, with COPY on asyncpg and a multi-row INSERT on other drivers.
+        """
+        columns = [column.name for column in table.columns]
+        connection = await self.session.connection()
+        raw_connection = await connection.get_raw_connection()
+        driver_connection = raw_connection.driver_connection
+        if hasattr(driver_connection, "copy_records_to_table"):
+            await driver_connection.copy_records_to_table(
+                table.name, records=records, columns=columns
+            )
+        else:
+            await self.session.execute(
+                insert(table), [dict(zip(columns, record)) for record in records]
+            )
+
+    async def analyze_staging(self, table: Table):
+        """
+        Collect planner statistics of a staging table; autovacuum never
+        analyzes temporary tables, and without row estimates Postgres
+        plans joins against them as if they were tiny.
+        """
+        if self.session.get_bind().dialect.name == "postgresql":
+            await self.session.execute(text(f"ANALYZE {table.name}"))
+
+    async def merge_import(
+        self, created_at: datetime, created_by: str
+    ) -> Tuple[int, List[int]]:
+        """
+        Insert the staged rows whose building belongs to their site into
+        payment_order with one INSERT ... SELECT.
+        :return: The number of inserted rows and the line numbers of the
+                 staged rows that were skipped for an unknown site/building.
+        """
+        stage = payment_order_import
+        building = Building.__table__
+        same_building = and_(
+            building.c.site_id == stage.c.site_id,
+            building.c.building_id == stage.c.building_id,
+        )
+        target = PaymentOrder.__table__
+        target_columns = [
+            *IMPORT_COLUMNS[1:],
+            "status",
+            "created_at",
+            "created_by",
+        ]
+        source = select(
+            *(stage.c[name] for name in IMPORT_COLUMNS[1:]),
+            literal("0"),
+            literal(created_at, DateTime),
+            literal(created_by),
+        ).join(building, same_building)
+
+        result = await self.session.execute(
+            insert(target).from_select(target_columns, source)
+        )
+        skipped = await self.session.execute(
+            select(stage.c.line_no)
+            .where(~exists().where(same_building))
+            .order_by(stage.c.line_no)
+        )
+        return result.rowcount, list(skipped.scalars())
+
+    async def generate_for_period(
+        self,
+        site_id: str,
+        period: str,
+        payment_item: str,
+        amount: Optional[int],
+        created_at: datetime,
+        created_by: str,
+    ) -> int:
+        """
+        Insert one payment order of payment_item due in period for each
+        household (building_id, house_no) of the site's buildings with one
+        INSERT ... SELECT. Households and their owner come from the latest
+        payment order of each house; with amount None the amount is taken
+        from the house's latest order of payment_item, and only houses
+        with one are billed. Houses that already have the order are
+        skipped, so running it again for a period inserts nothing.
+        :return: The number of inserted payment orders.
+        """
+        source = PaymentOrder.__table__.alias("household")
+        building = Building.__table__
+        ranked = (
+            select(
+                source.c.building_id,
+                source.c.house_no,
+                source.c.house_owner,
+                source.c.amount,
+                func.row_number()
+                .over(
+                    partition_by=(source.c.building_id, source.c.house_no),
+                    order_by=(
+                        source.c.created_at.desc().nulls_last(),
+                        source.c.id.desc(),
+                    ),
+                )
+                .label("rn"),
+            )
+            .join(
+                building,
+                and_(
+                    building.c.building_id == source.c.building_id,
+                    building.c.site_id == source.c.site_id,
+                ),
+            )
+            .where(source.c.site_id == site_id)
+        )
+        if amount is None:
+            ranked = ranked.where(source.c.payment_item == payment_item)
+        ranked = ranked.subquery("ranked")
+
+        target = PaymentOrder.__table__
+        existing = target.alias("existing")
+        already_generated = exists().where(
+            existing.c.site_id == site_id,
+            existing.c.building_id == ranked.c.building_id,
+            existing.c.house_no == ranked.c.house_no,
+            existing.c.payment_item == payment_item,
+            existing.c.payment_due_date == period,
+        )
+        source_rows = select(
+            cast(func.gen_random_uuid(), String),
+            literal(site_id),
+            ranked.c.building_id,
+            ranked.c.house_no,
+            ranked.c.house_owner,
+            literal(payment_item),
+            ranked.c.amount if amount is None else literal(amount, Integer),
+            literal(period),
+            literal("0"),
+            literal(created_at, DateTime),
+            literal(created_by),
+        ).where(ranked.c.rn == 1, ~already_generated)
+
+        result = await self.session.execute(
+            insert(target).from_select(
+                [
+                    "id",
+                    "site_id",
+                    "building_id",
+                    "house_no",
+                    "house_owner",
+                    "payment_item",
+                    "amount",
+                    "payment_due_date",
+                    "status",
+                    "created_at",
+                    "created_by",
+                ],
+                source_rows,
+            )
+        )
+        return result.rowcount
+
+    def _reconcile_pairs(self, site_id: str, with_building: bool):
+        """
+        The staged rows with a building_id (or without one) paired with the
+        unpaid payment orders of the site: rows and orders of the same
+        house_no, amount, payment_due_date (and building_id) are ranked and
+        joined on their rank, so each row pays at most one order.
+        """
+        stage = payment_order_reconcile
+        target = PaymentOrder.__table__
+        keys = ["house_no", "amount", "payment_due_date"]
+        if with_building:
+            keys.append("building_id")
+
+        def partition(table: Table) -> List[Column]:
+            return [table.c[key] for key in keys]
+
+        def same_key(left, right):
+            return and_(*(left.c[key] == right.c[key] for key in keys))
+
+        lines = (
+            select(
+                stage.c.line_no,
+                *partition(stage),
+                func.row_number()
+                .over(partition_by=partition(stage), order_by=stage.c.line_no)
+                .label("rank"),
+                func.count().over(partition_by=partition(stage)).label("line_count"),
+                func.min(stage.c.line_no)
+                .over(partition_by=partition(stage))
+                .label("first_line_no"),
+            )
+            .where(
+                stage.c.building_id.is_not(None)
+                if with_building
+                else stage.c.building_id.is_(None)
+            )
+            .subquery("lines")
+        )
+        unpaid = and_(target.c.site_id == site_id, target.c.status == "0")
+        counts = (
+            select(*partition(target), func.count().label("order_count"))
+            .where(unpaid)
+            .group_by(*partition(target))
+            .subquery("counts")
+        )
+        orders = (
+            select(
+                target.c.id,
+                *partition(target),
+                func.row_number()
+                .over(partition_by=partition(target), order_by=target.c.id)
+                .label("rank"),
+            )
+            .where(unpaid)
+            .subquery("orders")
+        )
+        return (
+            select(
+                lines.c.line_no,
+                lines.c.house_no,
+                lines.c.amount,
+                lines.c.payment_due_date,
+                lines.c.line_count,
+                lines.c.first_line_no,
+                counts.c.order_count,
+                orders.c.id,
+            )
+            .select_from(
+                lines.outerjoin(counts, same_key(lines, counts)).outerjoin(
+                    orders,
+                    and_(same_key(lines, orders), orders.c.rank == lines.c.rank),
+                )
+            )
+            .subquery("pairs")
+        )
+
+    async def reconcile_payments(self, site_id: str) -> ReconcileResult:
+        """
+        Mark the unpaid payment orders of the site paid by the staged
+        remittances, one order per staged row, see _reconcile_pairs; rows
+        with a building_id are paired first, the others with the orders
+        left. Rows matching more unpaid orders than there are such rows
+        are ambiguous and pay nothing, as do rows whose orders were paid by
+        earlier rows.
+        """
+        target = PaymentOrder.__table__
+        result = ReconcileResult([], [], [], [])
+        # first paying line of each house_no, amount and payment_due_date
+        claimed: Dict[Tuple[str, int, str], int] = {}
+        for with_building in (True, False):
+            pairs = self._reconcile_pairs(site_id, with_building)
+            rows = await self.session.execute(select(pairs).order_by(pairs.c.line_no))
+            # payment order id -> (line number, key)
+            paying: Dict[str, Tuple[int, Tuple[str, int, str]]] = {}
+            for row in rows:
+                key = (row.house_no, row.amount, row.payment_due_date)
+                if not row.order_count:
+                    if key in claimed:
+                        result.duplicates.append((row.line_no, claimed[key]))
+                    else:
+                        result.unmatched.append(row.line_no)
+                elif row.order_count > row.line_count:
+                    result.ambiguous.append(row.line_no)
+                elif row.id is None:
+                    result.duplicates.append((row.line_no, row.first_line_no))
+                else:
+                    paying[row.id] = (row.line_no, key)
+            if not paying:
+                continue
+            updated = await self.session.execute(
+                update(target)
+                .where(
+                    target.c.id == pairs.c.id,
+                    target.c.status == "0",
+                    pairs.c.order_count <= pairs.c.line_count,
+                )
+                .values(status="1", version=target.c.version + 1)
+                .returning(target.c.id)
+            )
+            for order_id in updated.scalars():
+                line_no, key = paying.pop(order_id)
+                result.paid.append((line_no, order_id))
+                claimed.setdefault(key, line_no)
+            # paid meanwhile by another transaction
+            result.unmatched.extend(line_no for line_no, _ in paying.values())
+        return result
@@ -0,0 +1,123 @@
+"""
+row plan: select only the columns a pydantic schema needs
+"""
+
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Type, get_args
+
+from pydantic import BaseModel
+from sqlalchemy import inspect
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql import Select, select
+
+
+class RowPlanError(Exception):
+    pass
+
+
+def _nested_schema(annotation: Any) -> Optional[Type[BaseModel]]:
+    """
+    Return the pydantic model of a field annotation such as 'Site | None'.
+    """
+    for candidate in (annotation, *get_args(annotation)):
+        if isinstance(candidate, type) and issubclass(candidate, BaseModel):
+            return candidate
+    return None
+
+
+class RowPlan:
+    """
+    Columns and outer joins needed to build a schema from plain SQL rows.
+    Relation fields of the schema (e.g. site: Site | None) are joined and
+    selected with '<relation>__<column>' labels, then nested again.
+    """
+
+    def __init__(
+        self,
+        model: Type[Any],
+        schema: Type[BaseModel],
+        entity: Any = None,
+        prefix: str = "",
+    ):
+        self.model = model
+        self.schema = schema
+        self.entity = entity if entity is not None else model
+        self.prefix = prefix
+        self.columns: List[Any] = []
+        self.joins: List[Tuple[Any, Any]] = []
+        self.fields: List[Tuple[str, str]] = []
+        self.relations: List[Tuple[str, "RowPlan"]] = []
+        self.key_labels: List[str] = []
+
+        mapper = inspect(model)
+        for name, field in schema.model_fields.items():
+            if name in mapper.columns:
+                self.fields.append((name, self._add_column(name)))
+            elif name in mapper.relationships:
+                self._add_relation(name, field.annotation)
+            elif field.is_required():
+                raise RowPlanError(
+                    f"'{schema.__name__}.{name}' is not a column or relationship "
+                    f"of '{model.__name__}'"
+                )
+
+        for column in mapper.primary_key:
+            self.key_labels.append(self._add_column(column.key))
+
+    def _add_column(self, name: str) -> str:
+        label = f"{self.prefix}{name}"
+        if all(column.key != label for column in self.columns):
+            self.columns.append(getattr(self.entity, name).label(label))
+        return label
+
+    def _add_relation(self, name: str, annotation: Any):
+        relationship = inspect(self.model).relationships[name]
+        nested = _nested_schema(annotation)
+        if relationship.uselist or nested is None:
+            raise RowPlanError(
+                f"'{self.schema.__name__}.{name}' must be a single nested schema"
+            )
+        target = aliased(relationship.mapper.class_)
+        plan = RowPlan(
+            relationship.mapper.class_,
+            nested,
+            entity=target,
+            prefix=f"{self.prefix}{name}__",
+        )
+        self.joins.append((target, getattr(self.entity, name).of_type(target)))
+        self.joins.extend(plan.joins)
+        self.columns.extend(plan.columns)
+        self.relations.append((name, plan))
+
+    def select(self) -> Select:
+        """
+        Build a select of the planned columns with the relation joins.
+        """
+        query = select(*self.columns).select_from(self.model)
+        for target, relation in self.joins:
+            query = query.outerjoin(target, relation)
+        return query
+
+    def to_dict(self, row: Mapping[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Nest a flat row mapping into a dict matching the schema.
+        Returns None when an outer-joined relation has no row.
+        """
+        if all(row[label] is None for label in self.key_labels):
+            return None
+        data = {name: row[label] for name, label in self.fields}
+        for name, plan in self.relations:
+            data[name] = plan.to_dict(row)
+        return data
+
+
+_row_plans: Dict[Tuple[Type[Any], Type[BaseModel]], RowPlan] = {}
+
+
+def get_row_plan(model: Type[Any], schema: Type[BaseModel]) -> RowPlan:
+    """
+    Return the cached row plan of a model and schema.
+    """
+    key = (model, schema)
+    if key not in _row_plans:
+        _row_plans[key] = RowPlan(model, schema)
+    return _row_plans[key]
@@ -0,0 +1,47 @@
+"""
+site_summary repository
+"""
+
+from typing import Any, Dict, List
+
+from sqlalchemy import insert, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.site_summary_model import SiteSummary
+from app.repository.base_repository import BaseRepository
+
+
+class SiteSummaryRepository(BaseRepository[SiteSummary]):
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, SiteSummary)
+
+    async def get_site(self, site_id: str) -> List[SiteSummary]:
+        """
+        All counters of a site, a primary key prefix lookup.
+        """
+        return await self.query(
+            filters={("site_id", "="): site_id},
+            order_by={"metric": "asc", "dimension": "asc", "sub_dimension": "asc"},
+        )
+
+    async def lock_for_reconcile(self):
+        """
+        Block trigger updates of the counters until the transaction ends,
+        so that recomputed counters don't overwrite concurrent changes.
+        Orders and announcements can still be read meanwhile.
+        """
+        if self.session.get_bind().dialect.name == "postgresql":
+            await self.session.execute(
+                text("LOCK TABLE site_summary IN SHARE ROW EXCLUSIVE MODE")
+            )
+
+    async def save_counters(
+        self, inserts: List[Dict[str, Any]], updates: List[Dict[str, Any]]
+    ):
+        """
+        Insert new counters and overwrite existing ones by primary key.
+        """
+        if inserts:
+            await self.session.execute(insert(SiteSummary), inserts)
+        if updates:
+            await self.session.execute(update(SiteSummary), updates)
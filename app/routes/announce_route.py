@@ -4,12 +4,32 @@ announce route
 
 from typing import Annotated
 
-from fastapi import APIRouter, Body, Depends, File, Form, HTTPException, UploadFile
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    File,
+    Form,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+)
 
 import app.schemas.announce_schema as announce_schema
+import app.utils.config as config
 from app.auth.auth_handler import authenticate
 from app.dependencies import get_service
 from app.service.announce_service import AnnounceService
+from app.service.base_service import VersionConflictError
+from app.utils.cursor import InvalidCursorError
+from app.utils.etag import if_match_version, record_not_modified, set_etag
+from app.utils.response_cache import response_cache
+from app.utils.serialization import dump_models
+from app.utils.streaming import streaming_response
+from app.utils.total_count import total_count_headers
 
 router = APIRouter(prefix="/api/announce", tags=["announce"])
 
@@ -32,39 +52,84 @@ async def create_announcement(
 
 @router.get("/{announce_id}", response_model=announce_schema.AnnounceView | None)
 async def read_announce(
-    announce_id: str, service: AnnounceService = Depends(get_service(AnnounceService))
+    announce_id: str,
+    response: Response,
+    if_none_match: str | None = Header(None),
+    service: AnnounceService = Depends(get_service(AnnounceService)),
 ):
-    return await service.get_by_keys(id=announce_id)
+    announce = await service.get_by_keys(id=announce_id)
+    if announce:
+        unchanged = record_not_modified(if_none_match, announce.version)
+        if unchanged:
+            return unchanged
+        set_etag(response, announce.version)
+    return announce
 
 
 @router.patch("/{announce_id}")
 async def update_announce(
     announce_id: str,
+    response: Response,
     update_data: announce_schema.AnnounceUpdateInputJS = Body(...),
     file: Annotated[UploadFile | None, File(...)] = None,
+    expected_version: int | None = Depends(if_match_version),
     service: AnnounceService = Depends(get_service(AnnounceService)),
     auth: dict = Depends(authenticate),
 ) -> announce_schema.Announce:
     """
-    Update announce
+    Update announce, conditional on the If-Match version if given
     """
     announce_update = announce_schema.AnnounceUpdate(
         **update_data.content.model_dump(exclude_unset=True), content_file=file
     )
-    return await service.update(announce_update, id=announce_id)
+    try:
+        result = await service.update(
+            announce_update, expected_version=expected_version, id=announce_id
+        )
+    except VersionConflictError as e:
+        raise HTTPException(status_code=412, detail=str(e))
+    if result:
+        set_etag(response, result.version)
+    return result
 
 
 @router.get("", response_model=list[announce_schema.AnnounceView])
 async def read_announces(
+    request: Request,
     site_id: str | None = None,
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1, le=config.MAX_PAGE_SIZE),
+    stream: bool = False,
+    total: bool = False,
     service: AnnounceService = Depends(get_service(AnnounceService)),
     auth: dict = Depends(authenticate),
 ):
     filters = {}
     if site_id:
         filters[("site_id", "=")] = site_id
-    announces = await service.query(filters=filters)
-    return announces
+    if stream:
+        return streaming_response(request, service.stream(filters=filters))
+
+    async def produce():
+        try:
+            page = await service.query_page(filters=filters, limit=limit, cursor=cursor)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        headers = {}
+        if page.next_cursor:
+            headers["X-Next-Cursor"] = page.next_cursor
+        if total:
+            headers.update(total_count_headers(await service.count(filters=filters)))
+        return dump_models(page.items), headers
+
+    return await response_cache.respond(
+        request,
+        "announce",
+        site_id,
+        auth,
+        produce,
+        probe=lambda: service.list_version(filters),
+    )
 
 
 @router.delete("/{announce_id}", status_code=204)
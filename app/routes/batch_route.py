@@ -0,0 +1,40 @@
+"""
+batch route
+"""
+
+from typing import Dict, Type
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.auth.auth_handler import authenticate
+from app.db.unit_of_work import AsyncUnitOfWork
+from app.dependencies import get_async_unit_of_work
+from app.schemas.batch_schema import BatchRequest, BatchResult
+from app.service.base_service import BaseService
+from app.service.payment_order_service import PaymentOrderService
+from app.service.repair_order_service import RepairOrderService
+
+router = APIRouter(prefix="/api", tags=["batch"])
+
+# resource path -> service running its batches
+BATCH_SERVICES: Dict[str, Type[BaseService]] = {
+    "repair_orders": RepairOrderService,
+    "payment_orders": PaymentOrderService,
+}
+
+
+@router.post("/{resource}/batch", response_model=list[BatchResult])
+async def run_batch(
+    resource: str,
+    batch: BatchRequest,
+    uow: AsyncUnitOfWork = Depends(get_async_unit_of_work),
+    auth: dict = Depends(authenticate),
+):
+    """
+    Run create, update and delete operations on a resource in one
+    transaction; the result list has one entry per operation, in order.
+    """
+    service_class = BATCH_SERVICES.get(resource)
+    if service_class is None:
+        raise HTTPException(status_code=404, detail=f"Unknown resource: {resource}")
+    return await service_class(uow).batch(batch.operations)
@@ -0,0 +1,37 @@
+"""
+internal metrics route
+"""
+
+from fastapi import APIRouter, Depends
+
+from app.auth.auth_handler import authenticate
+from app.db.pool_metrics import pool_metrics_snapshot, reset_pool_metrics
+from app.utils.single_flight import read_flights
+
+router = APIRouter(
+    prefix="/internal/metrics", tags=["internal"], include_in_schema=False
+)
+
+
+@router.get("/pool")
+async def read_pool_metrics(auth: dict = Depends(authenticate)):
+    """
+    Connection pool metrics since start or the last reset:
+    checkout wait and connection held time histograms by route and
+    service method, overflow use, pre_ping failures and invalidations.
+    """
+    return pool_metrics_snapshot()
+
+
+@router.post("/pool/reset", status_code=204)
+async def reset_metrics(auth: dict = Depends(authenticate)):
+    reset_pool_metrics()
+
+
+@router.get("/single_flight")
+async def read_single_flight_metrics(auth: dict = Depends(authenticate)):
+    """
+    Reads in flight, reads served from another caller's query, and
+    callers that stopped waiting and queried themselves.
+    """
+    return read_flights.snapshot()
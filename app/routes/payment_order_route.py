@@ -2,12 +2,33 @@
 payment_order route
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    File,
+    Form,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+)
 
+import app.schemas.payment_order_job_schema as payment_order_job_schema
 import app.schemas.payment_order_schema as payment_order_schema
+import app.utils.config as config
 from app.auth.auth_handler import authenticate
 from app.dependencies import get_service
+from app.service.base_service import VersionConflictError
 from app.service.payment_order_service import PaymentOrderService
+from app.utils.cursor import InvalidCursorError
+from app.utils.etag import if_match_version, record_not_modified, set_etag
+from app.utils.response_cache import response_cache
+from app.utils.serialization import dump_models
+from app.utils.streaming import streaming_response
+from app.utils.total_count import total_count_headers
 
 router = APIRouter(prefix="/api/payment_orders", tags=["payment_orders"])
 
@@ -23,20 +44,99 @@ async def create_payment_order(
     return result
 
 
+@router.post("/import")
+async def import_payment_orders(
+    file: UploadFile = File(...),
+    site_id: str | None = Form(None),
+    service: PaymentOrderService = Depends(get_service(PaymentOrderService)),
+    auth: dict = Depends(authenticate),
+) -> payment_order_schema.PaymentOrderImportReport:
+    """
+    Import payment orders from a csv file, e.g. a month of a whole site.
+    Columns are the payment order create fields; site_id can be given once
+    as a form field instead. Valid rows are imported, the others reported.
+    """
+    try:
+        return await service.import_csv(file.file, site_id=site_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/reconcile")
+async def reconcile_payment_orders(
+    file: UploadFile = File(...),
+    site_id: str = Form(...),
+    service: PaymentOrderService = Depends(get_service(PaymentOrderService)),
+    auth: dict = Depends(authenticate),
+) -> payment_order_schema.PaymentReconcileReport:
+    """
+    Mark the payment orders of a site paid by a remittance csv file with
+    house_no, amount, payment_due_date and optional building_id columns.
+    Unpaid orders matching a line are set to paid, unmatched lines reported.
+    """
+    try:
+        return await service.reconcile_csv(file.file, site_id=site_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/generate", status_code=202)
+async def generate_payment_orders(
+    request: payment_order_job_schema.PaymentOrderGenerate,
+    background_tasks: BackgroundTasks,
+    service: PaymentOrderService = Depends(get_service(PaymentOrderService)),
+    auth: dict = Depends(authenticate),
+) -> payment_order_job_schema.PaymentOrderJob:
+    """
+    Generate the payment orders of a payment item for every household of a
+    site in the database, e.g. the monthly management fee of a period.
+    The job runs after the response; poll /jobs/{job_id} for its status.
+    """
+    job = await service.create_generation_job(request)
+    # runs once the request transaction has committed the job
+    background_tasks.add_task(service.run_generation_job, job.id)
+    return job
+
+
+@router.get("/jobs/{job_id}")
+async def read_payment_order_job(
+    job_id: str,
+    service: PaymentOrderService = Depends(get_service(PaymentOrderService)),
+    auth: dict = Depends(authenticate),
+) -> payment_order_job_schema.PaymentOrderJob:
+    job = await service.get_generation_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
 @router.get(
     "/{payment_order_id}", response_model=payment_order_schema.PaymentOrderView | None
 )
 async def read_payment_order(
     payment_order_id: str,
+    response: Response,
+    if_none_match: str | None = Header(None),
     service: PaymentOrderService = Depends(get_service(PaymentOrderService)),
 ):
-    return await service.get_by_keys(id=payment_order_id)
+    payment_order = await service.get_by_keys(id=payment_order_id)
+    if payment_order:
+        unchanged = record_not_modified(if_none_match, payment_order.version)
+        if unchanged:
+            return unchanged
+        set_etag(response, payment_order.version)
+    return payment_order
 
 
 @router.get("", response_model=list[payment_order_schema.PaymentOrderView])
 async def read_payment_orders(
+    request: Request,
     site_id: str | None = None,
     building_id: str | None = None,
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1, le=config.MAX_PAGE_SIZE),
+    stream: bool = False,
+    total: bool = False,
     service: PaymentOrderService = Depends(get_service(PaymentOrderService)),
     auth: dict = Depends(authenticate),
 ):
@@ -45,25 +145,56 @@ async def read_payment_orders(
         filters[("site_id", "=")] = site_id
     if building_id:
         filters[("building_id", "=")] = building_id
-    payment_orders = await service.query(filters=filters)
-    return payment_orders
+    if stream:
+        return streaming_response(request, service.stream(filters=filters))
+
+    async def produce():
+        try:
+            page = await service.query_page(filters=filters, limit=limit, cursor=cursor)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        headers = {}
+        if page.next_cursor:
+            headers["X-Next-Cursor"] = page.next_cursor
+        if total:
+            headers.update(total_count_headers(await service.count(filters=filters)))
+        return dump_models(page.items), headers
+
+    return await response_cache.respond(
+        request,
+        "payment_order",
+        site_id,
+        auth,
+        produce,
+        probe=lambda: service.list_version(filters),
+    )
 
 
 @router.patch("/{payment_order_id}")
 async def update_payment_order(
     payment_order_id: str,
     payment_order_update: payment_order_schema.PaymentOrderUpdate,
+    response: Response,
+    expected_version: int | None = Depends(if_match_version),
     service: PaymentOrderService = Depends(get_service(PaymentOrderService)),
 ) -> payment_order_schema.PaymentOrder:
     """
-    Update payment_order
+    Update payment_order, conditional on the If-Match version if given
     """
     try:
         # return await service.update_item(item_id, item_update)
-        result = await service.update(payment_order_update, id=payment_order_id)
-        return result
+        result = await service.update(
+            payment_order_update,
+            expected_version=expected_version,
+            id=payment_order_id,
+        )
+    except VersionConflictError as e:
+        raise HTTPException(status_code=412, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    if result:
+        set_etag(response, result.version)
+    return result
 
 
 @router.delete("/{payment_order_id}", status_code=204)
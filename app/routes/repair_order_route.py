@@ -4,12 +4,20 @@ repair order route
 
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
 
 import app.schemas.repair_order_schema as repair_order_schema
+import app.utils.config as config
 from app.auth.auth_handler import authenticate
 from app.dependencies import get_service
+from app.service.base_service import VersionConflictError
 from app.service.repair_order_service import RepairOrderService
+from app.utils.cursor import InvalidCursorError
+from app.utils.etag import if_match_version, record_not_modified, set_etag
+from app.utils.response_cache import response_cache
+from app.utils.serialization import dump_models
+from app.utils.streaming import streaming_response
+from app.utils.total_count import total_count_headers
 
 router = APIRouter(prefix="/api/repair_orders", tags=["repair_orders"])
 
@@ -29,16 +37,29 @@ async def create_repair_order(
 )
 async def read_repair_order(
     repair_order_id: str,
+    response: Response,
+    if_none_match: str | None = Header(None),
     service: RepairOrderService = Depends(get_service(RepairOrderService)),
 ):
-    return await service.get_by_keys(id=repair_order_id)
+    repair_order = await service.get_by_keys(id=repair_order_id)
+    if repair_order:
+        unchanged = record_not_modified(if_none_match, repair_order.version)
+        if unchanged:
+            return unchanged
+        set_etag(response, repair_order.version)
+    return repair_order
 
 
 @router.get("", response_model=list[repair_order_schema.RepairOrderView])
 async def read_repair_orders(
+    request: Request,
     site_id: str | None = None,
     start_appointment_time: int | None = None,
     end_appointment_time: int | None = None,
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1, le=config.MAX_PAGE_SIZE),
+    stream: bool = False,
+    total: bool = False,
     service: RepairOrderService = Depends(get_service(RepairOrderService)),
     auth: dict = Depends(authenticate),
 ):
@@ -53,24 +74,54 @@ async def read_repair_orders(
         filters[("appointment_time", "<=")] = datetime.fromtimestamp(
             end_appointment_time
         )
-    repair_orders = await service.query(filters=filters)
-    return repair_orders
+    if stream:
+        return streaming_response(request, service.stream(filters=filters))
+
+    async def produce():
+        try:
+            page = await service.query_page(filters=filters, limit=limit, cursor=cursor)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        headers = {}
+        if page.next_cursor:
+            headers["X-Next-Cursor"] = page.next_cursor
+        if total:
+            headers.update(total_count_headers(await service.count(filters=filters)))
+        return dump_models(page.items), headers
+
+    return await response_cache.respond(
+        request,
+        "repair_order",
+        site_id,
+        auth,
+        produce,
+        probe=lambda: service.list_version(filters),
+    )
 
 
 @router.patch("/{repair_order_id}")
 async def update_repair_order(
     repair_order_id: str,
     repair_order_update: repair_order_schema.RepairOrderUpdate,
+    response: Response,
+    expected_version: int | None = Depends(if_match_version),
     service: RepairOrderService = Depends(get_service(RepairOrderService)),
     auth: dict = Depends(authenticate),
 ) -> repair_order_schema.RepairOrder:
     """
-    Update item
+    Update item, conditional on the If-Match version if given
     """
     try:
-        return await service.update(repair_order_update, id=repair_order_id)
+        result = await service.update(
+            repair_order_update, expected_version=expected_version, id=repair_order_id
+        )
+    except VersionConflictError as e:
+        raise HTTPException(status_code=412, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    if result:
+        set_etag(response, result.version)
+    return result
 
 
 @router.delete("/{repair_order_id}", status_code=204)
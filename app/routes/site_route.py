@@ -4,9 +4,11 @@ site route
 
 from fastapi import APIRouter, Depends
 
+import app.schemas.dashboard_schema as dashboard_schema
 import app.schemas.site_schema as site_schema
 from app.auth.auth_handler import authenticate
 from app.dependencies import get_service
+from app.service.dashboard_service import DashboardService
 from app.service.site_service import SiteService
 
 router = APIRouter(prefix="/api/site", tags=["site"])
@@ -19,3 +21,15 @@ async def read_sites(
 ):
     sites = await service.get_sites()
     return sites
+
+
+@router.get("/{site_id}/dashboard")
+async def read_site_dashboard(
+    site_id: str,
+    service: DashboardService = Depends(get_service(DashboardService)),
+    auth: dict = Depends(authenticate),
+) -> dashboard_schema.SiteDashboard:
+    """
+    Repair and payment order statistics of a site, aggregated server-side.
+    """
+    return await service.get_site_dashboard(site_id)
@@ -55,6 +55,7 @@ class Announce(BaseModel):
     severity: int
     content_path: str
     publish_date: datetime
+    version: int = 1
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -0,0 +1,35 @@
+"""
+batch schema
+"""
+
+from typing import Any, Dict, Literal
+
+from pydantic import BaseModel, Field
+
+import app.utils.config as config
+
+
+class BatchOperation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    # primary key of the record to update or delete
+    id: str | None = None
+    # create or update fields, validated by the resource's schemas
+    data: Dict[str, Any] | None = None
+    # expected record version of an update, like If-Match
+    version: int | None = None
+
+
+class BatchRequest(BaseModel):
+    operations: list[BatchOperation] = Field(
+        ..., min_length=1, max_length=config.MAX_BATCH_SIZE
+    )
+
+
+class BatchResult(BaseModel):
+    index: int
+    op: str
+    id: str | None = None
+    # http-like status of the operation: 200, 201, 204, 404, 412, 422 or 400
+    status: int
+    data: Any = None
+    error: str | None = None
@@ -2,9 +2,45 @@
 common schema
 """
 
+from datetime import datetime
+from typing import Dict, Generic, TypeVar
+
 from pydantic import BaseModel
 
+T = TypeVar("T")
+
 
 class LookupValue(BaseModel):
     id: str
     value: str
+
+
+def lookup_values(labels: Dict[str, str]) -> Dict[str, LookupValue]:
+    """
+    LookupValue of each id of a label table, built once so that
+    serializers don't build one per row.
+    """
+    return {id: LookupValue(id=id, value=value) for id, value in labels.items()}
+
+
+class Page(BaseModel, Generic[T]):
+    items: list[T]
+    next_cursor: str | None = None
+
+
+class TotalCount(BaseModel):
+    count: int
+    # False for a planner estimate
+    exact: bool
+
+
+class ListVersion(BaseModel):
+    """
+    Probe of the records a list query matches; changes with any insert,
+    update or delete among them.
+    """
+
+    count: int
+    # sum of the record versions, bumped by every update
+    versions: int
+    updated_at: datetime | None = None
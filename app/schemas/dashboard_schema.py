@@ -0,0 +1,40 @@
+"""
+dashboard schema
+"""
+
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class RepairOrderCount(BaseModel):
+    status: str
+    item_type: str
+    count: int
+
+
+class RepairOrderMonthCount(BaseModel):
+    created_at: datetime
+    count: int
+
+
+class PaymentOrderBuildingUnpaid(BaseModel):
+    building_id: str
+    count: int
+    amount: int
+
+
+class AnnounceSeverityCount(BaseModel):
+    severity: int
+    count: int
+
+
+class SiteDashboard(BaseModel):
+    site_id: str
+    # repair orders not done yet, by status and item type
+    open_repair_orders: list[RepairOrderCount] = []
+    # repair orders created per month, last DASHBOARD_MONTHS months
+    repair_orders_by_month: list[RepairOrderMonthCount] = []
+    # unpaid payment orders and their amount, by building
+    unpaid_by_building: list[PaymentOrderBuildingUnpaid] = []
+    announcements_by_severity: list[AnnounceSeverityCount] = []
@@ -0,0 +1,46 @@
+"""
+payment_order_job schema
+"""
+
+from datetime import datetime
+from enum import Enum
+
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+
+class AmountRule(str, Enum):
+    # the given amount for every household
+    fixed = "fixed"
+    # each household's latest amount of the payment item
+    last = "last"
+
+
+class PaymentOrderGenerate(BaseModel):
+    site_id: str = Field(max_length=64)
+    period: str = Field(max_length=20)
+    payment_item: str = Field(max_length=60)
+    amount_rule: AmountRule = AmountRule.fixed
+    amount: int | None = Field(None, ge=0)
+
+    @model_validator(mode="after")
+    def check_amount(self):
+        if self.amount_rule == AmountRule.fixed and self.amount is None:
+            raise ValueError("amount is required for the fixed amount rule")
+        return self
+
+
+class PaymentOrderJob(BaseModel):
+    id: str
+    site_id: str
+    period: str
+    payment_item: str
+    amount_rule: AmountRule
+    amount: int | None = None
+    status: str
+    created_count: int | None = None
+    message: str | None = None
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+    model_config = ConfigDict(from_attributes=True)
@@ -6,13 +6,14 @@ from datetime import datetime
 from enum import Enum
 from typing import Optional
 
-from pydantic import BaseModel, ConfigDict, Field, field_serializer
+from pydantic import BaseModel, ConfigDict, Field, field_serializer, field_validator
 
 from app.schemas.building_schema import BuildingView
-from app.schemas.common_schema import LookupValue
+from app.schemas.common_schema import LookupValue, lookup_values
 from app.schemas.site_schema import Site
 
 PAYMENT_ORDER_STATUS = {"0": "未繳", "1": "已繳"}
+PAYMENT_ORDER_STATUS_VALUES = lookup_values(PAYMENT_ORDER_STATUS)
 
 
 class PaymentOrderStatusValue(str, Enum):
@@ -42,6 +43,7 @@ class PaymentOrder(PaymentOrderBase):
     status: PaymentOrderStatusValue
     created_at: datetime | None = None
     created_by: Optional[str] = Field(None, max_length=64)
+    version: int = 1
     model_config = ConfigDict(from_attributes=True)
 
 
@@ -56,4 +58,43 @@ class PaymentOrderView(PaymentOrder):
     def format_status(self, status: str | None) -> LookupValue | None:
         if status is None:
             return None
-        return LookupValue(id=status, value=PAYMENT_ORDER_STATUS[status])
+        return PAYMENT_ORDER_STATUS_VALUES[status]
+
+
+class PaymentOrderImportError(BaseModel):
+    # line of the csv file, the header is line 1
+    line: int
+    errors: list[str]
+
+
+class PaymentOrderImportReport(BaseModel):
+    total: int = 0
+    imported: int = 0
+    failed: int = 0
+    # at most IMPORT_MAX_ERRORS entries
+    errors: list[PaymentOrderImportError] = []
+
+
+class PaymentReconcileLine(BaseModel):
+    # house numbers are only unique within a building
+    building_id: str | None = Field(None, max_length=64)
+    house_no: str = Field(max_length=60)
+    amount: int = Field(ge=0)
+    payment_due_date: str = Field(max_length=20)
+
+    @field_validator("building_id", mode="before")
+    @classmethod
+    def empty_building_id(cls, building_id: str | None) -> str | None:
+        return building_id or None
+
+
+class PaymentReconcileReport(BaseModel):
+    total: int = 0
+    # lines paying an unpaid payment order
+    matched: int = 0
+    # payment orders marked as paid
+    updated: int = 0
+    failed: int = 0
+    # invalid, unmatched, ambiguous and duplicate lines, at most
+    # IMPORT_MAX_ERRORS entries
+    errors: list[PaymentOrderImportError] = []
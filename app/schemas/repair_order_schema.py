@@ -7,7 +7,7 @@ from enum import Enum
 
 from pydantic import BaseModel, ConfigDict, Field, computed_field, field_serializer
 
-from app.schemas.common_schema import LookupValue
+from app.schemas.common_schema import LookupValue, lookup_values
 from app.schemas.site_schema import Site
 
 REGIONS = {"public": "公共區", "personal": "個人居家"}
@@ -29,6 +29,12 @@ REPAIR_ORDER_STATUS = {
 }
 
 
+REGION_VALUES = lookup_values(REGIONS)
+ITEM_TYPE_VALUES = lookup_values(ITEM_TYPES)
+RESERVATION_BY_VALUES = lookup_values(RESERVATION_BYS)
+REPAIR_ORDER_STATUS_VALUES = lookup_values(REPAIR_ORDER_STATUS)
+
+
 class RegionValue(str, Enum):
     locals().update({k: k for k, _ in REGIONS.items()})
 
@@ -78,6 +84,7 @@ class RepairOrder(RepairOrderBase):
     status: RepairOrderStatusValue
     created_at: str | datetime = None
     created_by: str | None = None
+    version: int = 1
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -101,22 +108,22 @@ class RepairOrderView(RepairOrder):
     def format_region(self, region: str | None) -> LookupValue | None:
         if region is None:
             return None
-        return LookupValue(id=region, value=REGIONS[region])
+        return REGION_VALUES[region]
 
     @field_serializer("item_type")
     def format_item_type(self, item_type: str | None) -> LookupValue | None:
         if item_type is None:
             return None
-        return LookupValue(id=item_type, value=ITEM_TYPES[item_type])
+        return ITEM_TYPE_VALUES[item_type]
 
     @field_serializer("reservation_by")
     def format_reservation_by(self, reservation_by: str | None) -> LookupValue | None:
         if reservation_by is None:
             return None
-        return LookupValue(id=reservation_by, value=RESERVATION_BYS[reservation_by])
+        return RESERVATION_BY_VALUES[reservation_by]
 
     @field_serializer("status")
     def format_status(self, status: str | None) -> LookupValue | None:
         if status is None:
             return None
-        return LookupValue(id=status, value=REPAIR_ORDER_STATUS[status])
+        return REPAIR_ORDER_STATUS_VALUES[status]
@@ -25,7 +25,10 @@ class AnnounceService(
     repository = AnnounceRepository
     output_schema = announce_schema.Announce
     query_schema = announce_schema.AnnounceView
-    relation_strategies = {"basic": ["site"], "full": ["site"]}
+    read_from_rows = True
+    cache_resource = "announce"
+    default_order_by = {"publish_date": "desc", "id": "asc"}
+    relation_strategies = {"basic": {"site": "selectin"}, "full": {"site": "selectin"}}
 
     def __init__(self, uow: AsyncUnitOfWork):
         super().__init__(uow)
@@ -67,5 +70,6 @@ class AnnounceService(
 
     async def post_delete_hook(self, obj: Announce):
         """Post-delete hook for additional logic."""
+        await super().post_delete_hook(obj)
         if obj.content_path:
             await delete_blob(obj.content_path)
@@ -2,12 +2,32 @@
 base service
 """
 
-from typing import Any, Dict, Generic, List, Optional, Tuple, Type, TypeVar
+import functools
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Generic,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+)
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm.exc import StaleDataError
 
+import app.utils.config as config
+from app.db.pool_metrics import track_service_method
+from app.db.routing import is_primary_pinned
 from app.db.unit_of_work import AsyncUnitOfWork
 from app.repository.base_repository import BaseRepository
+from app.schemas.batch_schema import BatchOperation, BatchResult
+from app.schemas.common_schema import ListVersion, Page, TotalCount
+from app.utils.response_cache import response_cache
+from app.utils.single_flight import read_flights
 
 # Type variables for models and schemas
 # SQLAlchemy model
@@ -22,34 +42,89 @@ OutputSchemaType = TypeVar("OutputSchemaType", bound=BaseModel)
 QuerySchemaType = TypeVar("QuerySchemaType", bound=BaseModel)
 
 
+# column of the site a record belongs to, see BaseService.cache_resource
+CACHE_SITE_FIELD = "site_id"
+
+
+class VersionConflictError(Exception):
+    pass
+
+
+def _site_of(obj: Any) -> Optional[str]:
+    if isinstance(obj, dict):
+        return obj.get(CACHE_SITE_FIELD)
+    return getattr(obj, CACHE_SITE_FIELD, None)
+
+
+def coalesce_reads(func):
+    """
+    Decorator sharing one in-flight call of a read method between
+    concurrent callers with identical arguments, see SingleFlight.
+    Reads inside a write transaction see their own changes and are never
+    shared; reads pinned to the primary only with each other.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        if read_flights.max_wait <= 0 or self.uow.in_write_transaction:
+            return await func(self, *args, **kwargs)
+        key = (
+            type(self).__qualname__,
+            func.__name__,
+            repr(args),
+            repr(sorted(kwargs.items())),
+            is_primary_pinned(),
+        )
+        return await read_flights.run(key, lambda: func(self, *args, **kwargs))
+
+    return wrapper
+
+
 class BaseService(
     Generic[
         ModelType, CreateSchemaType, UpdateSchemaType, OutputSchemaType, QuerySchemaType
     ]
 ):
     repository: Type[BaseRepository[ModelType]]
+    create_schema: Type[CreateSchemaType]
+    update_schema: Type[UpdateSchemaType]
     output_schema: Type[OutputSchemaType]
     query_schema: Type[QuerySchemaType]
-    relation_strategies: Dict[str, List[str]] = {"basic": [], "full": []}
+    # strategy name -> {relation path: loader}, see BaseRepository._apply_load_relations
+    relation_strategies: Dict[str, Dict[str, str]] = {"basic": {}, "full": {}}
+    # loader for relations a strategy does not list; "raise" makes lazy loads fail fast
+    default_loader: str = "raise"
+    # read query_schema straight from SQL rows, skipping ORM instances
+    read_from_rows: bool = False
+    # response cache resource of the list endpoints, invalidated per site by
+    # the post hooks; None if the responses are not cached
+    cache_resource: Optional[str] = None
+    # order of query_page and stream when the caller gives none; query_page
+    # appends the primary key so that its order is total
+    default_order_by: Optional[Dict[str, str]] = None
 
     def __init__(self, uow: AsyncUnitOfWork):
         self.uow = uow
 
-    def _get_relation_strategy(self, strategy: str) -> List[str]:
+    def _get_relation_strategy(self, strategy: str) -> Dict[str, str]:
         """
-        Map a relation strategy name to actual relation keys.
+        Map a relation strategy name to relation loaders.
         """
-        return self.relation_strategies.get(strategy, [])
+        relations = self.relation_strategies.get(strategy, {})
+        if not isinstance(relations, dict):
+            relations = {relation: "joined" for relation in relations}
+        return {"*": self.default_loader, **relations}
 
     async def prepare_create_data(self, create_data: CreateSchemaType) -> ModelType:
         """Hook for preparing creation data."""
         return ModelType(**create_data.model_dump())
 
     async def prepare_update_data(
-        self, update_data: UpdateSchemaType, obj: ModelType
+        self, update_data: UpdateSchemaType, obj: Optional[ModelType]
     ) -> dict:
         """
         Hook for preparing update data.
+        obj is the loaded record, or None when update skips loading it.
         """
         data = update_data.model_dump(exclude_unset=True)
         # for field, value in data.items():
@@ -69,17 +144,61 @@ class BaseService(
         pass
 
     async def post_create_hook(self, obj: ModelType):
-        """Post-create hook for additional logic."""
-        pass
+        """Post-create hook, invalidates the cached responses of the site."""
+        self._invalidate_cached(_site_of(obj))
 
-    async def post_update_hook(self, obj: ModelType, **kwargs: Any):
-        """Post-update hook for additional logic."""
-        pass
+    async def post_update_hook(self, obj: ModelType | Dict[str, Any], **kwargs: Any):
+        """
+        Post-update hook, invalidates the cached responses of the site.
+        obj is the updated row as a dict when updated without loading it.
+        """
+        self._invalidate_cached(_site_of(obj))
 
     async def post_delete_hook(self, obj: ModelType):
-        """Post-delete hook for additional logic."""
-        pass
+        """Post-delete hook, invalidates the cached responses of the site."""
+        self._invalidate_cached(_site_of(obj))
+
+    def _invalidate_cached(self, *site_ids: Optional[str]):
+        """
+        Invalidate the cached responses of the sites once the unit of work
+        commits, so that no reader caches the old data again meanwhile;
+        the other workers are notified by the transaction itself.
+        """
+        if not self.cache_resource:
+            return
+        for site_id in site_ids:
+            key = ("response_cache", self.cache_resource, site_id)
+            self.uow.before_commit(
+                key,
+                functools.partial(
+                    response_cache.broadcast,
+                    resource=self.cache_resource,
+                    site_ids=[site_id],
+                ),
+            )
+            self.uow.after_commit(
+                key,
+                functools.partial(
+                    response_cache.invalidate, self.cache_resource, [site_id]
+                ),
+            )
+
+    async def _invalidate_sites_of(
+        self,
+        repository_instance: BaseRepository[ModelType],
+        filters: Dict[Tuple[str, str], Any],
+    ):
+        """
+        Invalidate the cached responses of the sites of the matching
+        records, before they are deleted or moved to another site.
+        """
+        if self.cache_resource:
+            sites = await repository_instance.aggregate(
+                group_by=[CACHE_SITE_FIELD], filters=filters
+            )
+            self._invalidate_cached(*(site[CACHE_SITE_FIELD] for site in sites))
 
+    @track_service_method
     async def create(self, create_data: CreateSchemaType) -> OutputSchemaType:
         """Main create method, wrapped with hooks and middleware logic."""
         async with self.uow as uow:
@@ -88,37 +207,104 @@ class BaseService(
 
             repository_instance = self.repository(uow.session)
             await repository_instance.create(prepared_data)
-            # await self.post_create_hook(prepared_data)
+            await self.post_create_hook(prepared_data)
             return self.output_schema.model_validate(prepared_data)
 
+    def _overrides(self, name: str) -> bool:
+        """
+        Whether the service class overrides a BaseService method (hook).
+        """
+        return getattr(type(self), name) is not getattr(BaseService, name)
+
+    def _update_needs_object(self) -> bool:
+        """
+        Whether update must load the record first: only when a subclass
+        overrides prepare_update_data, which receives the old object.
+        """
+        return self._overrides("prepare_update_data")
+
+    @track_service_method
     async def update(
-        self, update_data: UpdateSchemaType, **primary_key_values: Any
+        self,
+        update_data: UpdateSchemaType,
+        expected_version: Optional[int] = None,
+        **primary_key_values: Any,
     ) -> Optional[OutputSchemaType]:
         """
         Main update method, wrapped with hooks and middleware logic.
+        Without a custom prepare_update_data the record is updated with a
+        single UPDATE ... RETURNING, otherwise it is loaded and updated via the ORM.
+        With expected_version the update is conditional on the record's
+        version and raises VersionConflictError if it moved on; no row locks.
         """
         async with self.uow as uow:
             repository_instance = self.repository(uow.session)
+
+            if not self._update_needs_object():
+                # Pre-update logic
+                # await self.pre_update_hook(update_data, **primary_key_values)
+                data = await self.prepare_update_data(update_data, None)
+                if CACHE_SITE_FIELD in data:
+                    # the post hook only sees the new site
+                    await self._invalidate_sites_of(
+                        repository_instance,
+                        {
+                            (key, "="): value
+                            for key, value in primary_key_values.items()
+                        },
+                    )
+                row = await repository_instance.update_returning(
+                    data, expected_version=expected_version, **primary_key_values
+                )
+                if row is None:
+                    if (
+                        expected_version is not None
+                        and await repository_instance.get_by_keys(**primary_key_values)
+                    ):
+                        raise VersionConflictError(
+                            f"Record was modified, expected version {expected_version}"
+                        )
+                    return None
+                # Post-update logic
+                await self.post_update_hook(row, **primary_key_values)
+                return self.output_schema.model_validate(row)
+
             # Retrieve the existing object
             obj = await repository_instance.get_by_keys(**primary_key_values)
             if not obj:
                 return None
+            version_key = repository_instance.version_key()
+            if (
+                version_key
+                and expected_version is not None
+                and getattr(obj, version_key) != expected_version
+            ):
+                raise VersionConflictError(
+                    f"Record was modified, expected version {expected_version}"
+                )
 
             # Pre-update logic
             # await self.pre_update_hook(update_data, **primary_key_values)
 
             # Prepare update data
             updated_obj = await self.prepare_update_data(update_data, obj)
+            # the post hook only sees the new site
+            self._invalidate_cached(_site_of(obj))
 
-            # Update the object in the repository
-            obj = await repository_instance.update(updated_obj, **primary_key_values)
+            # Update the loaded object in the repository, the flush only
+            # matches the version it was loaded with
+            try:
+                obj = await repository_instance.update_obj(obj, updated_obj)
+            except StaleDataError:
+                raise VersionConflictError("Record was modified concurrently")
 
             # Post-update logic
-            # await self.post_update_hook(obj, **primary_key_values)
+            await self.post_update_hook(obj, **primary_key_values)
 
             # Return the updated object
             return self.output_schema.model_validate(obj)
 
+    @track_service_method
     async def delete_by_keys(self, **primary_key_values: Any) -> bool:
         async with self.uow as uow:
             repository_instance = self.repository(uow.session)
@@ -131,22 +317,210 @@ class BaseService(
             await self.post_delete_hook(obj)
             return True
 
+    def _validate_operation(self, operation: BatchOperation) -> Optional[BaseModel]:
+        """
+        Validate the data of a batch operation with create/update_schema.
+        """
+        if operation.op == "create":
+            return self.create_schema.model_validate(operation.data or {})
+        if operation.id is None:
+            raise ValueError(f"'{operation.op}' needs the 'id' of the record")
+        if operation.op == "update":
+            return self.update_schema.model_validate(operation.data or {})
+        return None
+
+    def _batch_runs(
+        self, pending: List[Tuple[int, BatchOperation, Any]]
+    ) -> List[List[Tuple[int, BatchOperation, Any]]]:
+        """
+        Split operations into runs that can share one set-based statement:
+        consecutive creates, consecutive unconditional updates with the same
+        data, and consecutive deletes, as far as hooks allow. Order is kept.
+        """
+        runs: List[List[Tuple[int, BatchOperation, Any]]] = []
+        for item in pending:
+            operation = item[1]
+            if runs and self._same_run(runs[-1][-1][1], operation):
+                runs[-1].append(item)
+            else:
+                runs.append([item])
+        return runs
+
+    def _same_run(self, previous: BatchOperation, operation: BatchOperation) -> bool:
+        if previous.op != operation.op:
+            return False
+        if operation.op == "update":
+            return (
+                not self._update_needs_object()
+                and previous.version is None
+                and operation.version is None
+                and previous.data == operation.data
+            )
+        if operation.op == "delete":
+            return not (
+                self._overrides("pre_delete_hook")
+                or self._overrides("post_delete_hook")
+            )
+        return True
+
+    async def _run_batch(
+        self,
+        repository_instance: BaseRepository[ModelType],
+        run: List[Tuple[int, BatchOperation, Any]],
+    ) -> List[BatchResult]:
+        """
+        Execute a run of operations, set-based when it has several.
+        """
+        (key,) = repository_instance.primary_key_names()
+        index, operation, payload = run[0]
+
+        if operation.op == "create":
+            if len(run) == 1:
+                created = [await self.create(payload)]
+            else:
+                objs = [await self.prepare_create_data(item[2]) for item in run]
+                await repository_instance.create_all(objs)
+                for obj in objs:
+                    await self.post_create_hook(obj)
+                created = [self.output_schema.model_validate(obj) for obj in objs]
+            return [
+                BatchResult(
+                    index=item[0],
+                    op="create",
+                    id=getattr(output, key, None),
+                    status=201,
+                    data=output,
+                )
+                for item, output in zip(run, created)
+            ]
+
+        if operation.op == "update":
+            if len(run) == 1:
+                output = await self.update(
+                    payload, expected_version=operation.version, **{key: operation.id}
+                )
+                updated = {operation.id: output} if output else {}
+            else:
+                data = await self.prepare_update_data(payload, None)
+                filters = {(key, "in"): [item[1].id for item in run]}
+                if CACHE_SITE_FIELD in data:
+                    await self._invalidate_sites_of(repository_instance, filters)
+                rows = await repository_instance.update_where(data, filters)
+                for row in rows:
+                    await self.post_update_hook(row, **{key: row[key]})
+                updated = {
+                    row[key]: self.output_schema.model_validate(row) for row in rows
+                }
+            return [
+                BatchResult(
+                    index=item[0],
+                    op="update",
+                    id=item[1].id,
+                    status=200 if item[1].id in updated else 404,
+                    data=updated.get(item[1].id),
+                )
+                for item in run
+            ]
+
+        if len(run) == 1:
+            deleted = (
+                [operation.id]
+                if await self.delete_by_keys(**{key: operation.id})
+                else []
+            )
+        else:
+            filters = {(key, "in"): [item[1].id for item in run]}
+            await self._invalidate_sites_of(repository_instance, filters)
+            deleted = await repository_instance.delete_where(filters)
+        return [
+            BatchResult(
+                index=item[0],
+                op="delete",
+                id=item[1].id,
+                status=204 if item[1].id in deleted else 404,
+            )
+            for item in run
+        ]
+
+    @track_service_method
+    async def batch(self, operations: List[BatchOperation]) -> List[BatchResult]:
+        """
+        Run create, update and delete operations in one unit of work and
+        return a result per operation, in order.
+        Runs of similar operations are executed as one set-based statement
+        inside a SAVEPOINT; if a run fails, its operations are retried one by
+        one, so only the failing operations are rolled back.
+        """
+        results: List[Optional[BatchResult]] = [None] * len(operations)
+        pending: List[Tuple[int, BatchOperation, Any]] = []
+        for index, operation in enumerate(operations):
+            try:
+                pending.append((index, operation, self._validate_operation(operation)))
+            except (ValidationError, ValueError) as e:
+                results[index] = BatchResult(
+                    index=index,
+                    op=operation.op,
+                    id=operation.id,
+                    status=422,
+                    error=str(e),
+                )
+
+        async with self.uow as uow:
+            repository_instance = self.repository(uow.session)
+            for run in self._batch_runs(pending):
+                retry = [run] if len(run) == 1 else [run, *([item] for item in run)]
+                for attempt in retry:
+                    try:
+                        async with uow.savepoint():
+                            run_results = await self._run_batch(
+                                repository_instance, attempt
+                            )
+                    except (SQLAlchemyError, VersionConflictError, ValueError) as e:
+                        if len(attempt) > 1:
+                            continue
+                        index, operation, _ = attempt[0]
+                        results[index] = BatchResult(
+                            index=index,
+                            op=operation.op,
+                            id=operation.id,
+                            status=412 if isinstance(e, VersionConflictError) else 400,
+                            error=str(getattr(e, "orig", None) or e),
+                        )
+                        continue
+                    for result in run_results:
+                        results[result.index] = result
+                    if len(attempt) > 1:
+                        # the whole run succeeded, no need to retry one by one
+                        break
+        return results
+
+    @track_service_method
+    @coalesce_reads
     async def get_by_keys(
         self, relation_strategy: str = "basic", **primary_key_values: Any
     ) -> Optional[QuerySchemaType]:
         """
         Get an entity by primary keys with a predefined relation strategy.
         """
-        async with self.uow as uow:
-            relations = self._get_relation_strategy(relation_strategy)
+        async with self.uow.readonly() as uow:
             repository_instance = self.repository(uow.session)
-            obj = await repository_instance.get_by_keys(
-                load_relations=relations, **primary_key_values
-            )
-            if obj:
-                return self.query_schema.model_validate(obj)
-            return None
+            if self.read_from_rows:
+                obj = await repository_instance.get_row_by_keys(
+                    self.query_schema, **primary_key_values
+                )
+            else:
+                relations = self._get_relation_strategy(relation_strategy)
+                obj = await repository_instance.get_by_keys(
+                    load_relations=relations, **primary_key_values
+                )
+        # validate outside of the unit of work; outside of a request scope
+        # its connection is back in the pool by now
+        if obj:
+            return self.query_schema.model_validate(obj)
+        return None
 
+    @track_service_method
+    @coalesce_reads
     async def query(
         self,
         filters: Optional[Dict[Tuple[str, str], Any]] = None,
@@ -158,14 +532,144 @@ class BaseService(
         """
         Query entities with filters, sorting, pagination, and predefined relation strategy.
         """
-        async with self.uow as uow:
-            relations = self._get_relation_strategy(relation_strategy)
+        async with self.uow.readonly() as uow:
+            repository_instance = self.repository(uow.session)
+            if self.read_from_rows:
+                objs = await repository_instance.query_rows(
+                    self.query_schema,
+                    filters=filters,
+                    limit=limit,
+                    offset=offset,
+                    order_by=order_by,
+                )
+            else:
+                relations = self._get_relation_strategy(relation_strategy)
+                objs = await repository_instance.query(
+                    filters=filters,
+                    load_relations=relations,
+                    limit=limit,
+                    offset=offset,
+                    order_by=order_by,
+                )
+        return [self.query_schema.model_validate(obj) for obj in objs]
+
+    @track_service_method
+    @coalesce_reads
+    async def query_page(
+        self,
+        filters: Optional[Dict[Tuple[str, str], Any]] = None,
+        relation_strategy: str = "basic",
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        order_by: Optional[Dict[str, str]] = None,
+    ) -> Page[QuerySchemaType]:
+        """
+        Query entities with keyset (cursor) pagination.
+        Pass the returned next_cursor back to fetch the following page.
+        """
+        order_by = order_by or self.default_order_by
+        async with self.uow.readonly() as uow:
+            repository_instance = self.repository(uow.session)
+            if self.read_from_rows:
+                objs, next_cursor = await repository_instance.query_rows_page(
+                    self.query_schema,
+                    filters=filters,
+                    limit=limit,
+                    cursor=cursor,
+                    order_by=order_by,
+                )
+            else:
+                relations = self._get_relation_strategy(relation_strategy)
+                objs, next_cursor = await repository_instance.query_page(
+                    filters=filters,
+                    load_relations=relations,
+                    limit=limit,
+                    cursor=cursor,
+                    order_by=order_by,
+                )
+        return Page[self.query_schema](
+            items=[self.query_schema.model_validate(obj) for obj in objs],
+            next_cursor=next_cursor,
+        )
+
+    @track_service_method
+    @coalesce_reads
+    async def count(
+        self,
+        filters: Optional[Dict[Tuple[str, str], Any]] = None,
+        exact_limit: int = config.TOTAL_COUNT_EXACT_LIMIT,
+    ) -> TotalCount:
+        """
+        Number of entities matching the filters, for pagers: counted
+        exactly if at most exact_limit match, else estimated by the planner.
+        """
+        async with self.uow.readonly() as uow:
+            repository_instance = self.repository(uow.session)
+            count = await repository_instance.count_capped(filters, exact_limit)
+            if count <= exact_limit:
+                return TotalCount(count=count, exact=True)
+            estimate = await repository_instance.estimate_count(filters)
+            if estimate is None:
+                # no planner statistics to estimate with
+                rows = await repository_instance.aggregate(filters=filters)
+                return TotalCount(count=rows[0]["count"], exact=True)
+        # the capped count proved there are more than exact_limit
+        return TotalCount(count=max(estimate, count), exact=False)
+
+    @track_service_method
+    @coalesce_reads
+    async def list_version(
+        self, filters: Optional[Dict[Tuple[str, str], Any]] = None
+    ) -> ListVersion:
+        """
+        Version of the entities matching the filters, from one aggregate
+        query that loads no rows; for ETags of list responses.
+        The model needs updated_at and version columns.
+        """
+        async with self.uow.readonly() as uow:
             repository_instance = self.repository(uow.session)
-            objs = await repository_instance.query(
+            rows = await repository_instance.aggregate(
+                aggregates={
+                    "count": ("count", None),
+                    "versions": ("sum", "version"),
+                    "updated_at": ("max", "updated_at"),
+                },
                 filters=filters,
-                load_relations=relations,
-                limit=limit,
-                offset=offset,
-                order_by=order_by,
             )
-            return [self.query_schema.model_validate(obj) for obj in objs]
+        row = rows[0]
+        return ListVersion(
+            count=row["count"],
+            versions=row["versions"] or 0,
+            updated_at=row["updated_at"],
+        )
+
+    async def stream(
+        self,
+        filters: Optional[Dict[Tuple[str, str], Any]] = None,
+        relation_strategy: str = "basic",
+        order_by: Optional[Dict[str, str]] = None,
+        chunk_size: int = config.STREAM_CHUNK_SIZE,
+    ) -> AsyncIterator[List[QuerySchemaType]]:
+        """
+        Stream entities as chunks of validated query schemas.
+        The session stays open until the stream is exhausted.
+        """
+        order_by = order_by or self.default_order_by
+        async with self.uow.readonly() as uow:
+            repository_instance = self.repository(uow.session)
+            if self.read_from_rows:
+                chunks = repository_instance.stream_rows(
+                    self.query_schema,
+                    filters=filters,
+                    order_by=order_by,
+                    yield_per=chunk_size,
+                )
+            else:
+                chunks = repository_instance.stream(
+                    filters=filters,
+                    load_relations=self._get_relation_strategy(relation_strategy),
+                    order_by=order_by,
+                    yield_per=chunk_size,
+                )
+            async for objs in chunks:
+                yield [self.query_schema.model_validate(obj) for obj in objs]
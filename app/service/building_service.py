@@ -5,6 +5,7 @@ building service
 from typing import Dict, List
 
 import app.schemas.building_schema as building_schema
+from app.db.reference_cache import reference_cache
 from app.db.unit_of_work import AsyncUnitOfWork
 from app.repository.building_repository import BuildingRepository
 
@@ -38,14 +39,29 @@ class BuildingService:
     async def get_buildings(
         self, site_id: str | None
     ) -> list[building_schema.SiteBuildingView]:
-        async with self.uow as uow:
+        """
+        Buildings grouped by site, served from the reference cache.
+        """
+        site_buildings = await reference_cache.get_or_load(
+            "site_buildings", self._load_site_buildings
+        )
+        if site_id:
+            return [
+                site_building
+                for site_building in site_buildings
+                if site_building.site.site_id == site_id
+            ]
+        return site_buildings
+
+    async def _load_site_buildings(self) -> list[building_schema.SiteBuildingView]:
+        async with self.uow.readonly() as uow:
             building_repo = BuildingRepository(uow.session)
-            buildings = await building_repo.get_buildings(site_id)
+            buildings = await building_repo.get_buildings()
 
-            building_fulls = [
-                building_schema.BuildingFull.model_validate(building)
-                for building in buildings
-            ]
+        building_fulls = [
+            building_schema.BuildingFull.model_validate(building)
+            for building in buildings
+        ]
 
-            site_buildings = convert_site_buildings(building_fulls)
-            return site_buildings
+        site_buildings = convert_site_buildings(building_fulls)
+        return site_buildings
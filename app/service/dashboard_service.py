@@ -0,0 +1,70 @@
+"""
+dashboard service
+"""
+
+from datetime import datetime
+
+import app.schemas.dashboard_schema as dashboard_schema
+import app.utils.config as config
+from app.db.pool_metrics import track_service_method
+from app.db.unit_of_work import AsyncUnitOfWork
+from app.repository.repair_order_repository import RepairOrderRepository
+from app.repository.site_summary_repository import SiteSummaryRepository
+
+
+def months_ago(now: datetime, months: int) -> datetime:
+    """
+    Start of the month, months before the month of now.
+    """
+    index = now.year * 12 + now.month - 1 - months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+class DashboardService:
+    def __init__(self, uow: AsyncUnitOfWork):
+        self.uow = uow
+
+    @track_service_method
+    async def get_site_dashboard(self, site_id: str) -> dashboard_schema.SiteDashboard:
+        """
+        Statistics of a site: the trigger-maintained counters of
+        site_summary, plus the monthly repair orders aggregated in the
+        database over DASHBOARD_MONTHS.
+        """
+        since = months_ago(datetime.now(), config.DASHBOARD_MONTHS - 1)
+        async with self.uow.readonly() as uow:
+            counters = await SiteSummaryRepository(uow.session).get_site(site_id)
+            repair_orders_by_month = await RepairOrderRepository(uow.session).aggregate(
+                group_by=["created_at:month"],
+                filters={("site_id", "="): site_id, ("created_at", ">="): since},
+            )
+
+        dashboard = dashboard_schema.SiteDashboard(
+            site_id=site_id, repair_orders_by_month=repair_orders_by_month
+        )
+        for counter in counters:
+            if not counter.count:
+                continue
+            if counter.metric == "repair_order_open":
+                dashboard.open_repair_orders.append(
+                    dashboard_schema.RepairOrderCount(
+                        status=counter.dimension,
+                        item_type=counter.sub_dimension,
+                        count=counter.count,
+                    )
+                )
+            elif counter.metric == "payment_order_unpaid":
+                dashboard.unpaid_by_building.append(
+                    dashboard_schema.PaymentOrderBuildingUnpaid(
+                        building_id=counter.dimension,
+                        count=counter.count,
+                        amount=counter.amount,
+                    )
+                )
+            elif counter.metric == "announce":
+                dashboard.announcements_by_severity.append(
+                    dashboard_schema.AnnounceSeverityCount(
+                        severity=int(counter.dimension), count=counter.count
+                    )
+                )
+        return dashboard
@@ -2,15 +2,37 @@
 payment_order service
 """
 
+import asyncio
+import csv
+import io
+import itertools
+import logging
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import Any, BinaryIO, Callable, List, Optional, Set, Tuple, Type
 
+from pydantic import BaseModel, ValidationError
+
+import app.schemas.payment_order_job_schema as payment_order_job_schema
 import app.schemas.payment_order_schema as payment_order_schema
+import app.utils.config as config
+from app.db.pool_metrics import track_service_method
 from app.db.unit_of_work import AsyncUnitOfWork
+from app.models.payment_order_job_model import PaymentOrderJob
 from app.models.payment_order_model import PaymentOrder
-from app.repository.payment_order_repository import PaymentOrderRepository
+from app.repository.payment_order_job_repository import PaymentOrderJobRepository
+from app.repository.payment_order_repository import (
+    IMPORT_COLUMNS,
+    RECONCILE_COLUMNS,
+    PaymentOrderRepository,
+    payment_order_reconcile,
+)
+from app.schemas.payment_order_job_schema import AmountRule
+from app.schemas.payment_order_schema import PaymentOrderImportError
 from app.service.base_service import BaseService
 
+logger = logging.getLogger(__name__)
+
 
 class PaymentOrderService(
     BaseService[
@@ -22,9 +44,21 @@ class PaymentOrderService(
     ]
 ):
     repository = PaymentOrderRepository
+    create_schema = payment_order_schema.PaymentOrderCreate
+    update_schema = payment_order_schema.PaymentOrderUpdate
     output_schema = payment_order_schema.PaymentOrder
     query_schema = payment_order_schema.PaymentOrderView
-    relation_strategies = {"basic": ["site", "building"], "full": ["site", "building"]}
+    read_from_rows = True
+    cache_resource = "payment_order"
+    default_order_by = {"payment_due_date": "desc", "id": "asc"}
+    relation_strategies = {
+        "basic": {"site": "selectin", "building": "selectin"},
+        "full": {
+            "site": "selectin",
+            "building": "selectin",
+            "building.site": "selectin",
+        },
+    }
 
     def __init__(self, uow: AsyncUnitOfWork):
         super().__init__(uow)
@@ -43,3 +77,282 @@ class PaymentOrderService(
             created_by="",
         )
         return payment_order
+
+    def _read_csv_chunk(
+        self,
+        reader: csv.DictReader,
+        schema: Type[BaseModel],
+        make_record: Callable[[int, Any], Tuple[Any, ...]],
+        site_id: Optional[str] = None,
+    ) -> Tuple[int, List[Tuple[Any, ...]], List[PaymentOrderImportError]]:
+        """
+        Read and validate up to IMPORT_CHUNK_SIZE csv rows against schema.
+        Returns the number of rows read, the staging records make_record
+        built of the valid rows and the errors of the others.
+        """
+        count = 0
+        records: List[Tuple[Any, ...]] = []
+        errors: List[PaymentOrderImportError] = []
+        for row in itertools.islice(reader, config.IMPORT_CHUNK_SIZE):
+            count += 1
+            line_no = reader.line_num
+            if site_id:
+                if row.get("site_id") not in (None, "", site_id):
+                    errors.append(
+                        PaymentOrderImportError(
+                            line=line_no, errors=[f"site_id: must be {site_id}"]
+                        )
+                    )
+                    continue
+                row["site_id"] = site_id
+            try:
+                data = schema.model_validate(row)
+            except ValidationError as e:
+                errors.append(
+                    PaymentOrderImportError(
+                        line=line_no,
+                        errors=[
+                            f"{'.'.join(map(str, error['loc']))}: {error['msg']}"
+                            for error in e.errors()
+                        ],
+                    )
+                )
+                continue
+            records.append(make_record(line_no, data))
+        return count, records, errors
+
+    async def _open_csv(self, file: BinaryIO, required: Set[str]) -> csv.DictReader:
+        reader = csv.DictReader(
+            io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+        )
+        header = await asyncio.to_thread(lambda: reader.fieldnames)
+        missing = required - set(header or [])
+        if missing:
+            raise ValueError(f"Missing csv columns: {', '.join(sorted(missing))}")
+        return reader
+
+    @track_service_method
+    async def import_csv(
+        self, file: BinaryIO, site_id: Optional[str] = None
+    ) -> payment_order_schema.PaymentOrderImportReport:
+        """
+        Import payment orders from a csv file with a header row of
+        PaymentOrderCreate fields (site_id may come from the argument).
+        Rows are validated in chunks off the event loop, copied into a
+        staging table and merged with one INSERT ... SELECT; invalid rows
+        and rows of unknown buildings are reported, the others imported.
+        """
+        required = set(payment_order_schema.PaymentOrderCreate.model_fields)
+        if site_id:
+            required.discard("site_id")
+        reader = await self._open_csv(file, required)
+
+        report = payment_order_schema.PaymentOrderImportReport()
+        errors: List[PaymentOrderImportError] = []
+        async with self.uow as uow:
+            repository_instance = self.repository(uow.session)
+            await repository_instance.create_import_staging()
+            while True:
+                count, records, chunk_errors = await asyncio.to_thread(
+                    self._read_csv_chunk,
+                    reader,
+                    payment_order_schema.PaymentOrderCreate,
+                    lambda line_no, data: (
+                        line_no,
+                        str(uuid.uuid4()),
+                        *(getattr(data, name) for name in IMPORT_COLUMNS[2:]),
+                    ),
+                    site_id,
+                )
+                if not count:
+                    break
+                report.total += count
+                errors.extend(chunk_errors)
+                if records:
+                    await repository_instance.copy_import_rows(records)
+                    # record layout of IMPORT_COLUMNS: line_no, id, site_id ...
+                    self._invalidate_cached(*{record[2] for record in records})
+
+            imported, skipped = await repository_instance.merge_import(
+                created_at=datetime.now(), created_by=""
+            )
+            await repository_instance.drop_import_staging()
+
+        errors.extend(
+            PaymentOrderImportError(line=line_no, errors=["building_id: not found"])
+            for line_no in skipped
+        )
+        errors.sort(key=lambda error: error.line)
+        report.imported = imported
+        report.failed = len(errors)
+        report.errors = errors[: config.IMPORT_MAX_ERRORS]
+        return report
+
+    @track_service_method
+    async def reconcile_csv(
+        self, file: BinaryIO, site_id: str
+    ) -> payment_order_schema.PaymentReconcileReport:
+        """
+        Mark the payment orders paid by a remittance csv file (bank or
+        convenience store) of a site, with a header row of
+        PaymentReconcileLine fields. Lines are copied into a staging table
+        and each pays one unpaid order of the same house_no, amount and
+        due date (and building_id if given), see reconcile_payments;
+        invalid, unmatched, ambiguous and duplicate lines are reported.
+        """
+        required = set(payment_order_schema.PaymentReconcileLine.model_fields)
+        required.discard("building_id")
+        reader = await self._open_csv(file, required)
+
+        report = payment_order_schema.PaymentReconcileReport()
+        errors: List[PaymentOrderImportError] = []
+        async with self.uow as uow:
+            repository_instance = self.repository(uow.session)
+            await repository_instance.create_import_staging(payment_order_reconcile)
+            while True:
+                count, records, chunk_errors = await asyncio.to_thread(
+                    self._read_csv_chunk,
+                    reader,
+                    payment_order_schema.PaymentReconcileLine,
+                    lambda line_no, data: (
+                        line_no,
+                        *(getattr(data, name) for name in RECONCILE_COLUMNS[1:]),
+                    ),
+                )
+                if not count:
+                    break
+                report.total += count
+                errors.extend(chunk_errors)
+                if records:
+                    await repository_instance.copy_import_rows(
+                        records, payment_order_reconcile
+                    )
+
+            await repository_instance.analyze_staging(payment_order_reconcile)
+            result = await repository_instance.reconcile_payments(site_id)
+            self._invalidate_cached(site_id)
+            await repository_instance.drop_import_staging(payment_order_reconcile)
+
+        errors.extend(
+            PaymentOrderImportError(
+                line=line_no, errors=["no unpaid payment order matches"]
+            )
+            for line_no in result.unmatched
+        )
+        errors.extend(
+            PaymentOrderImportError(
+                line=line_no, errors=["matches several unpaid payment orders"]
+            )
+            for line_no in result.ambiguous
+        )
+        errors.extend(
+            PaymentOrderImportError(line=line_no, errors=[f"duplicate of line {first}"])
+            for line_no, first in result.duplicates
+        )
+        errors.sort(key=lambda error: error.line)
+        report.matched = len(result.paid)
+        report.updated = len({order_id for _, order_id in result.paid})
+        report.failed = len(errors)
+        report.errors = errors[: config.IMPORT_MAX_ERRORS]
+        return report
+
+    @track_service_method
+    async def create_generation_job(
+        self, request: payment_order_job_schema.PaymentOrderGenerate
+    ) -> payment_order_job_schema.PaymentOrderJob:
+        """
+        Create a pending payment order generation job, or return the
+        pending or running job of the same site, period and payment item;
+        jobs pending or running for PAYMENT_ORDER_JOB_TIMEOUT_SECONDS fail.
+        """
+        async with self.uow as uow:
+            jobs = PaymentOrderJobRepository(uow.session)
+            await jobs.expire_stale(
+                request.site_id,
+                request.period,
+                request.payment_item,
+                datetime.now()
+                - timedelta(seconds=config.PAYMENT_ORDER_JOB_TIMEOUT_SECONDS),
+            )
+            job = await jobs.get_active(
+                request.site_id, request.period, request.payment_item
+            )
+            if job is None:
+                job = PaymentOrderJob(
+                    id=str(uuid.uuid4()),
+                    **request.model_dump(),
+                    status="pending",
+                    created_at=datetime.now(),
+                )
+                await jobs.create(job)
+            return payment_order_job_schema.PaymentOrderJob.model_validate(job)
+
+    @track_service_method
+    async def get_generation_job(
+        self, job_id: str
+    ) -> Optional[payment_order_job_schema.PaymentOrderJob]:
+        async with self.uow.readonly() as uow:
+            job = await PaymentOrderJobRepository(uow.session).get_by_keys(id=job_id)
+            if job is None:
+                return None
+            return payment_order_job_schema.PaymentOrderJob.model_validate(job)
+
+    @track_service_method
+    async def run_generation_job(self, job_id: str):
+        """
+        Run a pending generation job, e.g. as a background task after the
+        request that created it. The job is claimed by moving it to
+        running, then the orders are inserted and the job marked done in
+        one transaction holding an advisory lock of its site, period and
+        payment item; if another worker holds the lock the job is skipped.
+        """
+        async with self.uow as uow:
+            jobs = PaymentOrderJobRepository(uow.session)
+            claimed = await jobs.update_where(
+                {"status": "running", "started_at": datetime.now()},
+                {("id", "="): job_id, ("status", "="): "pending"},
+            )
+        if not claimed:
+            # unknown, or already claimed by another run
+            return
+        job = claimed[0]
+
+        try:
+            async with self.uow as uow:
+                jobs = PaymentOrderJobRepository(uow.session)
+                repository_instance = self.repository(uow.session)
+                lock_key = "payment_order_generate:{site_id}:{period}:{payment_item}"
+                if await repository_instance.try_advisory_lock(lock_key.format(**job)):
+                    created_count = await repository_instance.generate_for_period(
+                        job["site_id"],
+                        job["period"],
+                        job["payment_item"],
+                        amount=(
+                            job["amount"]
+                            if job["amount_rule"] == AmountRule.fixed
+                            else None
+                        ),
+                        created_at=datetime.now(),
+                        created_by="",
+                    )
+                    result = {"status": "done", "created_count": created_count}
+                    self._invalidate_cached(job["site_id"])
+                else:
+                    result = {
+                        "status": "skipped",
+                        "message": "Generation is running in another worker",
+                    }
+                await jobs.update_where(
+                    {**result, "finished_at": datetime.now()}, {("id", "="): job_id}
+                )
+        except Exception as e:
+            logger.exception("Payment order generation job %s failed", job_id)
+            async with self.uow as uow:
+                await PaymentOrderJobRepository(uow.session).update_where(
+                    {
+                        "status": "failed",
+                        "message": str(e)[:200],
+                        "finished_at": datetime.now(),
+                    },
+                    {("id", "="): job_id},
+                )
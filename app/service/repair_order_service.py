@@ -22,9 +22,14 @@ class RepairOrderService(
     ]
 ):
     repository = RepairOrderRepository
+    create_schema = repair_order_schema.RepairOrderCreate
+    update_schema = repair_order_schema.RepairOrderUpdate
     output_schema = repair_order_schema.RepairOrder
     query_schema = repair_order_schema.RepairOrderView
-    relation_strategies = {"basic": ["site"], "full": ["site"]}
+    read_from_rows = True
+    cache_resource = "repair_order"
+    default_order_by = {"appointment_time": "desc", "id": "asc"}
+    relation_strategies = {"basic": {"site": "selectin"}, "full": {"site": "selectin"}}
 
     def __init__(self, uow: AsyncUnitOfWork):
         super().__init__(uow)
@@ -3,6 +3,7 @@ site service
 """
 
 import app.schemas.site_schema as site_schema
+from app.db.reference_cache import reference_cache
 from app.db.unit_of_work import AsyncUnitOfWork
 from app.repository.site_repository import SiteRepository
 
@@ -12,8 +13,14 @@ class SiteService:
         self.uow = uow
 
     async def get_sites(self) -> list[site_schema.Site]:
-        async with self.uow as uow:
+        """
+        All sites, served from the reference cache.
+        """
+        return await reference_cache.get_or_load("sites", self._load_sites)
+
+    async def _load_sites(self) -> list[site_schema.Site]:
+        async with self.uow.readonly() as uow:
             site_repo = SiteRepository(uow.session)
             sites = await site_repo.get_all()
 
-            return [site_schema.Site.model_validate(site) for site in sites]
+        return [site_schema.Site.model_validate(site) for site in sites]
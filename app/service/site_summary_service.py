@@ -0,0 +1,129 @@
+"""
+site_summary service
+"""
+
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Type
+
+from app.db.pool_metrics import track_service_method
+from app.db.unit_of_work import AsyncUnitOfWork
+from app.repository.announce_repository import AnnounceRepository
+from app.repository.base_repository import BaseRepository
+from app.repository.payment_order_repository import PaymentOrderRepository
+from app.repository.repair_order_repository import RepairOrderRepository
+from app.repository.site_summary_repository import SiteSummaryRepository
+
+logger = logging.getLogger(__name__)
+
+
+class SummaryMetric(NamedTuple):
+    repository: Type[BaseRepository]
+    # site_id, then the dimension and optional sub dimension columns
+    group_by: List[str]
+    filters: Optional[Dict[Tuple[str, str], Any]]
+    amount: Optional[str] = None
+
+
+# metric -> its definition, mirrored by the triggers of
+# migrations/003_site_summary.sql
+SUMMARY_METRICS: Dict[str, SummaryMetric] = {
+    "repair_order_open": SummaryMetric(
+        RepairOrderRepository,
+        ["site_id", "status", "item_type"],
+        {("status", "!="): "done"},
+    ),
+    "payment_order_unpaid": SummaryMetric(
+        PaymentOrderRepository,
+        ["site_id", "building_id"],
+        {("status", "="): "0"},
+        amount="amount",
+    ),
+    "announce": SummaryMetric(AnnounceRepository, ["site_id", "severity"], None),
+}
+
+Key = Tuple[str, str, str, str]
+
+
+class SiteSummaryService:
+    def __init__(self, uow: AsyncUnitOfWork):
+        self.uow = uow
+
+    async def _compute(self, uow: AsyncUnitOfWork) -> Dict[Key, Tuple[int, int]]:
+        """
+        Counters recomputed from the orders and announcements.
+        """
+        counters: Dict[Key, Tuple[int, int]] = {}
+        for metric, definition in SUMMARY_METRICS.items():
+            aggregates = {"count": ("count", None)}
+            if definition.amount:
+                aggregates["amount"] = ("sum", definition.amount)
+            rows = await definition.repository(uow.session).aggregate(
+                group_by=definition.group_by,
+                aggregates=aggregates,
+                filters=definition.filters,
+            )
+            for row in rows:
+                site_id, *dimensions = (row[name] for name in definition.group_by)
+                dimensions = [str(value) for value in dimensions] + [""]
+                key = (site_id, metric, dimensions[0], dimensions[1])
+                counters[key] = (row["count"], row.get("amount") or 0)
+        return counters
+
+    @track_service_method
+    async def reconcile(self) -> Optional[int]:
+        """
+        Correct counters that drifted from the data, e.g. after manual
+        changes with the triggers disabled. Trigger updates wait meanwhile.
+        :return: The number of corrected counters, None if another worker
+                 is reconciling.
+        """
+        async with self.uow as uow:
+            repository_instance = SiteSummaryRepository(uow.session)
+            if not await repository_instance.try_advisory_lock("site_summary"):
+                return None
+            await repository_instance.lock_for_reconcile()
+            expected = await self._compute(uow)
+            current = {
+                (row.site_id, row.metric, row.dimension, row.sub_dimension): (
+                    row.count,
+                    row.amount,
+                )
+                for row in await repository_instance.get_all()
+            }
+            inserts, updates = [], []
+            for key in expected.keys() | current.keys():
+                count, amount = expected.get(key, (0, 0))
+                if current.get(key, (0, 0)) == (count, amount):
+                    continue
+                site_id, metric, dimension, sub_dimension = key
+                values = {
+                    "site_id": site_id,
+                    "metric": metric,
+                    "dimension": dimension,
+                    "sub_dimension": sub_dimension,
+                    "count": count,
+                    "amount": amount,
+                }
+                (updates if key in current else inserts).append(values)
+            await repository_instance.save_counters(inserts, updates)
+        return len(inserts) + len(updates)
+
+
+async def reconcile_periodically(
+    create_uow: Callable[[], AsyncUnitOfWork], interval: float
+):
+    """
+    Reconcile the site counters every interval seconds, until cancelled.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            corrected = await SiteSummaryService(create_uow()).reconcile()
+        except Exception:
+            logger.exception("Site summary reconciliation failed")
+            continue
+        if corrected:
+            logger.warning(
+                "Site summary reconciliation corrected %s counters", corrected
+            )
@@ -11,3 +11,52 @@ MINIO_PORT = os.getenv("MINIO_PORT", default=None)
 MINIO_ACCESS_KEY = os.getenv("MINIO_ACCESS_KEY", default=None)
 MINIO_SECRET_KEY = os.getenv("MINIO_SECRET_KEY", default=None)
 UPLOAD_DIR = "./uploads"
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "500"))
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "500"))
+STATEMENT_CACHE_SIZE = int(os.getenv("STATEMENT_CACHE_SIZE", "500"))
+# reads of a client go to the primary for this long after it wrote
+READ_YOUR_WRITES_SECONDS = int(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+READ_YOUR_WRITES_COOKIE = "rw_until"
+READ_YOUR_WRITES_HEADER = "X-Read-Your-Writes"
+# pooled connections opened per engine at startup
+DB_POOL_WARMUP = int(os.getenv("DB_POOL_WARMUP", "5"))
+# how long shutdown waits for in-flight requests before closing the pools
+SHUTDOWN_DRAIN_SECONDS = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", "20"))
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "200"))
+# payment order csv import: rows validated and copied per chunk
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "5000"))
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+# pending or running payment order generation jobs older than this are
+# taken for dead (e.g. their worker stopped) and fail on the next request
+PAYMENT_ORDER_JOB_TIMEOUT_SECONDS = float(
+    os.getenv("PAYMENT_ORDER_JOB_TIMEOUT_SECONDS", "3600")
+)
+# months of repair order history on the site dashboard
+DASHBOARD_MONTHS = int(os.getenv("DASHBOARD_MONTHS", "12"))
+# seconds between reconciliations of the site summary counters, 0 disables
+SUMMARY_RECONCILE_SECONDS = float(os.getenv("SUMMARY_RECONCILE_SECONDS", "3600"))
+# list totals (X-Total-Count) are counted exactly up to this many records,
+# larger totals are estimated by the planner
+TOTAL_COUNT_EXACT_LIMIT = int(os.getenv("TOTAL_COUNT_EXACT_LIMIT", "1000"))
+# in-process cache of sites and buildings, see app/db/reference_cache.py
+REFERENCE_CACHE_TTL_SECONDS = float(os.getenv("REFERENCE_CACHE_TTL_SECONDS", "600"))
+REFERENCE_CACHE_SIZE = int(os.getenv("REFERENCE_CACHE_SIZE", "256"))
+REFERENCE_CHANNEL = os.getenv("REFERENCE_CHANNEL", "reference_changed")
+# response cache of list endpoints: "memory" (per worker), "redis" or "off".
+# memory: writes invalidate the worker's own cache and NOTIFY the others on
+# REFERENCE_CHANNEL, which only reach workers listening on it (not with
+# DB_PGBOUNCER or a non asyncpg driver): those serve stale lists for up to
+# the TTL, use redis with several workers there.
+# redis: shared by the workers; a read racing a write may still store a
+# stale list, for up to the TTL.
+# both: site and building changes, embedded in the lists, clear the cache
+# through the NOTIFY of their triggers (migrations/004), so again only on
+# listening workers.
+RESPONSE_CACHE = os.getenv("RESPONSE_CACHE", "memory")
+# redis://host:port/db of the "redis" backend
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL", "redis://localhost:6379/0")
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "30"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2000"))
+# seconds an identical concurrent read waits for the one in flight before
+# querying itself, 0 disables coalescing, see app/utils/single_flight.py
+SINGLE_FLIGHT_MAX_WAIT_SECONDS = float(os.getenv("SINGLE_FLIGHT_MAX_WAIT_SECONDS", "2"))
@@ -0,0 +1,58 @@
+"""
+opaque cursor for keyset pagination
+"""
+
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from typing import Any, List, Sequence
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        raise InvalidCursorError("Malformed cursor value")
+    return value
+
+
+def encode_cursor(keys: Sequence[str], values: Sequence[Any]) -> str:
+    """
+    Encode the sort keys and the last row's values into an opaque cursor.
+    """
+    payload = {"k": list(keys), "v": [_encode_value(value) for value in values]}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str, keys: Sequence[str]) -> List[Any]:
+    """
+    Decode a cursor created by encode_cursor.
+    The cursor must have been issued for the same sort keys.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        cursor_keys, values = payload["k"], payload["v"]
+    except (binascii.Error, UnicodeError, ValueError, TypeError, KeyError):
+        raise InvalidCursorError("Malformed cursor")
+
+    if cursor_keys != list(keys) or len(values) != len(keys):
+        raise InvalidCursorError("Cursor does not match the requested sort order")
+
+    return [_decode_value(value) for value in values]
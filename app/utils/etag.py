@@ -0,0 +1,114 @@
+"""
+etag helpers for record versions
+"""
+
+import hashlib
+import json
+from datetime import timezone
+from email.utils import format_datetime
+from typing import Dict, Optional
+
+from fastapi import Header, HTTPException, Request, Response
+
+from app.schemas.common_schema import ListVersion
+
+
+def make_etag(version: int) -> str:
+    """
+    Strong ETag of a record version.
+    """
+    return f'"{version}"'
+
+
+def set_etag(response: Response, version: Optional[int]):
+    if version is not None:
+        response.headers["ETag"] = make_etag(version)
+
+
+def parse_etag(etag: str) -> int:
+    """
+    Record version of an ETag created by make_etag.
+    Raises ValueError for weak or malformed tags.
+    """
+    etag = etag.strip()
+    if len(etag) < 3 or etag[0] != '"' or etag[-1] != '"':
+        raise ValueError(f"Invalid ETag: {etag}")
+    return int(etag[1:-1])
+
+
+def if_match_version(if_match: str | None = Header(None)) -> Optional[int]:
+    """
+    Dependency mapping an If-Match header to the expected record version.
+    No header or '*' means any version; a tag that can never match
+    (weak, malformed, not ours) fails the precondition.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    try:
+        return parse_etag(if_match)
+    except ValueError:
+        raise HTTPException(status_code=412, detail="If-Match does not match")
+
+
+def record_not_modified(
+    if_none_match: Optional[str], version: Optional[int]
+) -> Optional[Response]:
+    """
+    304 response of a record GET whose If-None-Match matches the ETag of
+    the record version, None otherwise.
+    """
+    if version is None or not etag_matches(if_none_match, make_etag(version)):
+        return None
+    return not_modified({"ETag": make_etag(version)})
+
+
+def list_validators(request: Request, version: ListVersion) -> Dict[str, str]:
+    """
+    ETag and Last-Modified of a list response. The weak ETag covers the
+    list's version and the query parameters, as pages of one list differ.
+    """
+    query = sorted(request.query_params.multi_items())
+    raw = json.dumps(
+        [
+            query,
+            version.count,
+            version.versions,
+            version.updated_at.isoformat() if version.updated_at else None,
+        ]
+    )
+    headers = {"ETag": f'W/"{hashlib.sha1(raw.encode()).hexdigest()[:20]}"'}
+    if version.updated_at is not None:
+        updated_at = version.updated_at
+        if updated_at.tzinfo is None:
+            # no time zone outside of Postgres: sqlite's now() is UTC
+            updated_at = updated_at.replace(tzinfo=timezone.utc)
+        headers["Last-Modified"] = format_datetime(
+            updated_at.astimezone(timezone.utc), usegmt=True
+        )
+    return headers
+
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """
+    Weak comparison of an If-None-Match header with an ETag.
+    """
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(",")
+    )
+
+
+def not_modified(headers: Dict[str, str]) -> Response:
+    """
+    304 response carrying the validators of headers.
+    """
+    validators = {
+        name: value
+        for name, value in headers.items()
+        if name in ("ETag", "Last-Modified")
+    }
+    return Response(status_code=304, headers=validators)
@@ -0,0 +1,361 @@
+"""
+response cache of GET endpoints
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from fastapi import Request, Response
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import app.utils.config as config
+from app.db.routing import is_primary_pinned
+from app.schemas.common_schema import ListVersion
+from app.utils.etag import etag_matches, list_validators, not_modified
+from app.utils.lru import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# response body and headers
+Entry = Tuple[bytes, Dict[str, str]]
+
+# prefix of the bucket names, and of the invalidations broadcast on
+# REFERENCE_CHANNEL (whose other payloads are reference table names)
+BUCKET_PREFIX = "response:"
+
+
+class CacheBackendError(Exception):
+    pass
+
+
+class MemoryBackend:
+    """
+    Per-worker LRU of entries grouped in buckets; a bucket is invalidated
+    by bumping its version, all of them by bumping the epoch. The other
+    workers learn of invalidations by broadcast, see ResponseCache.
+    """
+
+    shared = False
+
+    def __init__(self, max_size: int):
+        # (bucket, key) -> (expires at, token, entry)
+        self._entries: LRUCache[Tuple[float, Any, bytes]] = LRUCache(max_size)
+        self._versions: Dict[str, int] = {}
+        self._epoch = 0
+
+    async def get(self, bucket: str, key: str) -> Optional[bytes]:
+        item = self._entries.get((bucket, key))
+        if item is None:
+            return None
+        expires_at, token, value = item
+        if expires_at < time.monotonic() or token != self.token(bucket):
+            self._entries.pop((bucket, key))
+            return None
+        return value
+
+    def token(self, bucket: str) -> Any:
+        return self._epoch, self._versions.get(bucket, 0)
+
+    async def set(self, bucket: str, key: str, value: bytes, ttl: int, token: Any):
+        # not cached if the bucket was invalidated while producing the value
+        if token == self.token(bucket):
+            self._entries.set((bucket, key), (time.monotonic() + ttl, token, value))
+
+    async def invalidate(self, buckets: List[str]):
+        for bucket in buckets:
+            self._versions[bucket] = self._versions.get(bucket, 0) + 1
+
+    async def clear(self):
+        self._epoch += 1
+        self._entries.clear()
+        self._versions.clear()
+
+
+class RedisBackend:
+    """
+    Entries shared by all workers in Redis (or any server speaking its
+    protocol), one hash per bucket so that a bucket is dropped with one DEL.
+    Speaks RESP over a few pooled asyncio connections.
+    """
+
+    shared = True
+
+    def __init__(self, url: str, max_idle: int = 10, timeout: float = 1.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.password = parsed.password
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    @staticmethod
+    def _encode(*args: Any) -> bytes:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+
+    @classmethod
+    async def _read_reply(cls, reader: asyncio.StreamReader) -> Any:
+        line = await reader.readline()
+        if not line:
+            raise CacheBackendError("Connection closed")
+        kind, data = line[:1], line[1:-2]
+        if kind == b"+":
+            return data
+        if kind == b"-":
+            raise CacheBackendError(data.decode())
+        if kind == b":":
+            return int(data)
+        if kind == b"$":
+            if int(data) < 0:
+                return None
+            return (await reader.readexactly(int(data) + 2))[:-2]
+        if kind == b"*":
+            if int(data) < 0:
+                return None
+            return [await cls._read_reply(reader) for _ in range(int(data))]
+        raise CacheBackendError(f"Unexpected reply: {line!r}")
+
+    async def _connect(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        if setup:
+            writer.write(b"".join(self._encode(*command) for command in setup))
+            for _ in setup:
+                await self._read_reply(reader)
+        return reader, writer
+
+    async def pipeline(self, *commands: Tuple[Any, ...]) -> List[Any]:
+        """
+        Send commands in one write and read their replies.
+        """
+        connection = self._idle.pop() if self._idle else None
+        try:
+            async with asyncio.timeout(self.timeout):
+                if connection is None:
+                    connection = await self._connect()
+                reader, writer = connection
+                writer.write(b"".join(self._encode(*command) for command in commands))
+                replies = [await self._read_reply(reader) for _ in commands]
+        except CacheBackendError:
+            # replies left unread, the connection can't be reused
+            if connection:
+                connection[1].close()
+            raise
+        except (OSError, TimeoutError, asyncio.IncompleteReadError) as e:
+            if connection:
+                connection[1].close()
+            raise CacheBackendError(str(e) or type(e).__name__) from e
+        if len(self._idle) < self.max_idle:
+            self._idle.append(connection)
+        else:
+            connection[1].close()
+        return replies
+
+    async def get(self, bucket: str, key: str) -> Optional[bytes]:
+        (value,) = await self.pipeline(("HGET", bucket, key))
+        return value
+
+    def token(self, bucket: str) -> Any:
+        # an invalidation racing with a miss is only bounded by the ttl
+        return None
+
+    async def set(self, bucket: str, key: str, value: bytes, ttl: int, token: Any):
+        # the bucket expires as a whole, ttl after its last write
+        await self.pipeline(("HSET", bucket, key, value), ("EXPIRE", bucket, ttl))
+
+    async def invalidate(self, buckets: List[str]):
+        await self.pipeline(("DEL", *buckets))
+
+    async def clear(self):
+        cursor = b"0"
+        while True:
+            ((cursor, buckets),) = await self.pipeline(
+                ("SCAN", cursor, "MATCH", f"{BUCKET_PREFIX}*", "COUNT", 500)
+            )
+            if buckets:
+                await self.invalidate(buckets)
+            if cursor == b"0":
+                return
+
+
+class ResponseCache:
+    """
+    Cache of GET responses keyed by path, query parameters and auth scope,
+    grouped in buckets per resource and site so that writes invalidate
+    only the lists of their site (and the site-less lists).
+    Backend failures degrade to cache misses.
+    With a per-worker backend, writes also broadcast their invalidations
+    with NOTIFY on REFERENCE_CHANNEL, delivered when they commit; the
+    workers' reference data listeners apply them.
+    """
+
+    def __init__(self, backend: MemoryBackend | RedisBackend | None, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+
+    @staticmethod
+    def bucket(resource: str, site_id: Optional[str]) -> str:
+        return f"{BUCKET_PREFIX}{resource}:{site_id or '*'}"
+
+    @staticmethod
+    def key(request: Request, auth: Optional[dict]) -> str:
+        query = sorted(request.query_params.multi_items())
+        raw = json.dumps([request.url.path, query, auth_scope(auth)])
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    async def respond(
+        self,
+        request: Request,
+        resource: str,
+        site_id: Optional[str],
+        auth: Optional[dict],
+        produce: Callable[[], Awaitable[Entry]],
+        probe: Optional[Callable[[], Awaitable[ListVersion]]] = None,
+    ) -> Response:
+        """
+        Serve a JSON response from the cache, or produce and cache it.
+        Clients pinned to the primary after a write bypass the cache.
+        With probe, the response gets ETag and Last-Modified headers and
+        a matching If-None-Match is answered with 304 before anything
+        is produced.
+        """
+        if_none_match = request.headers.get("If-None-Match")
+        cached = None
+        use_cache = self.backend is not None and not is_primary_pinned()
+        if use_cache:
+            bucket, key = self.bucket(resource, site_id), self.key(request, auth)
+            try:
+                cached = await self.backend.get(bucket, key)
+            except CacheBackendError as e:
+                logger.warning("Response cache read failed: %s", e)
+        if cached is not None:
+            headers_size = int.from_bytes(cached[:4], "big")
+            headers = json.loads(cached[4 : 4 + headers_size])
+            if etag_matches(if_none_match, headers.get("ETag")):
+                return not_modified(headers)
+            return Response(
+                cached[4 + headers_size :],
+                headers={**headers, "X-Cache": "hit"},
+                media_type="application/json",
+            )
+
+        if use_cache:
+            token = self.backend.token(bucket)
+        validators = {}
+        if probe is not None:
+            # probed before producing: a write in between only makes the
+            # ETag older than the body, so the next request refetches
+            validators = list_validators(request, await probe())
+            if etag_matches(if_none_match, validators["ETag"]):
+                return not_modified(validators)
+        body, headers = await produce()
+        headers = {**validators, **headers}
+        if not use_cache:
+            return Response(body, headers=headers, media_type="application/json")
+
+        encoded_headers = json.dumps(headers).encode()
+        value = len(encoded_headers).to_bytes(4, "big") + encoded_headers + body
+        try:
+            await self.backend.set(bucket, key, value, self.ttl, token)
+        except CacheBackendError as e:
+            logger.warning("Response cache write failed: %s", e)
+        return Response(
+            body, headers={**headers, "X-Cache": "miss"}, media_type="application/json"
+        )
+
+    def buckets(self, resource: str, site_ids: List[Optional[str]]) -> List[str]:
+        buckets = {self.bucket(resource, None)}
+        buckets.update(self.bucket(resource, site_id) for site_id in site_ids)
+        return sorted(buckets)
+
+    async def invalidate(self, resource: str, site_ids: List[Optional[str]]):
+        await self.invalidate_buckets(self.buckets(resource, site_ids))
+
+    async def invalidate_buckets(self, buckets: List[str]):
+        if self.backend is None:
+            return
+        try:
+            await self.backend.invalidate(buckets)
+        except CacheBackendError as e:
+            logger.warning("Response cache invalidation failed: %s", e)
+
+    async def clear(self):
+        """
+        Drop every cached response, e.g. after a change of the site or
+        building rows they embed.
+        """
+        if self.backend is None:
+            return
+        try:
+            await self.backend.clear()
+        except CacheBackendError as e:
+            logger.warning("Response cache clear failed: %s", e)
+
+    async def broadcast(
+        self, session: AsyncSession, resource: str, site_ids: List[Optional[str]]
+    ):
+        """
+        Notify the other workers, within the writing transaction, to
+        invalidate the buckets; nothing is delivered if it rolls back.
+        """
+        if self.backend is None or self.backend.shared:
+            return
+        if session.get_bind().dialect.name != "postgresql":
+            return
+        await session.execute(
+            select(
+                func.pg_notify(
+                    config.REFERENCE_CHANNEL,
+                    "\n".join(self.buckets(resource, site_ids)),
+                )
+            )
+        )
+
+    async def apply_broadcast(self, payload: str) -> bool:
+        """
+        Apply an invalidation broadcast by another worker.
+        :return: False if payload is not an invalidation broadcast.
+        """
+        if not payload.startswith(BUCKET_PREFIX):
+            return False
+        if self.backend is not None and not self.backend.shared:
+            await self.invalidate_buckets(payload.split("\n"))
+        return True
+
+
+def auth_scope(auth: Optional[dict]) -> str:
+    """
+    Part of the caller's identity that responses may depend on: the auth
+    type and the token's scope claim, not the individual user.
+    """
+    if not auth:
+        return ""
+    return f"{auth.get('auth_type', '')}:{(auth.get('payload') or {}).get('scope', '')}"
+
+
+def create_response_cache() -> ResponseCache:
+    if config.RESPONSE_CACHE == "redis":
+        backend = RedisBackend(config.RESPONSE_CACHE_URL)
+    elif config.RESPONSE_CACHE == "memory":
+        backend = MemoryBackend(config.RESPONSE_CACHE_SIZE)
+    else:
+        backend = None
+    return ResponseCache(backend, config.RESPONSE_CACHE_TTL_SECONDS)
+
+
+response_cache = create_response_cache()
@@ -0,0 +1,27 @@
+"""
+json serialization of validated models
+"""
+
+import functools
+from typing import Any, List, Type
+
+from pydantic import BaseModel, TypeAdapter
+
+
+@functools.lru_cache(maxsize=None)
+def list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    """
+    TypeAdapter of list[model], built once per model.
+    """
+    return TypeAdapter(list[model])
+
+
+def dump_models(items: List[Any]) -> bytes:
+    """
+    JSON array of already validated models of one type, as the routes'
+    response_model renders it, serialized in one pydantic-core call
+    without validating them again.
+    """
+    if not items:
+        return b"[]"
+    return list_adapter(type(items[0])).dump_json(items)
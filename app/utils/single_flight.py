@@ -0,0 +1,71 @@
+"""
+single-flight coalescing of identical concurrent calls
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+import app.utils.config as config
+
+
+class SingleFlight:
+    """
+    Share one in-flight call between concurrent callers of the same key:
+    the first caller (the leader) runs it, later callers wait up to
+    max_wait seconds for its result (or exception) and then run the call
+    themselves. Callers share the result object, treat it as read-only.
+    """
+
+    def __init__(self, max_wait: float):
+        self.max_wait = max_wait
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.shared = 0
+        self.timeouts = 0
+
+    async def run(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._calls.get(key)
+        if future is not None:
+            return await self._follow(future, call)
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            # e.g. the leader's client went away: followers run their own
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # retrieved, so a call without followers logs no warning
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._calls),
+            "shared": self.shared,
+            "timeouts": self.timeouts,
+        }
+
+    async def _follow(
+        self, future: asyncio.Future, call: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        # asyncio.wait neither raises the call's exception nor cancels it
+        await asyncio.wait([future], timeout=self.max_wait)
+        if not future.done():
+            self.timeouts += 1
+            return await call()
+        if future.cancelled():
+            return await call()
+        self.shared += 1
+        return future.result()
+
+
+# reads of BaseService, see coalesce_reads
+read_flights = SingleFlight(config.SINGLE_FLIGHT_MAX_WAIT_SECONDS)
@@ -0,0 +1,51 @@
+"""
+streaming response helpers
+"""
+
+from typing import AsyncIterator, List
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from app.utils.serialization import dump_models
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+async def iter_ndjson(chunks: AsyncIterator[List[BaseModel]]) -> AsyncIterator[bytes]:
+    """
+    Serialize chunks of models as newline-delimited JSON.
+    """
+    async for items in chunks:
+        if items:
+            yield b"".join(item.model_dump_json().encode() + b"\n" for item in items)
+
+
+async def iter_json_array(
+    chunks: AsyncIterator[List[BaseModel]],
+) -> AsyncIterator[bytes]:
+    """
+    Serialize chunks of models as a JSON array, built incrementally.
+    """
+    yield b"["
+    first = True
+    async for items in chunks:
+        if not items:
+            continue
+        # the chunk's array without its brackets
+        body = dump_models(items)[1:-1]
+        yield body if first else b"," + body
+        first = False
+    yield b"]"
+
+
+def streaming_response(
+    request: Request, chunks: AsyncIterator[List[BaseModel]]
+) -> StreamingResponse:
+    """
+    Stream NDJSON if the client accepts it, otherwise a JSON array.
+    """
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        return StreamingResponse(iter_ndjson(chunks), media_type=NDJSON_MEDIA_TYPE)
+    return StreamingResponse(iter_json_array(chunks), media_type="application/json")
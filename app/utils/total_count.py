@@ -0,0 +1,18 @@
+"""
+total count headers of list routes
+"""
+
+from typing import Dict
+
+from app.schemas.common_schema import TotalCount
+
+TOTAL_COUNT_HEADER = "X-Total-Count"
+# "exact" or "estimate"
+TOTAL_COUNT_TYPE_HEADER = "X-Total-Count-Type"
+
+
+def total_count_headers(total: TotalCount) -> Dict[str, str]:
+    return {
+        TOTAL_COUNT_HEADER: str(total.count),
+        TOTAL_COUNT_TYPE_HEADER: "exact" if total.exact else "estimate",
+    }
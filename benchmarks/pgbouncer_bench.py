@@ -0,0 +1,95 @@
+"""
+pgbouncer benchmark
+
+Compares request throughput of the default engine connected straight to
+Postgres with the PgBouncer mode engine (no asyncpg statement cache,
+uniquely named statements, NullPool or a small local pool) connected
+through PgBouncer in transaction pooling mode. Both engines use the
+options of app.db.database_async.engine_options.
+
+Each worker runs request-like transactions (one short parameterized
+query, then commit) for a fixed duration.
+
+usage:
+    BENCH_DIRECT_DSN=postgresql+asyncpg://user:pw@postgres:5432/db \
+    BENCH_PGBOUNCER_DSN=postgresql+asyncpg://user:pw@pgbouncer:6432/db \
+    python -m benchmarks.pgbouncer_bench [workers] [seconds]
+
+DB_PGBOUNCER_POOL_SIZE picks the local pool of the PgBouncer engine
+(0, the default, is NullPool).
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("DB_PORT", "5432")
+
+from sqlalchemy import text  # noqa
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine  # noqa
+
+from app.db.database_async import engine_options  # noqa
+
+QUERY = text(
+    "SELECT relname, relpages FROM pg_class WHERE relkind = :kind "
+    "ORDER BY relname LIMIT 20"
+)
+
+
+async def worker(engine: AsyncEngine, deadline: float, latencies: list):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        async with engine.connect() as connection:
+            await connection.execute(QUERY, {"kind": "r"})
+            await connection.commit()
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(name: str, engine: AsyncEngine, workers: int, seconds: float):
+    # one untimed round so connection setup doesn't skew short runs
+    await worker(engine, time.perf_counter() + 0.5, [])
+
+    latencies: list = []
+    deadline = time.perf_counter() + seconds
+    await asyncio.gather(*(worker(engine, deadline, latencies) for _ in range(workers)))
+    await engine.dispose()
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else 0
+    print(
+        f"{name:<10} {len(latencies) / seconds:>9.0f} req/s"
+        f"  p50 {statistics.median(latencies) * 1000:>7.2f} ms"
+        f"  p99 {p99 * 1000:>7.2f} ms"
+    )
+
+
+async def main(workers: int, seconds: float):
+    direct_dsn = os.getenv("BENCH_DIRECT_DSN")
+    pgbouncer_dsn = os.getenv("BENCH_PGBOUNCER_DSN")
+    if not direct_dsn or not pgbouncer_dsn:
+        sys.exit("set BENCH_DIRECT_DSN and BENCH_PGBOUNCER_DSN")
+
+    print(f"{workers} workers, {seconds:.0f}s per run")
+    await run(
+        "direct",
+        create_async_engine(direct_dsn, **engine_options(pgbouncer=False)),
+        workers,
+        seconds,
+    )
+    await run(
+        "pgbouncer",
+        create_async_engine(pgbouncer_dsn, **engine_options(pgbouncer=True)),
+        workers,
+        seconds,
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(
+        main(
+            int(sys.argv[1]) if len(sys.argv) > 1 else 50,
+            float(sys.argv[2]) if len(sys.argv) > 2 else 10,
+        )
+    )
@@ -0,0 +1,127 @@
+"""
+serialization benchmark
+
+Compares ways of rendering a list of already validated RepairOrderView
+models as a JSON response body:
+
+- response_model: what FastAPI does with response_model=list[...] and the
+  default JSONResponse (validate again, dump to python, jsonable_encoder,
+  json.dumps)
+- per model:      one model_dump_json per row, joined
+- list adapter:   app.utils.serialization.dump_models, one pydantic-core
+                  call through a cached TypeAdapter
+- fresh lookups:  list adapter, with the lookup serializers building a
+                  LookupValue per field per row instead of reusing them
+
+usage:
+    python -m benchmarks.serialization_bench [rows] [rounds]
+"""
+
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter, field_serializer
+
+from app.schemas.common_schema import LookupValue
+from app.schemas.repair_order_schema import (
+    ITEM_TYPES,
+    REGIONS,
+    REPAIR_ORDER_STATUS,
+    RESERVATION_BYS,
+    RepairOrderView,
+)
+from app.utils.serialization import dump_models
+
+
+class FreshLookupRepairOrderView(RepairOrderView):
+    @field_serializer("region")
+    def format_region(self, region: str | None) -> LookupValue | None:
+        return LookupValue(id=region, value=REGIONS[region])
+
+    @field_serializer("item_type")
+    def format_item_type(self, item_type: str | None) -> LookupValue | None:
+        return LookupValue(id=item_type, value=ITEM_TYPES[item_type])
+
+    @field_serializer("reservation_by")
+    def format_reservation_by(self, reservation_by: str | None) -> LookupValue | None:
+        return LookupValue(id=reservation_by, value=RESERVATION_BYS[reservation_by])
+
+    @field_serializer("status")
+    def format_status(self, status: str | None) -> LookupValue | None:
+        return LookupValue(id=status, value=REPAIR_ORDER_STATUS[status])
+
+
+def make_rows(model, count: int) -> list:
+    start = datetime(2026, 1, 1)
+    regions, item_types = list(REGIONS), list(ITEM_TYPES)
+    reservation_bys, statuses = list(RESERVATION_BYS), list(REPAIR_ORDER_STATUS)
+    return [
+        model(
+            id=f"r{i:06d}",
+            site_id="s1",
+            applicant=f"applicant {i}",
+            region=regions[i % len(regions)],
+            item_type=item_types[i % len(item_types)],
+            description="the light of the lobby flickers",
+            reservation_by=reservation_bys[i % len(reservation_bys)],
+            appointment_time=start + timedelta(minutes=i),
+            status=statuses[i % len(statuses)],
+            created_at=start,
+            created_by="admin",
+            site={"site_id": "s1", "site_name": "site one"},
+        )
+        for i in range(count)
+    ]
+
+
+# FastAPI builds the response field once per route
+response_adapter = TypeAdapter(list[RepairOrderView])
+
+
+def response_model(items: list) -> bytes:
+    content = jsonable_encoder(
+        response_adapter.dump_python(
+            response_adapter.validate_python(items), mode="json"
+        )
+    )
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode()
+
+
+def per_model(items: list) -> bytes:
+    return b"[" + b",".join(item.model_dump_json().encode() for item in items) + b"]"
+
+
+def run(name: str, render, items: list, rounds: int):
+    render(items)
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        body = render(items)
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    print(
+        f"{name:<15} {best * 1000:>8.2f} ms"
+        f"  {len(items) / best:>10.0f} rows/s  {len(body):>9} bytes"
+    )
+
+
+def main(count: int, rounds: int):
+    rows = make_rows(RepairOrderView, count)
+    fresh_rows = make_rows(FreshLookupRepairOrderView, count)
+    print(f"{count} rows, best of {rounds} rounds")
+    run("response_model", response_model, rows, rounds)
+    run("per model", per_model, rows, rounds)
+    run("list adapter", dump_models, rows, rounds)
+    run("fresh lookups", dump_models, fresh_rows, rounds)
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 10000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 5,
+    )
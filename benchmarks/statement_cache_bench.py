@@ -0,0 +1,107 @@
+"""
+statement cache benchmark
+
+Measures the per-request cost of BaseRepository.query for a typical
+read_repair_orders filter shape against an in-memory SQLite database:
+
+- rebuilt: the statement is rebuilt on every call (statement cache cleared),
+  SQLAlchemy still reuses its compiled form through the cache key
+- uncompiled: rebuilt and compiled on every call (SQLAlchemy cache disabled)
+- cached: the prebuilt statement is reused, only parameters change
+
+usage: python -m benchmarks.statement_cache_bench [iterations]
+"""
+
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DB_PORT", "5432")
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa
+
+import app.models.announce_model  # noqa
+import app.models.building_model  # noqa
+import app.models.payment_order_model  # noqa
+import app.repository.base_repository as base_repository  # noqa
+from app.db.database import Base  # noqa
+from app.models.repair_order_model import RepairOrder  # noqa
+from app.models.site_model import Site  # noqa
+from app.repository.repair_order_repository import RepairOrderRepository  # noqa
+from app.schemas.repair_order_schema import RepairOrderView  # noqa
+
+FILTERS = {
+    ("site_id", "="): "site-1",
+    ("appointment_time", ">="): datetime(2025, 1, 1),
+    ("appointment_time", "<="): datetime(2025, 2, 1),
+}
+LOAD_RELATIONS = {"*": "raise", "site": "selectin"}
+
+
+async def seed(session_factory):
+    async with session_factory() as session:
+        session.add(Site(site_id="site-1", site_name="site"))
+        for i in range(20):
+            session.add(
+                RepairOrder(
+                    id=f"order-{i}",
+                    site_id="site-1",
+                    applicant="applicant",
+                    region="public",
+                    item_type="elevator",
+                    reservation_by="self",
+                    appointment_time=datetime(2025, 1, 1) + timedelta(days=i),
+                    status="init",
+                )
+            )
+        await session.commit()
+
+
+async def run(session_factory, iterations: int, clear_cache: bool, rows: bool):
+    async with session_factory() as session:
+        repository = RepairOrderRepository(session)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            if clear_cache:
+                base_repository._statement_cache.clear()
+            if rows:
+                await repository.query_rows(RepairOrderView, filters=FILTERS)
+            else:
+                await repository.query(load_relations=LOAD_RELATIONS, filters=FILTERS)
+        return (time.perf_counter() - start) / iterations * 1e6
+
+
+async def main(iterations: int):
+    results = {}
+    for name, cache_size, clear_cache in (
+        ("uncompiled", 0, True),
+        ("rebuilt", 500, True),
+        ("cached", 500, False),
+    ):
+        engine = create_async_engine("sqlite+aiosqlite://", query_cache_size=cache_size)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(bind=engine, autoflush=False)
+        await seed(session_factory)
+        for rows in (False, True):
+            # warm up
+            await run(session_factory, 50, clear_cache, rows)
+            results[(name, rows)] = await run(
+                session_factory, iterations, clear_cache, rows
+            )
+        await engine.dispose()
+
+    print(f"{'mode':<12}{'orm us/call':>14}{'rows us/call':>14}")
+    for name in ("uncompiled", "rebuilt", "cached"):
+        print(
+            f"{name:<12}{results[(name, False)]:>14.1f}{results[(name, True)]:>14.1f}"
+        )
+    for rows, label in ((False, "orm"), (True, "rows")):
+        saved = results[("rebuilt", rows)] - results[("cached", rows)]
+        print(f"saved per request ({label}): {saved:.1f} us")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
@@ -0,0 +1,4 @@
+-- optimistic concurrency: record versions checked by conditional updates
+ALTER TABLE repair_order ADD COLUMN IF NOT EXISTS version integer NOT NULL DEFAULT 1;
+ALTER TABLE payment_order ADD COLUMN IF NOT EXISTS version integer NOT NULL DEFAULT 1;
+ALTER TABLE announce ADD COLUMN IF NOT EXISTS version integer NOT NULL DEFAULT 1;
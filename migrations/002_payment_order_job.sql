@@ -0,0 +1,18 @@
+-- server-side payment order generation jobs
+CREATE TABLE IF NOT EXISTS payment_order_job (
+    id varchar(64) PRIMARY KEY,
+    site_id varchar(64) NOT NULL REFERENCES site (site_id),
+    period varchar(20) NOT NULL,
+    payment_item varchar(60) NOT NULL,
+    amount_rule varchar(20) NOT NULL,
+    amount integer,
+    status varchar(20) NOT NULL,
+    created_count integer,
+    message varchar(200),
+    created_at timestamp NOT NULL,
+    finished_at timestamp
+);
+
+-- households and idempotency checks of a generation run
+CREATE INDEX IF NOT EXISTS ix_payment_order_site_item_due
+    ON payment_order (site_id, payment_item, payment_due_date);
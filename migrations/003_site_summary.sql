@@ -0,0 +1,164 @@
+-- per-site counters kept current by statement-level triggers, read by the
+-- site dashboard with a primary key lookup. The metrics mirror
+-- SUMMARY_METRICS in app/service/site_summary_service.py, whose reconcile
+-- job corrects any drift:
+--   repair_order_open     dimension status, sub_dimension item_type (status <> 'done')
+--   payment_order_unpaid  dimension building_id, count and amount (status = '0')
+--   announce              dimension severity
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS site_summary (
+    site_id varchar(64) NOT NULL,
+    metric varchar(40) NOT NULL,
+    dimension varchar(64) NOT NULL,
+    sub_dimension varchar(64) NOT NULL DEFAULT '',
+    count bigint NOT NULL DEFAULT 0,
+    amount bigint NOT NULL DEFAULT 0,
+    PRIMARY KEY (site_id, metric, dimension, sub_dimension)
+);
+
+-- subtract the rows an UPDATE or DELETE changed, add the rows an INSERT or
+-- UPDATE wrote: one upsert per group and statement, however many rows
+CREATE OR REPLACE FUNCTION site_summary_repair_order() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO site_summary AS s (site_id, metric, dimension, sub_dimension, count)
+            SELECT site_id, 'repair_order_open', status, item_type, -count(*)
+            FROM old_rows
+            WHERE status <> 'done'
+            GROUP BY site_id, status, item_type
+            ORDER BY site_id, status, item_type
+            ON CONFLICT (site_id, metric, dimension, sub_dimension)
+            DO UPDATE SET count = s.count + EXCLUDED.count;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO site_summary AS s (site_id, metric, dimension, sub_dimension, count)
+            SELECT site_id, 'repair_order_open', status, item_type, count(*)
+            FROM new_rows
+            WHERE status <> 'done'
+            GROUP BY site_id, status, item_type
+            ORDER BY site_id, status, item_type
+            ON CONFLICT (site_id, metric, dimension, sub_dimension)
+            DO UPDATE SET count = s.count + EXCLUDED.count;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS repair_order_summary_insert ON repair_order;
+CREATE TRIGGER repair_order_summary_insert AFTER INSERT ON repair_order
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION site_summary_repair_order();
+DROP TRIGGER IF EXISTS repair_order_summary_update ON repair_order;
+CREATE TRIGGER repair_order_summary_update AFTER UPDATE ON repair_order
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION site_summary_repair_order();
+DROP TRIGGER IF EXISTS repair_order_summary_delete ON repair_order;
+CREATE TRIGGER repair_order_summary_delete AFTER DELETE ON repair_order
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION site_summary_repair_order();
+
+-- subtract the rows an UPDATE or DELETE changed, add the rows an INSERT or
+-- UPDATE wrote: one upsert per group and statement, however many rows
+CREATE OR REPLACE FUNCTION site_summary_payment_order() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO site_summary AS s (site_id, metric, dimension, sub_dimension, count, amount)
+            SELECT site_id, 'payment_order_unpaid', building_id, '', -count(*), -sum(amount)
+            FROM old_rows
+            WHERE status = '0'
+            GROUP BY site_id, building_id
+            ORDER BY site_id, building_id
+            ON CONFLICT (site_id, metric, dimension, sub_dimension)
+            DO UPDATE SET count = s.count + EXCLUDED.count,
+                amount = s.amount + EXCLUDED.amount;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO site_summary AS s (site_id, metric, dimension, sub_dimension, count, amount)
+            SELECT site_id, 'payment_order_unpaid', building_id, '', count(*), sum(amount)
+            FROM new_rows
+            WHERE status = '0'
+            GROUP BY site_id, building_id
+            ORDER BY site_id, building_id
+            ON CONFLICT (site_id, metric, dimension, sub_dimension)
+            DO UPDATE SET count = s.count + EXCLUDED.count,
+                amount = s.amount + EXCLUDED.amount;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS payment_order_summary_insert ON payment_order;
+CREATE TRIGGER payment_order_summary_insert AFTER INSERT ON payment_order
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION site_summary_payment_order();
+DROP TRIGGER IF EXISTS payment_order_summary_update ON payment_order;
+CREATE TRIGGER payment_order_summary_update AFTER UPDATE ON payment_order
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION site_summary_payment_order();
+DROP TRIGGER IF EXISTS payment_order_summary_delete ON payment_order;
+CREATE TRIGGER payment_order_summary_delete AFTER DELETE ON payment_order
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION site_summary_payment_order();
+
+-- subtract the rows an UPDATE or DELETE changed, add the rows an INSERT or
+-- UPDATE wrote: one upsert per group and statement, however many rows
+CREATE OR REPLACE FUNCTION site_summary_announce() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO site_summary AS s (site_id, metric, dimension, sub_dimension, count)
+            SELECT site_id, 'announce', severity::text, '', -count(*)
+            FROM old_rows
+            GROUP BY site_id, severity
+            ORDER BY site_id, severity
+            ON CONFLICT (site_id, metric, dimension, sub_dimension)
+            DO UPDATE SET count = s.count + EXCLUDED.count;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO site_summary AS s (site_id, metric, dimension, sub_dimension, count)
+            SELECT site_id, 'announce', severity::text, '', count(*)
+            FROM new_rows
+            GROUP BY site_id, severity
+            ORDER BY site_id, severity
+            ON CONFLICT (site_id, metric, dimension, sub_dimension)
+            DO UPDATE SET count = s.count + EXCLUDED.count;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS announce_summary_insert ON announce;
+CREATE TRIGGER announce_summary_insert AFTER INSERT ON announce
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION site_summary_announce();
+DROP TRIGGER IF EXISTS announce_summary_update ON announce;
+CREATE TRIGGER announce_summary_update AFTER UPDATE ON announce
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION site_summary_announce();
+DROP TRIGGER IF EXISTS announce_summary_delete ON announce;
+CREATE TRIGGER announce_summary_delete AFTER DELETE ON announce
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION site_summary_announce();
+
+-- initial counters; creating the triggers locked the tables against writes
+-- until the commit, so no change is counted twice or missed
+DELETE FROM site_summary;
+INSERT INTO site_summary (site_id, metric, dimension, sub_dimension, count)
+    SELECT site_id, 'repair_order_open', status, item_type, count(*)
+    FROM repair_order
+    WHERE status <> 'done'
+    GROUP BY site_id, status, item_type;
+INSERT INTO site_summary (site_id, metric, dimension, sub_dimension, count, amount)
+    SELECT site_id, 'payment_order_unpaid', building_id, '', count(*), sum(amount)
+    FROM payment_order
+    WHERE status = '0'
+    GROUP BY site_id, building_id;
+INSERT INTO site_summary (site_id, metric, dimension, sub_dimension, count)
+    SELECT site_id, 'announce', severity::text, '', count(*)
+    FROM announce
+    GROUP BY site_id, severity;
+
+COMMIT;
@@ -0,0 +1,20 @@
+-- notify the workers' reference data caches (app/db/reference_cache.py)
+-- of site and building changes, once per statement; notifications are
+-- delivered on commit and deduplicated within a transaction
+CREATE OR REPLACE FUNCTION notify_reference_change() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM pg_notify('reference_changed', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS site_reference_notify ON site;
+CREATE TRIGGER site_reference_notify
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON site
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_reference_change();
+
+DROP TRIGGER IF EXISTS building_reference_notify ON building;
+CREATE TRIGGER building_reference_notify
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON building
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_reference_change();
@@ -0,0 +1,17 @@
+-- conditional GETs: list versions probed with count, max(updated_at) and sum(version);
+-- timestamptz, so that Last-Modified doesn't depend on the session's time zone
+ALTER TABLE repair_order ADD COLUMN IF NOT EXISTS updated_at timestamptz NOT NULL DEFAULT now();
+ALTER TABLE payment_order ADD COLUMN IF NOT EXISTS updated_at timestamptz NOT NULL DEFAULT now();
+ALTER TABLE announce ADD COLUMN IF NOT EXISTS updated_at timestamptz NOT NULL DEFAULT now();
+-- columns added as timestamp by an earlier revision, read in the session's time zone
+ALTER TABLE repair_order ALTER COLUMN updated_at TYPE timestamptz;
+ALTER TABLE payment_order ALTER COLUMN updated_at TYPE timestamptz;
+ALTER TABLE announce ALTER COLUMN updated_at TYPE timestamptz;
+
+-- index-only probes of a site's list
+CREATE INDEX IF NOT EXISTS ix_repair_order_site_updated
+    ON repair_order (site_id, updated_at) INCLUDE (version);
+CREATE INDEX IF NOT EXISTS ix_payment_order_site_updated
+    ON payment_order (site_id, updated_at) INCLUDE (version);
+CREATE INDEX IF NOT EXISTS ix_announce_site_updated
+    ON announce (site_id, updated_at) INCLUDE (version);
@@ -0,0 +1,8 @@
+-- keyset pages of the list routes, in their default order (see
+-- default_order_by of the services); NULL sorts first descending
+CREATE INDEX IF NOT EXISTS ix_repair_order_site_appointment
+    ON repair_order (site_id, appointment_time DESC, id);
+CREATE INDEX IF NOT EXISTS ix_announce_site_publish
+    ON announce (site_id, publish_date DESC, id);
+CREATE INDEX IF NOT EXISTS ix_payment_order_site_due
+    ON payment_order (site_id, payment_due_date DESC, id);
@@ -0,0 +1,6 @@
+-- generation jobs whose run died are failed after a timeout
+ALTER TABLE payment_order_job ADD COLUMN IF NOT EXISTS started_at timestamp;
+
+-- active job lookup of a site, period and payment item
+CREATE INDEX IF NOT EXISTS ix_payment_order_job_active
+    ON payment_order_job (site_id, period, payment_item, status);
@@ -0,0 +1,89 @@
+"""
+aggregate test
+"""
+
+from datetime import datetime
+
+import pytest
+
+from app.models.building_model import Building
+from app.models.payment_order_model import PaymentOrder
+from app.models.site_model import Site
+from app.repository.base_repository import InvalidColumnError
+from app.repository.payment_order_repository import PaymentOrderRepository
+
+
+@pytest.fixture
+def seed() -> list:
+    return [
+        Site(site_id="s1", site_name="Site 1"),
+        Building(site_id="s1", building_id="b1", building_name=""),
+        Building(site_id="s1", building_id="b2", building_name=""),
+        *(
+            PaymentOrder(
+                id=f"p{i}",
+                site_id="s1",
+                building_id="b1" if i < 4 else "b2",
+                house_no=f"h{i}",
+                house_owner="",
+                payment_item="fee",
+                amount=100 * (i + 1),
+                payment_due_date="2026-01",
+                status="0" if i % 2 else "1",
+                created_at=None if i % 2 else datetime(2026, 1, 1),
+            )
+            for i in range(6)
+        ),
+    ]
+
+
+async def test_aggregate_groups_in_the_database(session_factory):
+    async with session_factory() as session:
+        repository = PaymentOrderRepository(session)
+        rows = await repository.aggregate(
+            group_by=["building_id"],
+            aggregates={"count": ("count", None), "amount": ("sum", "amount")},
+            filters={("status", "="): "0"},
+        )
+        assert rows == [
+            {"building_id": "b1", "count": 2, "amount": 600},
+            {"building_id": "b2", "count": 1, "amount": 600},
+        ]
+        assert await repository.aggregate() == [{"count": 6}]
+
+
+async def test_aggregate_rejects_unknown_columns_and_functions(session_factory):
+    async with session_factory() as session:
+        repository = PaymentOrderRepository(session)
+        with pytest.raises(InvalidColumnError):
+            await repository.aggregate(group_by=["nope"])
+        with pytest.raises(ValueError):
+            await repository.aggregate(aggregates={"x": ("median", "amount")})
+        with pytest.raises(ValueError):
+            await repository.aggregate(group_by=["created_at:decade"])
+
+
+async def test_count_capped_stops_after_the_cap(session_factory):
+    async with session_factory() as session:
+        repository = PaymentOrderRepository(session)
+        assert await repository.count_capped({("status", "="): "0"}, 10) == 3
+        assert await repository.count_capped(None, 4) == 5
+        # no planner statistics outside of Postgres
+        assert await repository.estimate_count(None) is None
+
+
+async def test_none_equality_filters_compile_to_is_null(session_factory):
+    async with session_factory() as session:
+        repository = PaymentOrderRepository(session)
+        unset = {("created_at", "="): None}
+        assert sorted(row.id for row in await repository.query(filters=unset)) == [
+            "p1",
+            "p3",
+            "p5",
+        ]
+        assert await repository.count_capped({("created_at", "!="): None}, 10) == 3
+        # same (field, operator) shape with a value: a separately cached statement
+        rows = await repository.query(
+            filters={("created_at", "="): datetime(2026, 1, 1)}
+        )
+        assert sorted(row.id for row in rows) == ["p0", "p2", "p4"]
@@ -0,0 +1,103 @@
+"""
+batch test
+"""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event, func, select
+
+from app.models.repair_order_model import RepairOrder
+from app.models.site_model import Site
+
+
+def repair_order(**fields) -> RepairOrder:
+    return RepairOrder(
+        site_id="s1",
+        applicant="a",
+        region="public",
+        item_type="elevator",
+        reservation_by="self",
+        status="init",
+        created_at=datetime(2026, 1, 1),
+        **fields,
+    )
+
+
+@pytest.fixture
+def seed() -> list:
+    return [
+        Site(site_id="s1", site_name="Site 1"),
+        *(repair_order(id=f"r{i}") for i in range(3)),
+    ]
+
+
+def create(site_id: str) -> dict:
+    data = {
+        "site_id": site_id,
+        "applicant": "a",
+        "region": "public",
+        "item_type": "elevator",
+        "reservation_by": "self",
+    }
+    return {"op": "create", "data": data}
+
+
+async def test_failing_operations_of_a_run_roll_back_alone(client, session_factory):
+    engine = session_factory.kw["bind"]
+    # the in-memory database keeps its one connection, unknown sites now fail
+    async with engine.connect() as connection:
+        await connection.exec_driver_sql("PRAGMA foreign_keys=ON")
+    statements = []
+    event.listen(
+        engine.sync_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+
+    response = await client.post(
+        "/api/repair_orders/batch",
+        json={
+            "operations": [
+                create("s1"),
+                create("s9"),
+                create("s1"),
+                {"op": "create", "data": {"site_id": "s1"}},
+                {"op": "update", "id": "r0", "data": {"status": "done"}},
+                {"op": "update", "id": "r1", "data": {"status": "done"}},
+                {"op": "update", "id": "r9", "data": {"status": "done"}},
+                {"op": "update", "id": "r2", "data": {"status": "done"}, "version": 5},
+                {"op": "delete", "id": "r2"},
+                {"op": "delete"},
+            ]
+        },
+    )
+    assert response.status_code == 200
+    results = response.json()
+    assert [(result["index"], result["status"]) for result in results] == [
+        (0, 201),
+        (1, 400),
+        (2, 201),
+        (3, 422),
+        (4, 200),
+        (5, 200),
+        (6, 404),
+        (7, 412),
+        (8, 204),
+        (9, 422),
+    ]
+    assert "FOREIGN KEY" in results[1]["error"]
+    assert [results[index]["data"]["version"] for index in (4, 5)] == [2, 2]
+
+    # a savepoint for the create run and each of its retries, then one per
+    # run; the updates of the same data ran as one statement
+    savepoints = [s for s in statements if s.startswith("SAVEPOINT")]
+    rolled_back = [s for s in statements if s.startswith("ROLLBACK TO")]
+    assert (len(savepoints), len(rolled_back)) == (7, 3)
+    assert len([s for s in statements if s.startswith("UPDATE")]) == 2
+
+    async with session_factory() as session:
+        rows = await session.execute(
+            select(RepairOrder.site_id, func.count()).group_by(RepairOrder.site_id)
+        )
+        assert rows.all() == [("s1", 4)]
@@ -0,0 +1,77 @@
+"""
+shared test fixtures
+"""
+
+from typing import AsyncIterator, List
+
+import httpx
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+# every model, so that create_all resolves their foreign keys
+import app.models.announce_model  # noqa
+import app.models.building_model  # noqa
+import app.models.payment_order_job_model  # noqa
+import app.models.payment_order_model  # noqa
+import app.models.repair_order_model  # noqa
+import app.models.site_model  # noqa
+import app.models.site_summary_model  # noqa
+from app.auth.auth_handler import authenticate
+from app.db.database import Base
+from app.db.unit_of_work import AsyncUnitOfWork
+from app.dependencies import get_async_unit_of_work
+from app.main import app
+from app.utils.response_cache import response_cache
+
+
+@pytest.fixture
+def seed() -> List[Base]:
+    """
+    Rows of the session_factory database, overridden per module or test.
+    """
+    return []
+
+
+@pytest.fixture
+async def session_factory(seed: List[Base]) -> async_sessionmaker:
+    """
+    Session factory of a fresh in-memory sqlite database holding the seed
+    rows.
+    """
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(bind=engine)
+    async with factory() as session:
+        session.add_all(seed)
+        await session.commit()
+    yield factory
+    await engine.dispose()
+
+
+@pytest.fixture
+async def client(
+    session_factory: async_sessionmaker,
+) -> AsyncIterator[httpx.AsyncClient]:
+    """
+    Authenticated client of the app (without its lifespan), whose units of
+    work use the session_factory database.
+    """
+
+    async def unit_of_work() -> AsyncIterator[AsyncUnitOfWork]:
+        uow = AsyncUnitOfWork(session_factory=session_factory)
+        async with uow.request_scope():
+            yield uow
+
+    app.dependency_overrides[get_async_unit_of_work] = unit_of_work
+    app.dependency_overrides[authenticate] = lambda: {"auth_type": "api_key"}
+    # responses cached by another test's database
+    await response_cache.clear()
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            yield client
+    finally:
+        app.dependency_overrides.clear()
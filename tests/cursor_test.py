@@ -0,0 +1,27 @@
+"""
+cursor test
+"""
+
+from datetime import datetime
+
+import pytest
+
+from app.utils.cursor import InvalidCursorError, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    keys = ["appointment_time:desc", "id:asc"]
+    values = [datetime(2025, 1, 2, 3, 4, 5), "abc"]
+    cursor = encode_cursor(keys, values)
+    assert decode_cursor(cursor, keys) == values
+
+
+def test_cursor_rejects_other_sort_order():
+    cursor = encode_cursor(["id:asc"], ["abc"])
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor, ["id:desc"])
+
+
+def test_cursor_rejects_garbage():
+    with pytest.raises(InvalidCursorError):
+        decode_cursor("not-a-cursor", ["id:asc"])
@@ -0,0 +1,100 @@
+"""
+etag test
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.models.repair_order_model import RepairOrder
+from app.models.site_model import Site
+from app.schemas.common_schema import ListVersion
+from app.utils.etag import (
+    etag_matches,
+    if_match_version,
+    list_validators,
+    make_etag,
+    parse_etag,
+)
+
+
+def test_etag_round_trip():
+    assert parse_etag(make_etag(7)) == 7
+
+
+def test_if_match_any_version():
+    assert if_match_version(None) is None
+    assert if_match_version("*") is None
+
+
+@pytest.mark.parametrize("if_match", ['W/"3"', "3", '"abc"'])
+def test_if_match_that_never_matches(if_match):
+    with pytest.raises(HTTPException) as error:
+        if_match_version(if_match)
+    assert error.value.status_code == 412
+
+
+def list_request(query: str) -> Request:
+    return Request({"type": "http", "query_string": query.encode(), "headers": []})
+
+
+def test_list_etag_changes_with_the_list_version():
+    version = ListVersion(count=3, versions=5, updated_at=datetime(2026, 1, 2, 3, 4))
+    headers = list_validators(list_request("site_id=s1"), version)
+    assert headers["Last-Modified"] == "Fri, 02 Jan 2026 03:04:00 GMT"
+    assert etag_matches(f'"x", {headers["ETag"]}', headers["ETag"])
+    # an update bumps a version even within the same timestamp
+    bumped = version.model_copy(update={"versions": 6})
+    assert not etag_matches(
+        headers["ETag"], list_validators(list_request("site_id=s1"), bumped)["ETag"]
+    )
+    # another page of the same list
+    assert not etag_matches(
+        headers["ETag"],
+        list_validators(list_request("site_id=s1&cursor=c"), version)["ETag"],
+    )
+
+
+def test_last_modified_is_gmt_for_any_time_zone():
+    taipei = timezone(timedelta(hours=8))
+    version = ListVersion(
+        count=1, versions=1, updated_at=datetime(2026, 1, 2, 11, 4, tzinfo=taipei)
+    )
+    headers = list_validators(list_request(""), version)
+    assert headers["Last-Modified"] == "Fri, 02 Jan 2026 03:04:00 GMT"
+
+
+@pytest.fixture
+def seed() -> list:
+    return [
+        Site(site_id="s1", site_name="Site 1"),
+        RepairOrder(
+            id="r1",
+            site_id="s1",
+            applicant="a",
+            region="public",
+            item_type="elevator",
+            reservation_by="self",
+            status="init",
+            created_at=datetime(2026, 1, 1),
+        ),
+    ]
+
+
+async def test_record_get_answers_304_to_its_etag(client):
+    response = await client.get("/api/repair_orders/r1")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    response = await client.get(
+        "/api/repair_orders/r1", headers={"If-None-Match": etag}
+    )
+    assert (response.status_code, response.headers["ETag"]) == (304, etag)
+    assert response.content == b""
+
+    response = await client.get(
+        "/api/repair_orders/r1", headers={"If-None-Match": '"0"'}
+    )
+    assert response.status_code == 200
@@ -0,0 +1,94 @@
+"""
+payment order csv import test
+"""
+
+import pytest
+from sqlalchemy import select
+
+import app.utils.config as config
+from app.models.building_model import Building
+from app.models.payment_order_model import PaymentOrder
+from app.models.site_model import Site
+
+HEADER = "site_id,building_id,house_no,house_owner,payment_item,amount,payment_due_date"
+
+
+@pytest.fixture
+def seed() -> list:
+    return [
+        Site(site_id="s1", site_name="Site 1"),
+        Site(site_id="s2", site_name="Site 2"),
+        Building(site_id="s1", building_id="b1", building_name="B"),
+        Building(site_id="s2", building_id="b2", building_name="B"),
+    ]
+
+
+async def post_csv(client, csv_text: str, site_id: str | None = None):
+    return await client.post(
+        "/api/payment_orders/import",
+        files={"file": ("orders.csv", csv_text.encode(), "text/csv")},
+        data={"site_id": site_id} if site_id else None,
+    )
+
+
+async def test_import_reports_skipped_and_invalid_lines(
+    client, session_factory, monkeypatch
+):
+    # rows of several chunks
+    monkeypatch.setattr(config, "IMPORT_CHUNK_SIZE", 2)
+    csv_text = "\n".join(
+        [
+            HEADER,
+            "s1,b1,h1,o,fee,100,2026-01",
+            "s1,b9,h2,o,fee,100,2026-01",
+            "s1,b1,h3,o,fee,-1,2026-01",
+            "s1,b2,h4,o,fee,100,2026-01",
+            "s1,b1,h5,o,fee,x,2026-01",
+            "s1,b1,h6,o,fee,100,2026-01",
+        ]
+    )
+    response = await post_csv(client, csv_text)
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["total"], report["imported"], report["failed"]) == (6, 2, 4)
+    # in line order, the header is line 1
+    assert [(error["line"], error["errors"]) for error in report["errors"]] == [
+        (3, ["building_id: not found"]),
+        (4, ["amount: Input should be greater than or equal to 0"]),
+        # b2 is a building of another site
+        (5, ["building_id: not found"]),
+        (
+            6,
+            [
+                "amount: Input should be a valid integer, "
+                "unable to parse string as an integer"
+            ],
+        ),
+    ]
+    async with session_factory() as session:
+        rows = await session.execute(
+            select(PaymentOrder.house_no, PaymentOrder.status).order_by(
+                PaymentOrder.house_no
+            )
+        )
+        assert rows.all() == [("h1", "0"), ("h6", "0")]
+
+
+async def test_import_with_the_site_of_the_form(client, monkeypatch):
+    monkeypatch.setattr(config, "IMPORT_MAX_ERRORS", 1)
+    csv_text = "\n".join(
+        [
+            HEADER,
+            ",b1,h1,o,fee,100,2026-01",
+            "s2,b2,h2,o,fee,100,2026-01",
+            "s1,b1,h3,o,fee,-1,2026-01",
+        ]
+    )
+    report = (await post_csv(client, csv_text, site_id="s1")).json()
+    assert (report["total"], report["imported"], report["failed"]) == (3, 1, 2)
+    # the count of failed lines is complete, their errors capped
+    assert report["errors"] == [{"line": 3, "errors": ["site_id: must be s1"]}]
+
+    response = await post_csv(client, "house_no,amount\nh1,100")
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Missing csv columns: building_id")
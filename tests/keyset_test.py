@@ -0,0 +1,95 @@
+"""
+keyset pagination test
+"""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from app.models.repair_order_model import RepairOrder
+from app.models.site_model import Site
+from app.repository.repair_order_repository import RepairOrderRepository
+from app.schemas.repair_order_schema import RepairOrder as RepairOrderSchema
+
+
+@pytest.fixture
+def seed() -> list:
+    return [
+        Site(site_id="s1", site_name="Site 1"),
+        *(
+            RepairOrder(
+                id=f"r{i}",
+                site_id="s1",
+                applicant="a",
+                region="public",
+                item_type="elevator",
+                reservation_by="self",
+                # odd rows have no appointment, r0 and r2 share one
+                appointment_time=(
+                    None if i % 2 else datetime(2026, 1, 1 + max(i, 2) // 2)
+                ),
+                status="init",
+            )
+            for i in range(7)
+        ),
+    ]
+
+
+async def page_through(repository, rows_mode: bool, direction: str) -> list:
+    order_by = {"appointment_time": direction}
+    ids, cursor = [], None
+    while True:
+        if rows_mode:
+            rows, cursor = await repository.query_rows_page(
+                RepairOrderSchema, limit=2, cursor=cursor, order_by=order_by
+            )
+            ids += [row["id"] for row in rows]
+        else:
+            rows, cursor = await repository.query_page(
+                limit=2, cursor=cursor, order_by=order_by
+            )
+            ids += [row.id for row in rows]
+        if cursor is None:
+            return ids
+
+
+@pytest.mark.parametrize("rows_mode", [False, True])
+@pytest.mark.parametrize("direction", ["asc", "desc"])
+async def test_pages_return_null_sort_values_exactly_once(
+    session_factory, rows_mode, direction
+):
+    async with session_factory() as session:
+        ids = await page_through(RepairOrderRepository(session), rows_mode, direction)
+    dated = ["r0", "r2", "r4", "r6"]
+    undated = ["r1", "r3", "r5"]
+    # NULL sorts after every value ascending and before them descending
+    if direction == "asc":
+        assert ids == dated + undated
+    else:
+        assert ids == undated + ["r6", "r4", "r0", "r2"]
+
+
+@pytest.mark.parametrize(
+    "direction, null_keys, bound",
+    [
+        ("desc", frozenset(), "repair_order.appointment_time <= :k0"),
+        (
+            "asc",
+            frozenset(),
+            "(repair_order.appointment_time >= :k0"
+            " OR repair_order.appointment_time IS NULL)",
+        ),
+        ("asc", frozenset({0}), "repair_order.appointment_time IS NULL"),
+    ],
+)
+def test_cursor_bounds_the_leading_sort_key(direction, null_keys, bound):
+    repository = RepairOrderRepository(None)
+    query = repository._apply_keyset(
+        select(RepairOrder.id),
+        {"appointment_time": direction, "id": "asc"},
+        null_keys,
+    )
+    where = str(query.whereclause)
+    # the bound stands alone, not inside the OR expansion
+    assert where.startswith(bound + " AND ")
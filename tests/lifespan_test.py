@@ -0,0 +1,61 @@
+"""
+lifespan test
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import app.main as main
+from app.middleware import InFlightRequests
+
+
+async def test_lifespan_tolerates_startup_failures_and_drains_first(monkeypatch):
+    events = []
+
+    async def fail(*args, **kwargs):
+        raise ConnectionError("database down")
+
+    def fail_unit_of_work():
+        raise ConnectionError("database down")
+
+    async def background(name: str):
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            events.append(f"{name} cancelled")
+            raise
+
+    async def dispose_engines():
+        events.append("engines disposed")
+
+    tracker = InFlightRequests()
+    monkeypatch.setattr(main, "warm_up_engines", fail)
+    monkeypatch.setattr(main, "create_unit_of_work", fail_unit_of_work)
+    monkeypatch.setattr(main, "PGBOUNCER", False)
+    monkeypatch.setattr(
+        main, "get_replica_router", lambda: SimpleNamespace(primary=None)
+    )
+    monkeypatch.setattr(
+        main, "listen_for_invalidations", lambda engine: background("listener")
+    )
+    monkeypatch.setattr(
+        main, "reconcile_periodically", lambda *args: background("reconciler")
+    )
+    monkeypatch.setattr(main, "dispose_engines", dispose_engines)
+    monkeypatch.setattr(main, "in_flight_requests", tracker)
+
+    async def request():
+        tracker.start()
+        await asyncio.sleep(0.05)
+        events.append("request finished")
+        tracker.finish()
+
+    # warm-up and preload failures are logged, the app still starts
+    async with main.lifespan(main.app):
+        in_flight = asyncio.create_task(request())
+        await asyncio.sleep(0)
+    await in_flight
+
+    assert events[0] == "request finished"
+    assert sorted(events[1:3]) == ["listener cancelled", "reconciler cancelled"]
+    assert events[3:] == ["engines disposed"]
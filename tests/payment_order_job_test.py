@@ -0,0 +1,116 @@
+"""
+payment order generation job test
+"""
+
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.db.unit_of_work import AsyncUnitOfWork
+from app.models.building_model import Building
+from app.models.payment_order_job_model import PaymentOrderJob
+from app.models.payment_order_model import PaymentOrder
+from app.models.site_model import Site
+from app.repository.payment_order_repository import PaymentOrderRepository
+from app.schemas.payment_order_job_schema import PaymentOrderGenerate
+from app.service.payment_order_service import PaymentOrderService
+
+REQUEST = PaymentOrderGenerate(
+    site_id="s1", period="2026-02", payment_item="fee", amount=500
+)
+
+
+@pytest.fixture
+def seed() -> list:
+    return [
+        Site(site_id="s1", site_name="Site 1"),
+        Building(site_id="s1", building_id="b1", building_name="B"),
+        Building(site_id="s1", building_id="b2", building_name="B"),
+        *(
+            PaymentOrder(
+                id=f"p{i}",
+                site_id="s1",
+                building_id=building_id,
+                house_no=f"h{i}",
+                house_owner="o",
+                payment_item="fee",
+                amount=100,
+                payment_due_date="2026-01",
+                status="1",
+                created_at=datetime(2026, 1, 1),
+            )
+            for i, building_id in enumerate(("b1", "b2"))
+        ),
+    ]
+
+
+@pytest.fixture
+async def service(session_factory: async_sessionmaker) -> PaymentOrderService:
+    async with session_factory.kw["bind"].connect() as conn:
+        raw = await conn.get_raw_connection()
+        # Postgres' uuid generator of generate_for_period
+        await raw.driver_connection.create_function(
+            "gen_random_uuid", 0, lambda: str(uuid.uuid4())
+        )
+    return PaymentOrderService(AsyncUnitOfWork(session_factory=session_factory))
+
+
+async def orders_due(session_factory: async_sessionmaker, period: str) -> list:
+    async with session_factory() as session:
+        rows = await session.execute(
+            select(PaymentOrder.house_no, PaymentOrder.amount)
+            .where(PaymentOrder.payment_due_date == period)
+            .order_by(PaymentOrder.house_no)
+        )
+        return rows.all()
+
+
+async def test_generation_job_runs_once_per_period(session_factory, service):
+    job = await service.create_generation_job(REQUEST)
+    assert job.status == "pending"
+    # the pending job is returned to the same request
+    assert (await service.create_generation_job(REQUEST)).id == job.id
+
+    await service.run_generation_job(job.id)
+    job = await service.get_generation_job(job.id)
+    assert (job.status, job.created_count) == ("done", 2)
+    assert job.started_at is not None and job.finished_at is not None
+    assert await orders_due(session_factory, "2026-02") == [("h0", 500), ("h1", 500)]
+
+    # running it again claims nothing, a new job generates nothing
+    await service.run_generation_job(job.id)
+    again = await service.create_generation_job(REQUEST)
+    assert again.id != job.id
+    await service.run_generation_job(again.id)
+    assert (await service.get_generation_job(again.id)).created_count == 0
+
+
+async def test_failed_generation_fails_the_job(service, monkeypatch):
+    async def fail(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(PaymentOrderRepository, "generate_for_period", fail)
+    job = await service.create_generation_job(REQUEST)
+    await service.run_generation_job(job.id)
+    job = await service.get_generation_job(job.id)
+    assert (job.status, job.message) == ("failed", "boom")
+
+
+async def test_dead_running_job_times_out(session_factory, service):
+    job = await service.create_generation_job(REQUEST)
+    # claimed by a run that died, too long ago
+    async with session_factory() as session:
+        await session.execute(
+            update(PaymentOrderJob)
+            .where(PaymentOrderJob.id == job.id)
+            .values(status="running", started_at=datetime.now() - timedelta(days=1))
+        )
+        await session.commit()
+
+    retry = await service.create_generation_job(REQUEST)
+    assert retry.id != job.id and retry.status == "pending"
+    job = await service.get_generation_job(job.id)
+    assert (job.status, job.message) == ("failed", "Timed out")
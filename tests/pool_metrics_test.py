@@ -0,0 +1,64 @@
+"""
+pool metrics test
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db.pool_metrics import (
+    InstrumentedAsyncPool,
+    instrument_engine,
+    instrumented_engines,
+    pool_metrics_snapshot,
+    set_request_scope,
+    track_service_method,
+)
+
+
+class ReportService:
+    def __init__(self, engine):
+        self.engine = engine
+
+    @track_service_method
+    async def read(self):
+        async with self.engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+
+async def test_connections_are_labelled_with_route_and_service_method(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path}/metrics.db",
+        poolclass=InstrumentedAsyncPool,
+        pool_size=2,
+    )
+    instrument_engine(engine, "test")
+
+    async def request():
+        # what InFlightMiddleware does once the request is routed
+        set_request_scope(
+            {"method": "GET", "path": "/r/1", "route": SimpleNamespace(path="/r/{id}")}
+        )
+        await ReportService(engine).read()
+
+    try:
+        # tasks run in a copy of the context, the labels don't leak
+        await asyncio.create_task(request())
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+        (snapshot,) = [
+            pool for pool in pool_metrics_snapshot() if pool["pool"] == "test"
+        ]
+        assert snapshot["checkouts"] == 2
+        assert snapshot["checked_out"] == 0
+        for histograms in (snapshot["checkout_wait"], snapshot["held"]):
+            assert [
+                (labels["route"], labels["service_method"], labels["count"])
+                for labels in histograms
+            ] == [("-", "-", 1), ("GET /r/{id}", "ReportService.read", 1)]
+    finally:
+        instrumented_engines.pop("test")
+        await engine.dispose()
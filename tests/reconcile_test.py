@@ -0,0 +1,103 @@
+"""
+payment reconciliation test
+"""
+
+import io
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.db.unit_of_work import AsyncUnitOfWork
+from app.models.building_model import Building
+from app.models.payment_order_model import PaymentOrder
+from app.models.site_model import Site
+from app.service.payment_order_service import PaymentOrderService
+
+
+@pytest.fixture
+def seed() -> list:
+    # p1, p2 and p3 all match h1 100 without a building_id
+    orders = [
+        ("p1", "b1", "h1", "fee", 100),
+        ("p2", "b2", "h1", "fee", 100),
+        ("p3", "b1", "h1", "parking", 100),
+        ("p4", "b2", "h2", "fee", 200),
+        ("p5", "b1", "h3", "fee", 300),
+    ]
+    return [
+        Site(site_id="s1", site_name="Site 1"),
+        Building(site_id="s1", building_id="b1", building_name="B"),
+        Building(site_id="s1", building_id="b2", building_name="B"),
+        *(
+            PaymentOrder(
+                id=order_id,
+                site_id="s1",
+                building_id=building_id,
+                house_no=house_no,
+                house_owner="o",
+                payment_item=payment_item,
+                amount=amount,
+                payment_due_date="2026-01",
+                status="0",
+                created_at=datetime(2026, 1, 1),
+            )
+            for order_id, building_id, house_no, payment_item, amount in orders
+        ),
+    ]
+
+
+async def reconcile(session_factory: async_sessionmaker, lines: str):
+    service = PaymentOrderService(AsyncUnitOfWork(session_factory=session_factory))
+    csv_text = "house_no,amount,payment_due_date,building_id\n" + lines
+    report = await service.reconcile_csv(io.BytesIO(csv_text.encode()), "s1")
+    errors = [(error.line, error.errors) for error in report.errors]
+    return report.matched, report.updated, errors
+
+
+async def paid(session_factory: async_sessionmaker) -> list:
+    async with session_factory() as session:
+        ids = await session.execute(
+            select(PaymentOrder.id)
+            .where(PaymentOrder.status == "1")
+            .order_by(PaymentOrder.id)
+        )
+        return list(ids.scalars())
+
+
+async def test_reconcile_reports_duplicate_lines_once(session_factory):
+    lines = (
+        "h2,200,2026-01,\n"
+        "h2,200,2026-01,\n"
+        "h3,300,2026-01,\n"
+        "h3,300,2026-01,b1\n"
+        "h9,1,2026-01,\n"
+    )
+    assert await reconcile(session_factory, lines) == (
+        2,
+        2,
+        [
+            (3, ["duplicate of line 2"]),
+            # lines with a building_id pay first
+            (4, ["duplicate of line 5"]),
+            (6, ["no unpaid payment order matches"]),
+        ],
+    )
+    assert await paid(session_factory) == ["p4", "p5"]
+
+
+async def test_reconcile_pays_one_order_per_line(session_factory):
+    ambiguous = (2, ["matches several unpaid payment orders"])
+    assert await reconcile(session_factory, "h1,100,2026-01,\n") == (0, 0, [ambiguous])
+    assert await paid(session_factory) == []
+
+    # p2 is paid by line 3, which leaves p1 and p3 to line 2
+    lines = "h1,100,2026-01,\nh1,100,2026-01,b2\n"
+    assert await reconcile(session_factory, lines) == (1, 1, [ambiguous])
+    assert await paid(session_factory) == ["p2"]
+
+    # as many lines as orders pay them all
+    lines = "h1,100,2026-01,\nh1,100,2026-01,\n"
+    assert await reconcile(session_factory, lines) == (2, 2, [])
+    assert await paid(session_factory) == ["p1", "p2", "p3"]
@@ -0,0 +1,53 @@
+"""
+reference cache test
+"""
+
+import time
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db.reference_cache import ReferenceCache, listen_for_invalidations
+
+
+async def test_get_or_load_caches_until_invalidated():
+    cache = ReferenceCache(max_size=10, ttl=60)
+    loads = []
+
+    async def load():
+        loads.append(1)
+        return len(loads)
+
+    assert await cache.get_or_load("sites", load) == 1
+    assert await cache.get_or_load("sites", load) == 1
+    cache.invalidate()
+    assert await cache.get_or_load("sites", load) == 2
+
+
+async def test_value_loaded_during_invalidation_is_not_cached():
+    cache = ReferenceCache(max_size=10, ttl=60)
+
+    async def load():
+        cache.invalidate()  # e.g. a NOTIFY arriving while loading
+        return "stale"
+
+    assert await cache.get_or_load("sites", load) == "stale"
+    assert cache.get("sites") is None
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    cache = ReferenceCache(max_size=10, ttl=60)
+    cache.set("sites", ["s1"], cache.version)
+    assert cache.get("sites") == ["s1"]
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 61)
+    assert cache.get("sites") is None
+
+
+async def test_listener_connects_outside_of_the_engine_pool():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    checkouts = []
+    event.listen(engine.sync_engine, "checkout", lambda *args: checkouts.append(1))
+    # sqlite has no LISTEN: the listener returns once connected
+    await listen_for_invalidations(engine)
+    assert checkouts == []
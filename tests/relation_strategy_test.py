@@ -0,0 +1,100 @@
+"""
+relation loader strategy test
+"""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy.exc import InvalidRequestError
+
+from app.db.unit_of_work import AsyncUnitOfWork
+from app.models.announce_model import Announce
+from app.models.building_model import Building
+from app.models.payment_order_model import PaymentOrder
+from app.models.repair_order_model import RepairOrder
+from app.models.site_model import Site
+from app.repository.payment_order_repository import PaymentOrderRepository
+from app.service.announce_service import AnnounceService
+from app.service.payment_order_service import PaymentOrderService
+from app.service.repair_order_service import RepairOrderService
+
+
+@pytest.fixture
+def seed() -> list:
+    return [
+        Site(site_id="s1", site_name="Site 1"),
+        Building(site_id="s1", building_id="b1", building_name="B1"),
+        PaymentOrder(
+            id="p1",
+            site_id="s1",
+            building_id="b1",
+            house_no="h1",
+            house_owner="o",
+            payment_item="fee",
+            amount=100,
+            payment_due_date="2026-01",
+            status="0",
+        ),
+        RepairOrder(
+            id="r1",
+            site_id="s1",
+            applicant="a",
+            region="public",
+            item_type="elevator",
+            reservation_by="self",
+            status="init",
+            created_at=datetime(2026, 1, 1),
+        ),
+        Announce(
+            id="a1",
+            site_id="s1",
+            title="t",
+            severity=1,
+            content_path="/a1",
+            publish_date=datetime(2026, 1, 1),
+        ),
+    ]
+
+
+async def test_raise_default_fails_on_relations_outside_the_strategy(
+    session_factory,
+):
+    async with session_factory() as session:
+        order = await PaymentOrderRepository(session).get_by_keys(
+            load_relations={"site": "selectin", "*": "raise"}, id="p1"
+        )
+        assert order.site.site_name == "Site 1"
+        with pytest.raises(InvalidRequestError):
+            order.building
+        # relations of the loaded relations too
+        with pytest.raises(InvalidRequestError):
+            order.site.buildings
+
+
+async def test_dotted_paths_load_nested_relations(session_factory):
+    async with session_factory() as session:
+        order = await PaymentOrderRepository(session).get_by_keys(
+            load_relations={"building.site": "selectin", "*": "raise"}, id="p1"
+        )
+        # the intermediate relation is loaded along
+        assert order.building.site.site_name == "Site 1"
+        with pytest.raises(InvalidRequestError):
+            order.site
+
+
+@pytest.mark.parametrize(
+    "service_class, key",
+    [(PaymentOrderService, "p1"), (RepairOrderService, "r1"), (AnnounceService, "a1")],
+)
+@pytest.mark.parametrize("relation_strategy", ["basic", "full"])
+async def test_orm_reads_validate_without_raiseload(
+    session_factory, service_class, key, relation_strategy
+):
+    class OrmService(service_class):
+        read_from_rows = False
+
+    service = OrmService(AsyncUnitOfWork(session_factory=session_factory))
+    view = await service.get_by_keys(relation_strategy=relation_strategy, id=key)
+    assert view.site.site_name == "Site 1"
+    views = await service.query(relation_strategy=relation_strategy)
+    assert [item.id for item in views] == [key]
@@ -0,0 +1,93 @@
+"""
+response cache test
+"""
+
+import asyncio
+
+from app.utils.response_cache import MemoryBackend, RedisBackend, ResponseCache
+
+
+async def test_memory_backend_skips_values_produced_across_invalidation():
+    backend = MemoryBackend(max_size=10)
+    token = backend.token("response:repair_order:s1")
+    await backend.set("response:repair_order:s1", "k", b"v", 30, token)
+    assert await backend.get("response:repair_order:s1", "k") == b"v"
+
+    token = backend.token("response:repair_order:s1")
+    await backend.invalidate(["response:repair_order:s1"])
+    assert await backend.get("response:repair_order:s1", "k") is None
+    await backend.set("response:repair_order:s1", "k", b"stale", 30, token)
+    assert await backend.get("response:repair_order:s1", "k") is None
+
+
+async def test_memory_backend_clear_skips_values_produced_across_it():
+    backend = MemoryBackend(max_size=10)
+    token = backend.token("response:repair_order:s1")
+    await backend.clear()
+    await backend.set("response:repair_order:s1", "k", b"stale", 30, token)
+    assert await backend.get("response:repair_order:s1", "k") is None
+
+
+async def test_broadcast_invalidations_apply_to_the_memory_backend():
+    cache = ResponseCache(MemoryBackend(max_size=10), ttl=30)
+    buckets = cache.buckets("repair_order", ["s1"])
+    assert buckets == ["response:repair_order:*", "response:repair_order:s1"]
+    for bucket in buckets + ["response:repair_order:s2"]:
+        await cache.backend.set(bucket, "k", b"v", 30, cache.backend.token(bucket))
+
+    assert await cache.apply_broadcast("\n".join(buckets))
+    assert [await cache.backend.get(bucket, "k") for bucket in buckets] == [None] * 2
+    assert await cache.backend.get("response:repair_order:s2", "k") == b"v"
+    # reference data notifications are left to the caller
+    assert not await cache.apply_broadcast("site")
+
+
+async def serve_hashes(hashes: dict):
+    """
+    Server speaking the few RESP commands of RedisBackend.
+    """
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        while True:
+            try:
+                command = await RedisBackend._read_reply(reader)
+            except Exception:
+                break
+            name, args = command[0].upper(), command[1:]
+            if name == b"HGET":
+                value = hashes.get(args[0], {}).get(args[1])
+                writer.write(
+                    b"$-1\r\n"
+                    if value is None
+                    else b"$%d\r\n%s\r\n" % (len(value), value)
+                )
+            elif name == b"HSET":
+                hashes.setdefault(args[0], {})[args[1]] = args[2]
+                writer.write(b":1\r\n")
+            elif name == b"DEL":
+                deleted = [hashes.pop(key) for key in args if key in hashes]
+                writer.write(b":%d\r\n" % len(deleted))
+            elif name == b"EXPIRE":
+                writer.write(b":1\r\n")
+            else:
+                writer.write(b"-ERR unknown command\r\n")
+        writer.close()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+async def test_redis_backend_round_trip():
+    server = await serve_hashes({})
+    port = server.sockets[0].getsockname()[1]
+    backend = RedisBackend(f"redis://127.0.0.1:{port}")
+    try:
+        assert await backend.get("response:announce:s1", "k") is None
+        await backend.set("response:announce:s1", "k", b"\x00body\r\n", 30, None)
+        assert await backend.get("response:announce:s1", "k") == b"\x00body\r\n"
+        await backend.invalidate(["response:announce:*", "response:announce:s1"])
+        assert await backend.get("response:announce:s1", "k") is None
+    finally:
+        server.close()
+        for _, writer in backend._idle:
+            writer.close()
+        await server.wait_closed()
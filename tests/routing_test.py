@@ -0,0 +1,20 @@
+"""
+replica routing test
+"""
+
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.db.routing import ReplicaRouter
+
+
+def test_least_busy_falls_back_to_round_robin_without_checkout_counts():
+    primary = create_async_engine("sqlite+aiosqlite://")
+    replicas = [
+        create_async_engine("sqlite+aiosqlite://", poolclass=NullPool) for _ in range(2)
+    ]
+    router = ReplicaRouter(primary, replicas, strategy="least_busy")
+    # NullPool has no checkedout(); every replica still gets reads
+    engines = [router.read_engine() for _ in range(4)]
+    assert engines[:2] == engines[2:]
+    assert set(engines) == {router._read_only[replica] for replica in replicas}
@@ -0,0 +1,96 @@
+"""
+serialization test
+"""
+
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+import app.utils.config as config
+from app.db.unit_of_work import AsyncUnitOfWork
+from app.models.announce_model import Announce
+from app.models.building_model import Building
+from app.models.payment_order_model import PaymentOrder
+from app.models.repair_order_model import RepairOrder
+from app.models.site_model import Site
+from app.service.announce_service import AnnounceService
+from app.service.payment_order_service import PaymentOrderService
+from app.service.repair_order_service import RepairOrderService
+from app.utils.serialization import dump_models
+
+
+@pytest.fixture
+def seed() -> list:
+    return [
+        Site(site_id="s1", site_name="社區 1"),
+        Building(site_id="s1", building_id="b1", building_name="A 棟"),
+        PaymentOrder(
+            id="p1",
+            site_id="s1",
+            building_id="b1",
+            house_no="h1",
+            house_owner="王小明",
+            payment_item="管理費",
+            amount=100,
+            payment_due_date="2026-01",
+            status="0",
+            created_at=datetime(2026, 1, 1, 8, 30, 15, 123456),
+        ),
+        RepairOrder(
+            id="r1",
+            site_id="s1",
+            applicant="a",
+            region="public",
+            item_type="water_leak",
+            description='"quoted" \\ \n line',
+            reservation_by="assistance",
+            appointment_time=datetime(2026, 1, 2, 9, 0),
+            status="reserved",
+            created_at=datetime(2026, 1, 1, tzinfo=timezone.utc),
+        ),
+        RepairOrder(
+            id="r2",
+            site_id="s1",
+            applicant="b",
+            region="personal",
+            item_type="elevator",
+            reservation_by="self",
+            status="init",
+            created_at=datetime(2026, 1, 1),
+        ),
+        Announce(
+            id="a1",
+            site_id="s1",
+            title="停水通知",
+            severity=2,
+            content_path="/a1",
+            publish_date=datetime(2026, 1, 1),
+        ),
+    ]
+
+
+@pytest.mark.parametrize(
+    "service_class", [PaymentOrderService, RepairOrderService, AnnounceService]
+)
+async def test_dump_models_matches_the_response_model(
+    session_factory, service_class, monkeypatch
+):
+    # announce urls are built of it
+    monkeypatch.setattr(config, "BLOB_URL_PREFIX", "https://blob.test")
+    service = service_class(AsyncUnitOfWork(session_factory=session_factory))
+    items = await service.query()
+    assert items
+
+    app = FastAPI()
+
+    @app.get("/", response_model=list[service.query_schema])
+    async def read():
+        return items
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/")
+    assert dump_models(items) == response.content
+    assert dump_models([]) == b"[]"
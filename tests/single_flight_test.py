@@ -0,0 +1,75 @@
+"""
+single flight test
+"""
+
+import asyncio
+
+import pytest
+
+from app.utils.single_flight import SingleFlight
+
+
+async def test_concurrent_calls_share_one_call():
+    flights = SingleFlight(max_wait=1)
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return ["row"]
+
+    results = await asyncio.gather(*(flights.run("k", call) for _ in range(10)))
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    # the next call after the flight landed runs again
+    await flights.run("k", call)
+    assert len(calls) == 2
+
+
+async def test_followers_get_the_exception():
+    flights = SingleFlight(max_wait=1)
+
+    async def call():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(
+        *(flights.run("k", call) for _ in range(3)), return_exceptions=True
+    )
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+async def test_followers_stop_waiting_after_max_wait():
+    flights = SingleFlight(max_wait=0.01)
+    release = asyncio.Event()
+
+    async def slow():
+        await release.wait()
+        return "slow"
+
+    async def fast():
+        return "fast"
+
+    leader = asyncio.create_task(flights.run("k", slow))
+    await asyncio.sleep(0)
+    assert await flights.run("k", fast) == "fast"
+    assert flights.timeouts == 1
+    release.set()
+    assert await leader == "slow"
+
+
+async def test_followers_run_the_call_if_the_leader_is_cancelled():
+    flights = SingleFlight(max_wait=1)
+
+    async def call():
+        await asyncio.sleep(0.05)
+        return "row"
+
+    leader = asyncio.create_task(flights.run("k", call))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flights.run("k", call))
+    await asyncio.sleep(0)
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    assert await follower == "row"
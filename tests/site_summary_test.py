@@ -0,0 +1,121 @@
+"""
+site summary test
+"""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from app.db.unit_of_work import AsyncUnitOfWork
+from app.models.announce_model import Announce
+from app.models.building_model import Building
+from app.models.payment_order_model import PaymentOrder
+from app.models.repair_order_model import RepairOrder
+from app.models.site_model import Site
+from app.models.site_summary_model import SiteSummary
+from app.service.site_summary_service import SiteSummaryService
+
+
+@pytest.fixture
+def seed() -> list:
+    repair_orders = [
+        ("r1", "init", "elevator"),
+        ("r2", "init", "elevator"),
+        ("r3", "done", "elevator"),
+        ("r4", "processing", "water_leak"),
+    ]
+    payment_orders = [("p1", 100, "0"), ("p2", 50, "0"), ("p3", 70, "1")]
+    return [
+        Site(site_id="s1", site_name="Site 1"),
+        Building(site_id="s1", building_id="b1", building_name="B"),
+        *(
+            RepairOrder(
+                id=order_id,
+                site_id="s1",
+                applicant="a",
+                region="public",
+                item_type=item_type,
+                reservation_by="self",
+                status=status,
+                created_at=datetime(2026, 1, 1),
+            )
+            for order_id, status, item_type in repair_orders
+        ),
+        *(
+            PaymentOrder(
+                id=order_id,
+                site_id="s1",
+                building_id="b1",
+                house_no="h1",
+                house_owner="o",
+                payment_item="fee",
+                amount=amount,
+                payment_due_date="2026-01",
+                status=status,
+            )
+            for order_id, amount, status in payment_orders
+        ),
+        Announce(
+            id="a1",
+            site_id="s1",
+            title="t",
+            severity=1,
+            content_path="/a1",
+            publish_date=datetime(2026, 1, 1),
+        ),
+        # drifted counters: a wrong one, a right one and one of no orders
+        SiteSummary(
+            site_id="s1",
+            metric="repair_order_open",
+            dimension="init",
+            sub_dimension="elevator",
+            count=5,
+            amount=0,
+        ),
+        SiteSummary(
+            site_id="s1",
+            metric="payment_order_unpaid",
+            dimension="b1",
+            sub_dimension="",
+            count=2,
+            amount=150,
+        ),
+        SiteSummary(
+            site_id="s1",
+            metric="repair_order_open",
+            dimension="reserved",
+            sub_dimension="elevator",
+            count=1,
+            amount=0,
+        ),
+    ]
+
+
+async def test_reconcile_rewrites_drifted_counters(session_factory):
+    service = SiteSummaryService(AsyncUnitOfWork(session_factory=session_factory))
+    # two rewritten, two missing ones inserted
+    assert await service.reconcile() == 4
+
+    async with session_factory() as session:
+        rows = await session.execute(
+            select(
+                SiteSummary.metric,
+                SiteSummary.dimension,
+                SiteSummary.sub_dimension,
+                SiteSummary.count,
+                SiteSummary.amount,
+            ).order_by(
+                SiteSummary.metric, SiteSummary.dimension, SiteSummary.sub_dimension
+            )
+        )
+        assert rows.all() == [
+            ("announce", "1", "", 1, 0),
+            ("payment_order_unpaid", "b1", "", 2, 150),
+            ("repair_order_open", "init", "elevator", 2, 0),
+            ("repair_order_open", "processing", "water_leak", 1, 0),
+            # zeroed rather than deleted
+            ("repair_order_open", "reserved", "elevator", 0, 0),
+        ]
+
+    assert await service.reconcile() == 0
@@ -0,0 +1,79 @@
+"""
+streaming test
+"""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.db.unit_of_work import AsyncUnitOfWork
+from app.models.repair_order_model import RepairOrder
+from app.models.site_model import Site
+from app.schemas.common_schema import LookupValue
+from app.service.repair_order_service import RepairOrderService
+from app.utils.streaming import NDJSON_MEDIA_TYPE, iter_json_array, iter_ndjson
+
+
+@pytest.fixture
+def seed() -> list:
+    return [
+        Site(site_id="s1", site_name="Site 1"),
+        *(
+            RepairOrder(
+                id=f"r{i}",
+                site_id="s1",
+                applicant="a",
+                region="public",
+                item_type="elevator",
+                reservation_by="self",
+                appointment_time=datetime(2026, 1, 1) + timedelta(hours=i),
+                status="init",
+                created_at=datetime(2026, 1, 1),
+            )
+            for i in range(5)
+        ),
+    ]
+
+
+async def chunks_of(*chunks: list):
+    for chunk in chunks:
+        yield chunk
+
+
+async def body_of(iterator) -> bytes:
+    return b"".join([part async for part in iterator])
+
+
+async def test_json_array_of_chunks_is_one_array():
+    values = [LookupValue(id=str(i), value=f"v{i}") for i in range(3)]
+    body = await body_of(iter_json_array(chunks_of(values[:2], [], values[2:])))
+    assert json.loads(body) == [value.model_dump() for value in values]
+    assert await body_of(iter_json_array(chunks_of())) == b"[]"
+    body = await body_of(iter_ndjson(chunks_of(values[:2], [], values[2:])))
+    assert body.splitlines() == [value.model_dump_json().encode() for value in values]
+
+
+async def test_service_streams_chunks_in_the_default_order(session_factory):
+    service = RepairOrderService(AsyncUnitOfWork(session_factory=session_factory))
+    chunks = [chunk async for chunk in service.stream(chunk_size=2)]
+    assert [[item.id for item in chunk] for chunk in chunks] == [
+        ["r4", "r3"],
+        ["r2", "r1"],
+        ["r0"],
+    ]
+
+
+async def test_stream_route_negotiates_ndjson(client):
+    response = await client.get("/api/repair_orders", params={"stream": "true"})
+    assert response.headers["content-type"] == "application/json"
+    items = response.json()
+    assert [item["id"] for item in items] == ["r4", "r3", "r2", "r1", "r0"]
+
+    response = await client.get(
+        "/api/repair_orders",
+        params={"stream": "true"},
+        headers={"Accept": NDJSON_MEDIA_TYPE},
+    )
+    assert response.headers["content-type"] == NDJSON_MEDIA_TYPE
+    assert [json.loads(line) for line in response.text.splitlines()] == items
@@ -0,0 +1,84 @@
+"""
+unit of work test
+"""
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db.unit_of_work import AsyncUnitOfWork
+
+
+async def make_uow() -> AsyncUnitOfWork:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.execute(text("CREATE TABLE item (id INTEGER PRIMARY KEY)"))
+    return AsyncUnitOfWork(session_factory=async_sessionmaker(bind=engine))
+
+
+async def count(uow: AsyncUnitOfWork) -> int:
+    async with uow.readonly() as read:
+        return (await read.session.execute(text("SELECT count(*) FROM item"))).scalar()
+
+
+async def test_request_scope_shares_one_session():
+    uow = await make_uow()
+    async with uow.request_scope():
+        async with uow.readonly():
+            session = uow.session
+        async with uow:
+            assert uow.session is not session  # upgraded to a write session
+            session = uow.session
+            await uow.session.execute(text("INSERT INTO item VALUES (1)"))
+        async with uow:
+            assert uow.session is session
+            await uow.session.execute(text("INSERT INTO item VALUES (2)"))
+        assert await count(uow) == 2
+    assert uow.session is None
+    assert await count(uow) == 2
+
+
+async def test_request_scope_rolls_back_failed_write():
+    uow = await make_uow()
+    with pytest.raises(ValueError):
+        async with uow.request_scope():
+            async with uow:
+                await uow.session.execute(text("INSERT INTO item VALUES (1)"))
+            async with uow:
+                raise ValueError("boom")
+    assert await count(uow) == 0
+
+
+async def test_savepoint_rolls_back_only_its_block():
+    uow = await make_uow()
+    async with uow:
+        await uow.session.execute(text("INSERT INTO item VALUES (1)"))
+        with pytest.raises(ValueError):
+            async with uow.savepoint():
+                await uow.session.execute(text("INSERT INTO item VALUES (2)"))
+                raise ValueError("boom")
+    assert await count(uow) == 1
+
+
+async def test_before_commit_runs_in_the_transaction_once_per_key():
+    uow = await make_uow()
+
+    async def insert(session):
+        await session.execute(text("INSERT INTO item VALUES (2)"))
+
+    async with uow.request_scope():
+        async with uow:
+            await uow.session.execute(text("INSERT INTO item VALUES (1)"))
+            uow.before_commit("k", insert)
+            uow.before_commit("k", insert)
+        assert await count(uow) == 1
+    assert await count(uow) == 2
+
+    async def fail(session):
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        async with uow:
+            await uow.session.execute(text("INSERT INTO item VALUES (3)"))
+            uow.before_commit("k", fail)
+    assert await count(uow) == 2
@@ -0,0 +1,61 @@
+"""
+update test
+"""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from app.models.repair_order_model import RepairOrder
+from app.models.site_model import Site
+
+
+@pytest.fixture
+def seed() -> list:
+    return [
+        Site(site_id="s1", site_name="Site 1"),
+        RepairOrder(
+            id="r1",
+            site_id="s1",
+            applicant="a",
+            region="public",
+            item_type="elevator",
+            reservation_by="self",
+            status="init",
+            created_at=datetime(2026, 1, 1),
+        ),
+    ]
+
+
+async def test_update_is_one_statement_bumping_the_version(client, session_factory):
+    statements = []
+    event.listen(
+        session_factory.kw["bind"].sync_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    response = await client.patch("/api/repair_orders/r1", json={"status": "done"})
+    assert response.status_code == 200
+    assert (response.json()["version"], response.headers["ETag"]) == (2, '"2"')
+    (statement,) = [s for s in statements if "repair_order" in s]
+    assert statement.startswith("UPDATE repair_order SET")
+    assert "RETURNING" in statement
+
+
+async def test_update_with_a_stale_if_match_fails_the_precondition(client):
+    stale = {"If-Match": '"1"'}
+    response = await client.patch(
+        "/api/repair_orders/r1", json={"status": "done"}, headers=stale
+    )
+    assert response.status_code == 200
+    response = await client.patch(
+        "/api/repair_orders/r1", json={"status": "processing"}, headers=stale
+    )
+    assert response.status_code == 412
+    response = await client.patch(
+        "/api/repair_orders/r1",
+        json={"status": "processing"},
+        headers={"If-Match": '"2"'},
+    )
+    assert (response.status_code, response.json()["version"]) == (200, 3)